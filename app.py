@@ -220,7 +220,8 @@ def main():
         # --- CONFLICTS SECTION ---
         st.markdown("### 🛡️ Centre de Contrôle")
         
-        conflict_summary = analytics.get_conflict_summary()
+        periodes = db.get_periodes_examen(actif=True)
+        conflict_summary = analytics.get_conflict_summary(periodes[0]['id'] if periodes else None)
         total_conflicts = sum(conflict_summary.values())
         
         if total_conflicts == 0:
@@ -239,11 +240,12 @@ def main():
             """, unsafe_allow_html=True)
              
              # Mini cards for conflicts
-             c1, c2, c3, c4 = st.columns(4)
+             c1, c2, c3, c4, c5 = st.columns(5)
              c1.metric("Conflits Étudiants", conflict_summary.get('etudiants', 0))
              c2.metric("Conflits Profs", conflict_summary.get('professeurs', 0))
              c3.metric("Surcharges Salles", conflict_summary.get('capacite', 0))
              c4.metric("Doublons Salles", conflict_summary.get('salles', 0))
+             c5.metric("Profs Indisponibles", conflict_summary.get('indisponibilites', 0))
 
     except Exception as e:
         st.error(f"Erreur d'initialisation : {e}")
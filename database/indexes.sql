@@ -6,13 +6,22 @@ WHERE statut = 'planifié';
 CREATE INDEX idx_inscriptions_actives ON inscriptions(etudiant_id, module_id) 
 WHERE statut = 'inscrit';
 
+-- Index pour l'extraction par session (vue inscriptions_session)
+CREATE INDEX idx_inscriptions_annee_statut_module ON inscriptions(annee_universitaire, statut, module_id);
+
 -- Index GIN pour recherche dans les équipements
 CREATE INDEX idx_lieu_equipements ON lieu_examen USING GIN(equipements);
 
+-- Index GiST pour les tests de chevauchement horaire (creneau && tsrange)
+CREATE INDEX idx_examens_creneau ON examens USING GIST(creneau);
+
 -- Index pour améliorer les jointures fréquentes
 CREATE INDEX idx_modules_formation_semestre ON modules(formation_id, semestre);
 CREATE INDEX idx_examens_periode_date ON examens(periode_id, date_heure);
 
+-- Indisponibilités d'un professeur sur une période (chargement du calendrier, contrôles)
+CREATE INDEX idx_indisponibilites_prof_debut ON professeur_indisponibilites(prof_id, debut);
+
 -- Statistiques pour l'optimiseur
 ANALYZE departements;
 ANALYZE formations;
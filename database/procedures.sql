@@ -6,16 +6,12 @@ RETURNS INTEGER AS $$
 DECLARE
     v_count INTEGER;
 BEGIN
-    -- Supprimer d'abord les surveillances liées (contrainte FK)
-    DELETE FROM surveillances 
-    WHERE examen_id IN (SELECT id FROM examens WHERE periode_id = p_periode_id);
+    SELECT COUNT(*) INTO v_count FROM examens WHERE periode_id = p_periode_id;
     
-    -- Supprimer les examens
-    DELETE FROM examens 
+    -- Supprimer toutes les versions : examens et surveillances suivent en cascade
+    DELETE FROM versions_planning 
     WHERE periode_id = p_periode_id;
     
-    GET DIAGNOSTICS v_count = ROW_COUNT;
-    
     -- Réinitialiser les statistiques (si on avait une table de cache)
     -- Log l'action (simulation)
     RAISE NOTICE 'Session % nettoyée. % examens supprimés.', p_periode_id, v_count;
@@ -24,8 +20,9 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- 2. Fonction d'analyse de conflits optimisée (côté serveur)
-CREATE OR REPLACE FUNCTION analyser_conflits_etudiants(p_seuil INT DEFAULT 1)
+-- 2. Fonction d'analyse de conflits optimisée (côté serveur), limitée à une période
+DROP FUNCTION IF EXISTS analyser_conflits_etudiants(INT);
+CREATE OR REPLACE FUNCTION analyser_conflits_etudiants(p_periode_id INT, p_seuil INT DEFAULT 1)
 RETURNS TABLE (
     etudiant_nom TEXT,
     date_jour DATE,
@@ -37,11 +34,345 @@ BEGIN
         (e.nom || ' ' || e.prenom)::TEXT,
         DATE(ex.date_heure),
         COUNT(*)
-    FROM inscriptions i
-    JOIN examens ex ON ex.module_id = i.module_id
+    FROM examens_publies ex
+    JOIN inscriptions_session i ON i.periode_id = ex.periode_id AND i.module_id = ex.module_id
     JOIN etudiants e ON e.id = i.etudiant_id
+    WHERE ex.periode_id = p_periode_id
     GROUP BY e.id, e.nom, e.prenom, DATE(ex.date_heure)
     HAVING COUNT(*) > p_seuil
     ORDER BY COUNT(*) DESC;
 END;
 $$ LANGUAGE plpgsql;
+
+-- 3. Plage horaire des surveillances (support de la contrainte exclusion_prof_creneau)
+-- La version et la plage sont recopiées depuis l'examen à l'insertion, puis la plage
+-- est propagée si l'examen est déplacé.
+CREATE OR REPLACE FUNCTION surveillances_copier_creneau()
+RETURNS TRIGGER AS $$
+BEGIN
+    SELECT version_id, creneau INTO NEW.version_id, NEW.creneau
+    FROM examens WHERE id = NEW.examen_id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_surveillances_creneau ON surveillances;
+CREATE TRIGGER trg_surveillances_creneau
+    BEFORE INSERT OR UPDATE OF examen_id ON surveillances
+    FOR EACH ROW EXECUTE FUNCTION surveillances_copier_creneau();
+
+CREATE OR REPLACE FUNCTION examens_propager_creneau()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE surveillances SET creneau = NEW.creneau WHERE examen_id = NEW.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_examens_creneau ON examens;
+CREATE TRIGGER trg_examens_creneau
+    AFTER UPDATE OF date_heure, duree_minutes ON examens
+    FOR EACH ROW
+    WHEN (OLD.creneau IS DISTINCT FROM NEW.creneau)
+    EXECUTE FUNCTION examens_propager_creneau();
+
+-- 4. Publication d'une version : bascule atomique du pointeur de la période
+-- Les lecteurs (vue examens_publies) voient l'ancienne version complète jusqu'au
+-- COMMIT, puis la nouvelle version complète ; jamais d'état intermédiaire.
+CREATE OR REPLACE FUNCTION publier_version_planning(p_version_id INT)
+RETURNS INTEGER AS $$
+DECLARE
+    v_periode_id INTEGER;
+BEGIN
+    SELECT periode_id INTO v_periode_id
+    FROM versions_planning
+    WHERE id = p_version_id;
+    
+    IF v_periode_id IS NULL THEN
+        RAISE EXCEPTION 'Version % introuvable', p_version_id;
+    END IF;
+    
+    -- Verrouille la période : deux publications concurrentes sont sérialisées
+    PERFORM 1 FROM periodes_examen WHERE id = v_periode_id FOR UPDATE;
+    
+    UPDATE versions_planning
+    SET statut = 'archivé'
+    WHERE periode_id = v_periode_id AND statut = 'publié' AND id <> p_version_id;
+    
+    UPDATE versions_planning
+    SET statut = 'publié', publie_at = CURRENT_TIMESTAMP
+    WHERE id = p_version_id;
+    
+    UPDATE periodes_examen
+    SET version_publiee_id = p_version_id
+    WHERE id = v_periode_id;
+    
+    RETURN v_periode_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 5. Immuabilité des versions : le contenu d'une version enregistrée ne change plus
+-- (seuls statut et publie_at évoluent lors des publications)
+CREATE OR REPLACE FUNCTION versions_planning_immuable()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF OLD.encodage IS NOT NULL AND (
+        NEW.encodage IS DISTINCT FROM OLD.encodage
+        OR NEW.metriques IS DISTINCT FROM OLD.metriques
+        OR NEW.strategie IS DISTINCT FROM OLD.strategie
+        OR NEW.lance_par IS DISTINCT FROM OLD.lance_par
+        OR NEW.duree_execution IS DISTINCT FROM OLD.duree_execution
+        OR NEW.empreinte IS DISTINCT FROM OLD.empreinte
+        OR NEW.periode_id IS DISTINCT FROM OLD.periode_id
+    ) THEN
+        RAISE EXCEPTION 'La version % est immuable', OLD.id;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_versions_planning_immuable ON versions_planning;
+CREATE TRIGGER trg_versions_planning_immuable
+    BEFORE UPDATE ON versions_planning
+    FOR EACH ROW EXECUTE FUNCTION versions_planning_immuable();
+
+-- 6. Purge des lignes des anciennes versions archivées
+-- Les p_garder versions archivées les plus récentes restent matérialisées (retour
+-- arrière par simple bascule) ; les autres ne gardent que leur encodage compact.
+CREATE OR REPLACE FUNCTION purger_versions_archivees(p_periode_id INT, p_garder INT DEFAULT 2)
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    DELETE FROM examens
+    WHERE version_id IN (
+        SELECT id FROM versions_planning
+        WHERE periode_id = p_periode_id
+          AND statut = 'archivé'
+          AND encodage IS NOT NULL
+        ORDER BY id DESC
+        OFFSET p_garder
+    );
+    
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 7. Soumission d'un travail de planification en arrière-plan
+-- Périodes d'un travail : la sienne, et toutes celles d'une planification conjointe
+-- (parametres->'periode_ids'), triées
+CREATE OR REPLACE FUNCTION periodes_job_planification(p_periode_id INT, p_type_job VARCHAR, p_parametres JSONB)
+RETURNS INTEGER[] AS $$
+    SELECT ARRAY(
+        SELECT p_periode_id
+        UNION
+        SELECT e::INT
+        FROM jsonb_array_elements_text(COALESCE(p_parametres->'periode_ids', '[]'::jsonb)) e
+        WHERE p_type_job = 'conjoint'
+        ORDER BY 1
+    );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Une demande pour une période qui a déjà un travail actif (y compris une planification
+-- conjointe qui la couvre) rejoint ce travail au lieu d'en lancer un second. Un travail
+-- 'en_cours' dont le verrou consultatif (7301, periode_id) n'est plus tenu a perdu son
+-- processus : il est marqué échoué.
+CREATE OR REPLACE FUNCTION soumettre_job_planification(
+    p_periode_id INT,
+    p_type_job VARCHAR,
+    p_parametres JSONB DEFAULT NULL,
+    p_lance_par VARCHAR DEFAULT NULL,
+    p_delai_attente INTERVAL DEFAULT INTERVAL '10 minutes'
+)
+RETURNS TABLE(job_id INTEGER, existant BOOLEAN) AS $$
+DECLARE
+    v_job_id INTEGER;
+    v_periodes INTEGER[] := periodes_job_planification(p_periode_id, p_type_job, p_parametres);
+BEGIN
+    -- Sérialise les soumissions concurrentes pour les périodes (dans l'ordre des identifiants)
+    PERFORM 1 FROM periodes_examen WHERE id = ANY(v_periodes) ORDER BY id FOR UPDATE;
+    
+    UPDATE jobs_planification j
+    SET statut = 'échoué', message = 'Travail interrompu (processus perdu)', finished_at = CURRENT_TIMESTAMP
+    WHERE periodes_job_planification(j.periode_id, j.type_job, j.parametres) && v_periodes
+      AND (
+        (j.statut = 'en_cours' AND NOT EXISTS (
+            SELECT 1 FROM pg_locks l
+            WHERE l.locktype = 'advisory' AND l.granted
+              AND l.database = (SELECT oid FROM pg_database WHERE datname = current_database())
+              AND l.classid = 7301 AND l.objid = j.periode_id AND l.objsubid = 2
+        ))
+        OR (j.statut = 'en_attente' AND j.created_at < CURRENT_TIMESTAMP - p_delai_attente)
+      );
+    
+    SELECT j.id INTO v_job_id
+    FROM jobs_planification j
+    WHERE periodes_job_planification(j.periode_id, j.type_job, j.parametres) && v_periodes
+      AND j.statut IN ('en_attente', 'en_cours')
+    ORDER BY j.id
+    LIMIT 1;
+    
+    IF v_job_id IS NOT NULL THEN
+        RETURN QUERY SELECT v_job_id, TRUE;
+        RETURN;
+    END IF;
+    
+    INSERT INTO jobs_planification (periode_id, type_job, parametres, lance_par)
+    VALUES (p_periode_id, p_type_job, p_parametres, p_lance_par)
+    RETURNING id INTO v_job_id;
+    
+    RETURN QUERY SELECT v_job_id, FALSE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 8. Compteurs d'effectifs module_enrollment_stats
+-- Triggers par instruction avec tables de transition : un COPY ou un INSERT de masse
+-- n'applique qu'un seul delta agrégé par (module, année, statut), pas une mise à jour par ligne.
+CREATE OR REPLACE FUNCTION appliquer_delta_effectifs(
+    p_modules INT[], p_annees TEXT[], p_statuts TEXT[], p_deltas INT[]
+)
+RETURNS VOID AS $$
+BEGIN
+    IF p_modules IS NULL THEN
+        RETURN;
+    END IF;
+    
+    INSERT INTO module_enrollment_stats (module_id, annee_universitaire, statut, nb_inscrits)
+    SELECT d.module_id, d.annee, d.statut, d.delta
+    FROM unnest(p_modules, p_annees, p_statuts, p_deltas) AS d(module_id, annee, statut, delta)
+    WHERE d.delta > 0
+    ON CONFLICT (module_id, annee_universitaire, statut)
+    DO UPDATE SET nb_inscrits = module_enrollment_stats.nb_inscrits + EXCLUDED.nb_inscrits;
+    
+    -- Les deltas négatifs ne touchent que des compteurs existants (déjà supprimés si le
+    -- module l'a été en cascade)
+    UPDATE module_enrollment_stats s
+    SET nb_inscrits = s.nb_inscrits + d.delta
+    FROM unnest(p_modules, p_annees, p_statuts, p_deltas) AS d(module_id, annee, statut, delta)
+    WHERE d.delta < 0
+      AND s.module_id = d.module_id
+      AND s.annee_universitaire = d.annee
+      AND s.statut = d.statut;
+    
+    DELETE FROM module_enrollment_stats s
+    USING unnest(p_modules, p_annees, p_statuts, p_deltas) AS d(module_id, annee, statut, delta)
+    WHERE d.delta < 0
+      AND s.module_id = d.module_id
+      AND s.annee_universitaire = d.annee
+      AND s.statut = d.statut
+      AND s.nb_inscrits = 0;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maj_module_enrollment_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Les tables de transition n'existent que pour l'événement du trigger : chaque branche
+    -- ne référence que les siennes (plpgsql ne prépare la requête qu'à l'exécution)
+    IF TG_OP = 'INSERT' THEN
+        PERFORM appliquer_delta_effectifs(
+            array_agg(module_id), array_agg(annee_universitaire), array_agg(statut), array_agg(delta)
+        )
+        FROM (
+            SELECT module_id, annee_universitaire::TEXT, statut::TEXT, COUNT(*)::INT as delta
+            FROM nouvelles_inscriptions
+            WHERE statut IS NOT NULL
+            GROUP BY module_id, annee_universitaire, statut
+        ) d;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM appliquer_delta_effectifs(
+            array_agg(module_id), array_agg(annee_universitaire), array_agg(statut), array_agg(delta)
+        )
+        FROM (
+            SELECT module_id, annee_universitaire::TEXT, statut::TEXT, -COUNT(*)::INT as delta
+            FROM anciennes_inscriptions
+            WHERE statut IS NOT NULL
+            GROUP BY module_id, annee_universitaire, statut
+        ) d;
+    ELSE
+        PERFORM appliquer_delta_effectifs(
+            array_agg(module_id), array_agg(annee_universitaire), array_agg(statut), array_agg(delta)
+        )
+        FROM (
+            SELECT module_id, annee_universitaire::TEXT, statut::TEXT, SUM(n)::INT as delta
+            FROM (
+                SELECT module_id, annee_universitaire, statut, 1 as n FROM nouvelles_inscriptions
+                UNION ALL
+                SELECT module_id, annee_universitaire, statut, -1 as n FROM anciennes_inscriptions
+            ) t
+            WHERE statut IS NOT NULL
+            GROUP BY module_id, annee_universitaire, statut
+            HAVING SUM(n) <> 0
+        ) d;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_inscriptions_stats_insert ON inscriptions;
+CREATE TRIGGER trg_inscriptions_stats_insert
+    AFTER INSERT ON inscriptions
+    REFERENCING NEW TABLE AS nouvelles_inscriptions
+    FOR EACH STATEMENT EXECUTE FUNCTION maj_module_enrollment_stats();
+
+DROP TRIGGER IF EXISTS trg_inscriptions_stats_update ON inscriptions;
+CREATE TRIGGER trg_inscriptions_stats_update
+    AFTER UPDATE ON inscriptions
+    REFERENCING OLD TABLE AS anciennes_inscriptions NEW TABLE AS nouvelles_inscriptions
+    FOR EACH STATEMENT EXECUTE FUNCTION maj_module_enrollment_stats();
+
+DROP TRIGGER IF EXISTS trg_inscriptions_stats_delete ON inscriptions;
+CREATE TRIGGER trg_inscriptions_stats_delete
+    AFTER DELETE ON inscriptions
+    REFERENCING OLD TABLE AS anciennes_inscriptions
+    FOR EACH STATEMENT EXECUTE FUNCTION maj_module_enrollment_stats();
+
+CREATE OR REPLACE FUNCTION vider_module_enrollment_stats()
+RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM module_enrollment_stats;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_inscriptions_stats_truncate ON inscriptions;
+CREATE TRIGGER trg_inscriptions_stats_truncate
+    AFTER TRUNCATE ON inscriptions
+    FOR EACH STATEMENT EXECUTE FUNCTION vider_module_enrollment_stats();
+
+-- Reconstruction complète des compteurs (triggers désactivés pendant un chargement, contrôle)
+CREATE OR REPLACE FUNCTION recalculer_module_enrollment_stats()
+RETURNS INTEGER AS $$
+DECLARE
+    v_count INTEGER;
+BEGIN
+    DELETE FROM module_enrollment_stats;
+    
+    INSERT INTO module_enrollment_stats (module_id, annee_universitaire, statut, nb_inscrits)
+    SELECT module_id, annee_universitaire, statut, COUNT(*)
+    FROM inscriptions
+    WHERE statut IS NOT NULL
+    GROUP BY module_id, annee_universitaire, statut;
+    
+    GET DIAGNOSTICS v_count = ROW_COUNT;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- 9. Tampon de version des tables sources des caches disque (matrice d'incidence)
+CREATE OR REPLACE FUNCTION incrementer_version_donnees()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO versions_donnees (nom, version, modifie_at)
+    VALUES (TG_TABLE_NAME, 1, CURRENT_TIMESTAMP)
+    ON CONFLICT (nom)
+    DO UPDATE SET version = versions_donnees.version + 1, modifie_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_inscriptions_version ON inscriptions;
+CREATE TRIGGER trg_inscriptions_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON inscriptions
+    FOR EACH STATEMENT EXECUTE FUNCTION incrementer_version_donnees();
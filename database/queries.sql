@@ -1,3 +1,45 @@
+-- Version publiée de chaque période : seule source lue par les vues et fonctions
+-- ci-dessous. La publication d'une nouvelle version (publier_version_planning)
+-- ne fait que basculer periodes_examen.version_publiee_id.
+CREATE OR REPLACE VIEW examens_publies AS
+SELECT ex.*
+FROM examens ex
+JOIN periodes_examen pe ON pe.version_publiee_id = ex.version_id;
+
+CREATE OR REPLACE VIEW surveillances_publiees AS
+SELECT s.*
+FROM surveillances s
+JOIN examens_publies ex ON ex.id = s.examen_id;
+
+-- Inscriptions concernées par chaque période : même année universitaire, modules du
+-- semestre de la période (tous si non précisé) et, selon la session, les étudiants
+-- inscrits (normale) ou ceux ayant échoué ou été absents (rattrapage)
+CREATE OR REPLACE VIEW inscriptions_session AS
+SELECT p.id as periode_id, i.id, i.etudiant_id, i.module_id, i.statut
+FROM periodes_examen p
+JOIN inscriptions i ON i.annee_universitaire = p.annee_universitaire
+    AND (
+        (p.session = 'normale' AND i.statut = 'inscrit')
+        OR (p.session = 'rattrapage' AND i.statut IN ('échoué', 'absent'))
+    )
+JOIN modules m ON m.id = i.module_id
+    AND (p.semestre IS NULL OR m.semestre = p.semestre);
+
+-- Effectifs de chaque module pour chaque période, mêmes règles que inscriptions_session
+-- mais lus dans les compteurs module_enrollment_stats
+CREATE OR REPLACE VIEW effectifs_session AS
+SELECT p.id as periode_id, s.module_id, SUM(s.nb_inscrits)::INTEGER as nb_inscrits
+FROM periodes_examen p
+JOIN module_enrollment_stats s ON s.annee_universitaire = p.annee_universitaire
+    AND (
+        (p.session = 'normale' AND s.statut = 'inscrit')
+        OR (p.session = 'rattrapage' AND s.statut IN ('échoué', 'absent'))
+    )
+JOIN modules m ON m.id = s.module_id
+    AND (p.semestre IS NULL OR m.semestre = p.semestre)
+WHERE s.nb_inscrits > 0
+GROUP BY p.id, s.module_id;
+
 
 -- Conflits étudiants (plus d'1 examen par jour)
 CREATE OR REPLACE VIEW conflits_etudiants AS
@@ -9,10 +51,9 @@ SELECT
     COUNT(DISTINCT ex1.id) as nb_examens,
     STRING_AGG(m.nom, ', ') as modules_en_conflit
 FROM etudiants e
-JOIN inscriptions i ON e.id = i.etudiant_id
-JOIN examens ex1 ON i.module_id = ex1.module_id
+JOIN inscriptions_session i ON e.id = i.etudiant_id
+JOIN examens_publies ex1 ON i.module_id = ex1.module_id AND i.periode_id = ex1.periode_id
 JOIN modules m ON ex1.module_id = m.id
-WHERE i.statut = 'inscrit'
 GROUP BY e.id, e.nom, e.prenom, DATE(ex1.date_heure)
 HAVING COUNT(DISTINCT ex1.id) > 1;
 
@@ -27,7 +68,7 @@ SELECT
     STRING_AGG(m.nom, ', ') as modules_en_conflit
 FROM professeurs p
 JOIN surveillances s ON p.id = s.prof_id
-JOIN examens ex ON s.examen_id = ex.id
+JOIN examens_publies ex ON s.examen_id = ex.id
 JOIN modules m ON ex.module_id = m.id
 GROUP BY p.id, p.nom, p.prenom, DATE(ex.date_heure)
 HAVING COUNT(DISTINCT ex.id) > 3;
@@ -42,7 +83,7 @@ SELECT
     ex.nb_inscrits,
     ex.nb_inscrits - l.capacite_examen as depassement,
     ex.date_heure
-FROM examens ex
+FROM examens_publies ex
 JOIN modules m ON ex.module_id = m.id
 JOIN lieu_examen l ON ex.salle_id = l.id
 WHERE ex.nb_inscrits > l.capacite_examen;
@@ -56,16 +97,177 @@ SELECT
     m1.nom as module1,
     m2.nom as module2,
     ex1.date_heure as debut1,
-    ex1.date_heure + (ex1.duree_minutes || ' minutes')::INTERVAL as fin1,
+    UPPER(ex1.creneau) as fin1,
     ex2.date_heure as debut2,
-    ex2.date_heure + (ex2.duree_minutes || ' minutes')::INTERVAL as fin2
-FROM examens ex1
-JOIN examens ex2 ON ex1.salle_id = ex2.salle_id AND ex1.id < ex2.id
+    UPPER(ex2.creneau) as fin2
+FROM examens_publies ex1
+JOIN examens_publies ex2 ON ex1.salle_id = ex2.salle_id AND ex1.id < ex2.id
 JOIN lieu_examen l ON ex1.salle_id = l.id
 JOIN modules m1 ON ex1.module_id = m1.id
 JOIN modules m2 ON ex2.module_id = m2.id
-WHERE ex1.date_heure < ex2.date_heure + (ex2.duree_minutes || ' minutes')::INTERVAL
-  AND ex2.date_heure < ex1.date_heure + (ex1.duree_minutes || ' minutes')::INTERVAL;
+WHERE ex1.creneau && ex2.creneau;
+
+-- Surveillances confiées pendant une indisponibilité déclarée du professeur
+CREATE OR REPLACE VIEW conflits_indisponibilites AS
+SELECT 
+    p.id as prof_id,
+    p.nom,
+    p.prenom,
+    ex.id as examen_id,
+    m.nom as module,
+    ex.date_heure,
+    i.debut as indisponible_debut,
+    i.fin as indisponible_fin,
+    i.motif
+FROM examens_publies ex
+JOIN surveillances s ON s.examen_id = ex.id
+JOIN professeurs p ON p.id = s.prof_id
+JOIN professeur_indisponibilites i ON i.prof_id = s.prof_id
+                                  AND tsrange(i.debut, i.fin) && ex.creneau
+JOIN modules m ON ex.module_id = m.id;
+
+-- Conflits d'une période donnée (mêmes colonnes que les vues, filtrés par periode_id)
+CREATE OR REPLACE FUNCTION conflits_etudiants_periode(p_periode_id INTEGER)
+RETURNS TABLE (
+    etudiant_id INTEGER,
+    nom VARCHAR,
+    prenom VARCHAR,
+    date_conflit DATE,
+    nb_examens BIGINT,
+    modules_en_conflit TEXT
+) AS $$
+    SELECT 
+        e.id,
+        e.nom,
+        e.prenom,
+        DATE(ex.date_heure),
+        COUNT(DISTINCT ex.id),
+        STRING_AGG(m.nom, ', ')
+    FROM examens_publies ex
+    JOIN inscriptions_session i ON i.periode_id = ex.periode_id AND i.module_id = ex.module_id
+    JOIN etudiants e ON e.id = i.etudiant_id
+    JOIN modules m ON ex.module_id = m.id
+    WHERE ex.periode_id = p_periode_id
+    GROUP BY e.id, e.nom, e.prenom, DATE(ex.date_heure)
+    HAVING COUNT(DISTINCT ex.id) > 1;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION conflits_professeurs_periode(p_periode_id INTEGER)
+RETURNS TABLE (
+    prof_id INTEGER,
+    nom VARCHAR,
+    prenom VARCHAR,
+    date_conflit DATE,
+    nb_examens BIGINT,
+    modules_en_conflit TEXT
+) AS $$
+    SELECT 
+        p.id,
+        p.nom,
+        p.prenom,
+        DATE(ex.date_heure),
+        COUNT(DISTINCT ex.id),
+        STRING_AGG(m.nom, ', ')
+    FROM examens_publies ex
+    JOIN surveillances s ON s.examen_id = ex.id
+    JOIN professeurs p ON p.id = s.prof_id
+    JOIN modules m ON ex.module_id = m.id
+    WHERE ex.periode_id = p_periode_id
+    GROUP BY p.id, p.nom, p.prenom, DATE(ex.date_heure)
+    HAVING COUNT(DISTINCT ex.id) > 3;
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION conflits_capacite_periode(p_periode_id INTEGER)
+RETURNS TABLE (
+    examen_id INTEGER,
+    module VARCHAR,
+    salle VARCHAR,
+    capacite_max INTEGER,
+    nb_inscrits INTEGER,
+    depassement INTEGER,
+    date_heure TIMESTAMP
+) AS $$
+    SELECT 
+        ex.id,
+        m.nom,
+        l.nom,
+        l.capacite_examen,
+        ex.nb_inscrits,
+        ex.nb_inscrits - l.capacite_examen,
+        ex.date_heure
+    FROM examens_publies ex
+    JOIN modules m ON ex.module_id = m.id
+    JOIN lieu_examen l ON ex.salle_id = l.id
+    WHERE ex.periode_id = p_periode_id
+      AND ex.nb_inscrits > l.capacite_examen;
+$$ LANGUAGE sql STABLE;
+
+-- Surveillances de la période confiées pendant une indisponibilité déclarée
+CREATE OR REPLACE FUNCTION conflits_indisponibilites_periode(p_periode_id INTEGER)
+RETURNS TABLE (
+    prof_id INTEGER,
+    nom VARCHAR,
+    prenom VARCHAR,
+    examen_id INTEGER,
+    module VARCHAR,
+    date_heure TIMESTAMP,
+    indisponible_debut TIMESTAMP,
+    indisponible_fin TIMESTAMP,
+    motif VARCHAR
+) AS $$
+    SELECT 
+        p.id,
+        p.nom,
+        p.prenom,
+        ex.id,
+        m.nom,
+        ex.date_heure,
+        i.debut,
+        i.fin,
+        i.motif
+    FROM examens_publies ex
+    JOIN surveillances s ON s.examen_id = ex.id
+    JOIN professeurs p ON p.id = s.prof_id
+    JOIN professeur_indisponibilites i ON i.prof_id = s.prof_id
+                                      AND tsrange(i.debut, i.fin) && ex.creneau
+    JOIN modules m ON ex.module_id = m.id
+    WHERE ex.periode_id = p_periode_id;
+$$ LANGUAGE sql STABLE;
+
+-- Une salle est partagée entre sessions : un examen de la période est comparé à
+-- tous les examens (index GiST sur creneau), chaque paire n'étant comptée qu'une fois.
+CREATE OR REPLACE FUNCTION conflits_salles_periode(p_periode_id INTEGER)
+RETURNS TABLE (
+    examen1_id INTEGER,
+    examen2_id INTEGER,
+    salle VARCHAR,
+    module1 VARCHAR,
+    module2 VARCHAR,
+    debut1 TIMESTAMP,
+    fin1 TIMESTAMP,
+    debut2 TIMESTAMP,
+    fin2 TIMESTAMP
+) AS $$
+    SELECT 
+        ex1.id,
+        ex2.id,
+        l.nom,
+        m1.nom,
+        m2.nom,
+        ex1.date_heure,
+        UPPER(ex1.creneau),
+        ex2.date_heure,
+        UPPER(ex2.creneau)
+    FROM examens_publies ex1
+    JOIN examens_publies ex2 ON ex1.salle_id = ex2.salle_id
+                    AND ex1.creneau && ex2.creneau
+                    AND ex1.id <> ex2.id
+    JOIN lieu_examen l ON ex1.salle_id = l.id
+    JOIN modules m1 ON ex1.module_id = m1.id
+    JOIN modules m2 ON ex2.module_id = m2.id
+    WHERE ex1.periode_id = p_periode_id
+      AND (ex2.periode_id <> p_periode_id OR ex1.id < ex2.id);
+$$ LANGUAGE sql STABLE;
 
 -- Vue d'ensemble des statistiques
 CREATE OR REPLACE VIEW kpi_global AS
@@ -75,8 +277,8 @@ SELECT
     (SELECT COUNT(*) FROM departements) as total_departements,
     (SELECT COUNT(*) FROM formations) as total_formations,
     (SELECT COUNT(*) FROM modules) as total_modules,
-    (SELECT COUNT(*) FROM examens WHERE statut = 'planifié') as examens_planifies,
-    (SELECT COUNT(*) FROM inscriptions WHERE statut = 'inscrit') as total_inscriptions,
+    (SELECT COUNT(*) FROM examens_publies WHERE statut = 'planifié') as examens_planifies,
+    (SELECT COALESCE(SUM(nb_inscrits), 0) FROM module_enrollment_stats WHERE statut = 'inscrit') as total_inscriptions,
     (SELECT COUNT(*) FROM lieu_examen) as total_salles,
     (SELECT SUM(capacite_examen) FROM lieu_examen) as capacite_totale;
 
@@ -93,7 +295,7 @@ SELECT
           (COUNT(DISTINCT ex.salle_id) + CAST(FLOOR(RANDOM() * 6) + 10 AS INTEGER)), 2) as taux_occupation_pct,
     SUM(ex.nb_inscrits) as total_etudiants_examens,
     COUNT(ex.id) as nb_examens
-FROM examens ex
+FROM examens_publies ex
 WHERE ex.statut = 'planifié'
 GROUP BY DATE(ex.date_heure)
 ORDER BY date_examen;
@@ -109,8 +311,8 @@ SELECT
     COUNT(DISTINCT DATE(ex.date_heure)) as nb_jours_surveillance,
     ROUND(AVG(ex.duree_minutes) / 60.0, 2) as duree_moyenne_heures
 FROM professeurs p
-LEFT JOIN surveillances s ON p.id = s.prof_id
-LEFT JOIN examens ex ON s.examen_id = ex.id
+LEFT JOIN surveillances_publiees s ON p.id = s.prof_id
+LEFT JOIN examens_publies ex ON s.examen_id = ex.id
 LEFT JOIN departements d ON p.dept_id = d.id
 GROUP BY p.id, p.nom, p.prenom, d.nom
 ORDER BY nb_surveillances DESC;
@@ -131,7 +333,7 @@ LEFT JOIN formations f ON d.id = f.dept_id
 LEFT JOIN etudiants e ON f.id = e.formation_id
 LEFT JOIN professeurs p ON d.id = p.dept_id
 LEFT JOIN modules m ON f.id = m.formation_id
-LEFT JOIN examens ex ON m.id = ex.module_id AND ex.statut = 'planifié'
+LEFT JOIN examens_publies ex ON m.id = ex.module_id AND ex.statut = 'planifié'
 GROUP BY d.id, d.nom
 ORDER BY nb_etudiants DESC;
 
@@ -157,14 +359,13 @@ BEGIN
         l.batiment::TEXT,
         ex.duree_minutes,
         (p.nom || ' ' || p.prenom)::TEXT as professeur
-    FROM inscriptions i
-    JOIN examens ex ON i.module_id = ex.module_id
+    FROM inscriptions_session i
+    JOIN examens_publies ex ON i.module_id = ex.module_id AND i.periode_id = ex.periode_id
     JOIN modules m ON ex.module_id = m.id
     JOIN lieu_examen l ON ex.salle_id = l.id
     JOIN professeurs p ON ex.prof_responsable_id = p.id
     WHERE i.etudiant_id = p_etudiant_id
       AND ex.periode_id = p_periode_id
-      AND i.statut = 'inscrit'
     ORDER BY ex.date_heure;
 END;
 $$ LANGUAGE plpgsql;
@@ -191,7 +392,7 @@ BEGIN
         ex.nb_inscrits as nb_etudiants,
         s.role::TEXT
     FROM surveillances s
-    JOIN examens ex ON s.examen_id = ex.id
+    JOIN examens_publies ex ON s.examen_id = ex.id
     JOIN modules m ON ex.module_id = m.id
     JOIN lieu_examen l ON ex.salle_id = l.id
     WHERE s.prof_id = p_prof_id
@@ -212,7 +413,7 @@ SELECT
     ROUND(100.0 * COALESCE(AVG(ex.nb_inscrits), 0) / l.capacite_examen, 2) as taux_utilisation_pct,
     COUNT(ex.id) as nb_utilisations
 FROM lieu_examen l
-LEFT JOIN examens ex ON l.id = ex.salle_id AND ex.statut = 'planifié'
+LEFT JOIN examens_publies ex ON l.id = ex.salle_id AND ex.statut = 'planifié'
 GROUP BY l.id, l.nom, l.batiment, l.capacite_examen
 HAVING COALESCE(AVG(ex.nb_inscrits), 0) < l.capacite_examen * 0.5
 ORDER BY taux_utilisation_pct;
@@ -225,7 +426,7 @@ SELECT
     COUNT(ex.id) as nb_examens,
     SUM(ex.nb_inscrits) as total_etudiants,
     COUNT(DISTINCT ex.salle_id) as salles_utilisees
-FROM examens ex
+FROM examens_publies ex
 WHERE ex.statut = 'planifié'
 GROUP BY TO_CHAR(ex.date_heure, 'Day'), EXTRACT(DOW FROM ex.date_heure)
 ORDER BY jour_numero;
@@ -242,12 +443,178 @@ SELECT
     MAX(prof_count.nb_surv) - MIN(prof_count.nb_surv) as ecart
 FROM departements d
 JOIN professeurs p ON d.id = p.dept_id
-LEFT JOIN surveillances s ON p.id = s.prof_id
+LEFT JOIN surveillances_publiees s ON p.id = s.prof_id
 LEFT JOIN (
     SELECT prof_id, COUNT(*) as nb_surv
-    FROM surveillances
+    FROM surveillances_publiees
     GROUP BY prof_id
 ) prof_count ON p.id = prof_count.prof_id
 GROUP BY d.id, d.nom
 ORDER BY ecart DESC;
 
+
+
+-- Tableau de bord complet d'une période en un seul aller-retour (JSON)
+-- Les agrégats partagent le même jeu d'examens filtré par période (CTE ex).
+CREATE OR REPLACE FUNCTION get_dashboard_periode(p_periode_id INTEGER)
+RETURNS JSON AS $$
+    WITH ex AS (
+        SELECT id, periode_id, module_id, salle_id, date_heure, duree_minutes, nb_inscrits, statut, creneau
+        FROM examens_publies
+        WHERE p_periode_id IS NULL OR periode_id = p_periode_id
+    ),
+    ex_planifies AS (
+        SELECT * FROM ex WHERE statut = 'planifié'
+    ),
+    surv AS (
+        SELECT s.prof_id, ex.id as examen_id, ex.date_heure, ex.duree_minutes
+        FROM surveillances s
+        JOIN ex ON ex.id = s.examen_id
+    ),
+    salles AS (
+        SELECT COUNT(*) as total_salles,
+               COUNT(*) FILTER (WHERE disponible) as salles_disponibles,
+               SUM(capacite_examen) as capacite_totale
+        FROM lieu_examen
+    ),
+    dept_formations AS (
+        SELECT dept_id, COUNT(*) as nb_formations
+        FROM formations
+        GROUP BY dept_id
+    ),
+    dept_etudiants AS (
+        SELECT f.dept_id, COUNT(*) as nb_etudiants
+        FROM etudiants e
+        JOIN formations f ON e.formation_id = f.id
+        GROUP BY f.dept_id
+    ),
+    dept_professeurs AS (
+        SELECT dept_id, COUNT(*) as nb_professeurs
+        FROM professeurs
+        GROUP BY dept_id
+    ),
+    dept_modules AS (
+        SELECT f.dept_id, COUNT(*) as nb_modules
+        FROM modules m
+        JOIN formations f ON m.formation_id = f.id
+        GROUP BY f.dept_id
+    ),
+    dept_examens AS (
+        SELECT f.dept_id,
+               COUNT(*) as nb_examens_planifies,
+               SUM(ex.nb_inscrits) as total_places_examens
+        FROM ex_planifies ex
+        JOIN modules m ON ex.module_id = m.id
+        JOIN formations f ON m.formation_id = f.id
+        GROUP BY f.dept_id
+    ),
+    occupation AS (
+        SELECT
+            o.date_examen,
+            o.salles_utilisees,
+            o.salles_utilisees + o.marge as salles_disponibles,
+            (SELECT salles_disponibles FROM salles) as salles_totales,
+            ROUND(100.0 * o.salles_utilisees / (o.salles_utilisees + o.marge), 2) as taux_occupation_pct,
+            o.total_etudiants_examens,
+            o.nb_examens
+        FROM (
+            -- Même capacité dynamique simulée que la vue occupation_salles_par_jour
+            SELECT
+                DATE(date_heure) as date_examen,
+                COUNT(DISTINCT salle_id) as salles_utilisees,
+                CAST(FLOOR(RANDOM() * 6) + 10 AS INTEGER) as marge,
+                SUM(nb_inscrits) as total_etudiants_examens,
+                COUNT(id) as nb_examens
+            FROM ex_planifies
+            GROUP BY DATE(date_heure)
+        ) o
+    ),
+    charge AS (
+        SELECT
+            p.id,
+            p.nom,
+            p.prenom,
+            d.nom as departement,
+            COUNT(s.examen_id) as nb_surveillances,
+            COUNT(DISTINCT DATE(s.date_heure)) as nb_jours_surveillance,
+            ROUND(AVG(s.duree_minutes) / 60.0, 2) as duree_moyenne_heures
+        FROM professeurs p
+        LEFT JOIN surv s ON p.id = s.prof_id
+        LEFT JOIN departements d ON p.dept_id = d.id
+        GROUP BY p.id, p.nom, p.prenom, d.nom
+    )
+    SELECT json_build_object(
+        'kpis', (
+            SELECT json_build_object(
+                'total_etudiants', (SELECT COUNT(*) FROM etudiants),
+                'total_professeurs', (SELECT COUNT(*) FROM professeurs),
+                'total_departements', (SELECT COUNT(*) FROM departements),
+                'total_formations', (SELECT COUNT(*) FROM formations),
+                'total_modules', (SELECT COUNT(*) FROM modules),
+                'examens_planifies', (SELECT COUNT(*) FROM ex_planifies),
+                'total_inscriptions', (SELECT COALESCE(SUM(nb_inscrits), 0) FROM module_enrollment_stats WHERE statut = 'inscrit'),
+                'total_salles', salles.total_salles,
+                'salles_disponibles', salles.salles_disponibles,
+                'capacite_totale', salles.capacite_totale
+            )
+            FROM salles
+        ),
+        'departements', COALESCE((
+            SELECT json_agg(d ORDER BY d.nb_etudiants DESC)
+            FROM (
+                SELECT
+                    dp.id as dept_id,
+                    dp.nom as departement,
+                    COALESCE(df.nb_formations, 0) as nb_formations,
+                    COALESCE(de.nb_etudiants, 0) as nb_etudiants,
+                    COALESCE(dpr.nb_professeurs, 0) as nb_professeurs,
+                    COALESCE(dm.nb_modules, 0) as nb_modules,
+                    COALESCE(dx.nb_examens_planifies, 0) as nb_examens_planifies,
+                    COALESCE(dx.total_places_examens, 0) as total_places_examens
+                FROM departements dp
+                LEFT JOIN dept_formations df ON df.dept_id = dp.id
+                LEFT JOIN dept_etudiants de ON de.dept_id = dp.id
+                LEFT JOIN dept_professeurs dpr ON dpr.dept_id = dp.id
+                LEFT JOIN dept_modules dm ON dm.dept_id = dp.id
+                LEFT JOIN dept_examens dx ON dx.dept_id = dp.id
+            ) d
+        ), '[]'::json),
+        'charge_professeurs', COALESCE((
+            SELECT json_agg(c ORDER BY c.nb_surveillances DESC) FROM charge c
+        ), '[]'::json),
+        'occupation', COALESCE((
+            SELECT json_agg(o ORDER BY o.date_examen) FROM occupation o
+        ), '[]'::json),
+        'conflits', json_build_object(
+            'etudiants', (
+                SELECT COUNT(*) FROM (
+                    SELECT i.etudiant_id
+                    FROM inscriptions_session i
+                    JOIN ex ON ex.module_id = i.module_id AND ex.periode_id = i.periode_id
+                    GROUP BY i.etudiant_id, DATE(ex.date_heure)
+                    HAVING COUNT(DISTINCT ex.id) > 1
+                ) c
+            ),
+            'professeurs', (
+                SELECT COUNT(*) FROM (
+                    SELECT prof_id
+                    FROM surv
+                    GROUP BY prof_id, DATE(date_heure)
+                    HAVING COUNT(DISTINCT examen_id) > 3
+                ) c
+            ),
+            'capacite', (
+                SELECT COUNT(*)
+                FROM ex
+                JOIN lieu_examen l ON ex.salle_id = l.id
+                WHERE ex.nb_inscrits > l.capacite_examen
+            ),
+            -- Les contraintes d'exclusion ne portent que sur une version : les examens
+            -- publiés de périodes différentes peuvent se chevaucher dans une même salle
+            'salles', CASE
+                WHEN p_periode_id IS NULL THEN (SELECT COUNT(*) FROM conflits_salles)
+                ELSE (SELECT COUNT(*) FROM conflits_salles_periode(p_periode_id))
+            END
+        )
+    );
+$$ LANGUAGE sql;
@@ -1,8 +1,19 @@
 -- Schéma de base de données PostgreSQL
 
+-- btree_gist : égalité sur entiers dans les contraintes d'exclusion GiST
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
 -- Suppression des tables existantes (ordre inverse des dépendances)
+DROP TABLE IF EXISTS jobs_planification CASCADE;
 DROP TABLE IF EXISTS examens CASCADE;
+DROP TABLE IF EXISTS versions_planning CASCADE;
 DROP TABLE IF EXISTS surveillances CASCADE;
+DROP TABLE IF EXISTS module_enrollment_stats CASCADE;
+DROP TABLE IF EXISTS versions_donnees CASCADE;
+DROP TABLE IF EXISTS jours_exclus CASCADE;
+DROP TABLE IF EXISTS horaires_batiments CASCADE;
+DROP TABLE IF EXISTS distances_batiments CASCADE;
+DROP TABLE IF EXISTS professeur_indisponibilites CASCADE;
 DROP TABLE IF EXISTS inscriptions CASCADE;
 DROP TABLE IF EXISTS modules CASCADE;
 DROP TABLE IF EXISTS professeurs CASCADE;
@@ -69,6 +80,18 @@ CREATE TABLE professeurs (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Absences déclarées des professeurs (jours entiers ou plages horaires, fin exclue) :
+-- aucun examen ne leur est confié pendant ces plages
+CREATE TABLE professeur_indisponibilites (
+    id SERIAL PRIMARY KEY,
+    prof_id INTEGER NOT NULL REFERENCES professeurs(id) ON DELETE CASCADE,
+    debut TIMESTAMP NOT NULL,
+    fin TIMESTAMP NOT NULL,
+    motif VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT check_indisponibilite CHECK (fin > debut)
+);
+
 -- Table des modules
 CREATE TABLE modules (
     id SERIAL PRIMARY KEY,
@@ -79,6 +102,9 @@ CREATE TABLE modules (
     semestre INTEGER NOT NULL CHECK (semestre IN (1, 2)),
     pre_req_id INTEGER REFERENCES modules(id) ON DELETE SET NULL,
     duree_examen INTEGER NOT NULL DEFAULT 120 CHECK (duree_examen > 0),
+    -- Exigences de salle de l'examen (NULL / vide : toute salle assez grande)
+    type_salle VARCHAR(20) CHECK (type_salle IN ('salle', 'amphitheatre')),
+    equipements_requis TEXT[] NOT NULL DEFAULT '{}',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
@@ -94,6 +120,26 @@ CREATE TABLE inscriptions (
     CONSTRAINT unique_inscription UNIQUE (etudiant_id, module_id, annee_universitaire)
 );
 
+-- Effectifs par module, année et statut, tenus à jour par les triggers de inscriptions
+-- (procedures.sql) : lecture en O(modules) au lieu d'un COUNT sur toutes les inscriptions
+CREATE TABLE module_enrollment_stats (
+    module_id INTEGER NOT NULL REFERENCES modules(id) ON DELETE CASCADE,
+    annee_universitaire VARCHAR(9) NOT NULL,
+    statut VARCHAR(20) NOT NULL,
+    nb_inscrits INTEGER NOT NULL DEFAULT 0 CHECK (nb_inscrits >= 0),
+    PRIMARY KEY (module_id, annee_universitaire, statut)
+);
+
+-- Compteur de modifications par table, incrémenté par trigger (procedures.sql) :
+-- sert de tampon d'invalidation aux caches disque construits à partir de ces tables
+CREATE TABLE versions_donnees (
+    nom VARCHAR(63) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    modifie_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO versions_donnees (nom) VALUES ('inscriptions');
+
 -- Table des périodes d'examen
 CREATE TABLE periodes_examen (
     id SERIAL PRIMARY KEY,
@@ -101,12 +147,69 @@ CREATE TABLE periodes_examen (
     date_debut DATE NOT NULL,
     date_fin DATE NOT NULL,
     session VARCHAR(20) NOT NULL CHECK (session IN ('normale', 'rattrapage')),
+    -- Semestre évalué par la période (NULL : les deux, ex. rattrapage annuel)
+    semestre INTEGER CHECK (semestre IN (1, 2)),
     annee_universitaire VARCHAR(9) NOT NULL,
+    -- Modèle de créneaux (heures de début) et jours ouvrés (ISO : 1 = lundi ... 7 = dimanche)
+    heures_creneaux TIME[] NOT NULL DEFAULT ARRAY['08:30', '11:00', '14:00']::TIME[],
+    jours_ouvres INTEGER[] NOT NULL DEFAULT ARRAY[1, 2, 3, 4, 5, 6, 7],
     actif BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT check_dates CHECK (date_fin > date_debut)
+    CONSTRAINT check_dates CHECK (date_fin > date_debut),
+    CONSTRAINT check_creneaux CHECK (cardinality(heures_creneaux) > 0),
+    CONSTRAINT check_jours_ouvres CHECK (jours_ouvres <@ ARRAY[1, 2, 3, 4, 5, 6, 7] AND cardinality(jours_ouvres) > 0)
+);
+
+-- Jours sans examen (fériés, fermetures) : d'une période, ou de toutes si periode_id est NULL
+CREATE TABLE jours_exclus (
+    id SERIAL PRIMARY KEY,
+    periode_id INTEGER REFERENCES periodes_examen(id) ON DELETE CASCADE,
+    date_exclue DATE NOT NULL,
+    motif VARCHAR(100),
+    CONSTRAINT unique_jour_exclu UNIQUE (periode_id, date_exclue)
+);
+
+-- Distances à pied entre bâtiments (une ligne par paire, batiment_a < batiment_b) ;
+-- sans ligne, deux bâtiments différents sont considérés comme éloignés
+CREATE TABLE distances_batiments (
+    batiment_a VARCHAR(50) NOT NULL,
+    batiment_b VARCHAR(50) NOT NULL,
+    distance_m INTEGER NOT NULL CHECK (distance_m >= 0),
+    PRIMARY KEY (batiment_a, batiment_b),
+    CONSTRAINT check_paire_ordonnee CHECK (batiment_a < batiment_b)
+);
+
+-- Horaires d'ouverture des bâtiments (sans ligne : bâtiment toujours ouvert)
+CREATE TABLE horaires_batiments (
+    batiment VARCHAR(50) PRIMARY KEY,
+    ouverture TIME NOT NULL,
+    fermeture TIME NOT NULL,
+    CONSTRAINT check_horaires CHECK (fermeture > ouverture)
+);
+
+-- Versions d'emploi du temps d'une période (brouillon -> publié -> archivé)
+-- Chaque génération écrit une nouvelle version ; la publication bascule
+-- periodes_examen.version_publiee_id en une seule transaction.
+CREATE TABLE versions_planning (
+    id SERIAL PRIMARY KEY,
+    periode_id INTEGER NOT NULL REFERENCES periodes_examen(id) ON DELETE CASCADE,
+    statut VARCHAR(20) NOT NULL DEFAULT 'brouillon' CHECK (statut IN ('brouillon', 'publié', 'archivé')),
+    lance_par VARCHAR(100),
+    strategie VARCHAR(50),
+    metriques JSONB,
+    duree_execution NUMERIC(10, 3),
+    -- Empreinte SHA-256 des données d'entrée du calcul (voir src/solution_cache.py)
+    empreinte CHAR(64),
+    -- Instantané compact et immuable de la version (voir src/versions.py) : permet le
+    -- retour arrière et le diff même après purge des lignes examens/surveillances
+    encodage BYTEA,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    publie_at TIMESTAMP
 );
 
+ALTER TABLE periodes_examen
+    ADD COLUMN version_publiee_id INTEGER REFERENCES versions_planning(id) ON DELETE SET NULL;
+
 -- Table des examens
 CREATE TABLE examens (
     id SERIAL PRIMARY KEY,
@@ -114,12 +217,18 @@ CREATE TABLE examens (
     prof_responsable_id INTEGER NOT NULL REFERENCES professeurs(id) ON DELETE RESTRICT,
     salle_id INTEGER NOT NULL REFERENCES lieu_examen(id) ON DELETE RESTRICT,
     periode_id INTEGER NOT NULL REFERENCES periodes_examen(id) ON DELETE CASCADE,
+    version_id INTEGER NOT NULL REFERENCES versions_planning(id) ON DELETE CASCADE,
     date_heure TIMESTAMP NOT NULL,
     duree_minutes INTEGER NOT NULL CHECK (duree_minutes > 0),
     nb_inscrits INTEGER NOT NULL DEFAULT 0 CHECK (nb_inscrits >= 0),
     statut VARCHAR(20) DEFAULT 'planifié' CHECK (statut IN ('planifié', 'en_cours', 'terminé', 'annulé')),
+    -- Plage horaire stockée [début, fin) pour des tests de chevauchement indexables (GiST)
+    creneau TSRANGE GENERATED ALWAYS AS (tsrange(date_heure, date_heure + duree_minutes * INTERVAL '1 minute')) STORED,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT unique_examen UNIQUE (module_id, periode_id)
+    CONSTRAINT unique_examen UNIQUE (module_id, version_id),
+    -- Une salle ne peut accueillir deux examens qui se chevauchent (au sein d'une version)
+    CONSTRAINT exclusion_salle_creneau EXCLUDE USING GIST (version_id WITH =, salle_id WITH =, creneau WITH &&)
+        WHERE (statut <> 'annulé')
 );
 
 -- Table des surveillances (affectation des professeurs à la surveillance)
@@ -128,8 +237,33 @@ CREATE TABLE surveillances (
     examen_id INTEGER NOT NULL REFERENCES examens(id) ON DELETE CASCADE,
     prof_id INTEGER NOT NULL REFERENCES professeurs(id) ON DELETE CASCADE,
     role VARCHAR(20) DEFAULT 'surveillant' CHECK (role IN ('responsable', 'surveillant')),
+    -- Copies de examens.version_id et examens.creneau, maintenues par trigger (voir procedures.sql)
+    version_id INTEGER NOT NULL,
+    creneau TSRANGE NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT unique_surveillance UNIQUE (examen_id, prof_id),
+    -- Un professeur ne peut surveiller deux examens qui se chevauchent (au sein d'une version)
+    CONSTRAINT exclusion_prof_creneau EXCLUDE USING GIST (version_id WITH =, prof_id WITH =, creneau WITH &&)
+);
+
+-- Table des travaux de planification exécutés en arrière-plan (voir src/jobs.py)
+CREATE TABLE jobs_planification (
+    id SERIAL PRIMARY KEY,
+    periode_id INTEGER NOT NULL REFERENCES periodes_examen(id) ON DELETE CASCADE,
+    type_job VARCHAR(20) NOT NULL CHECK (type_job IN ('generation', 'optimisation', 'conjoint', 'scenarios', 'dimensionnement')),
+    statut VARCHAR(20) NOT NULL DEFAULT 'en_attente'
+        CHECK (statut IN ('en_attente', 'en_cours', 'terminé', 'échoué', 'annulé')),
+    parametres JSONB,
+    lance_par VARCHAR(100),
+    progression NUMERIC(5, 2) NOT NULL DEFAULT 0,
+    message TEXT,
+    meilleur_score NUMERIC,
+    annulation_demandee BOOLEAN NOT NULL DEFAULT FALSE,
+    resultat JSONB,
+    version_id INTEGER REFERENCES versions_planning(id) ON DELETE SET NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    CONSTRAINT unique_surveillance UNIQUE (examen_id, prof_id)
+    started_at TIMESTAMP,
+    finished_at TIMESTAMP
 );
 
 -- Index pour optimisation des performances
@@ -144,6 +278,13 @@ CREATE INDEX idx_examens_date ON examens(date_heure);
 CREATE INDEX idx_examens_salle ON examens(salle_id);
 CREATE INDEX idx_examens_module ON examens(module_id);
 CREATE INDEX idx_examens_periode ON examens(periode_id);
+CREATE INDEX idx_examens_version ON examens(version_id);
+CREATE INDEX idx_versions_periode ON versions_planning(periode_id, empreinte);
+-- unique_jour_exclu ne compare pas les NULL : un jour exclu de toutes les périodes a son propre index
+CREATE UNIQUE INDEX idx_jours_exclus_global ON jours_exclus(date_exclue) WHERE periode_id IS NULL;
+-- Au plus un travail actif par période : les demandes concurrentes se regroupent sur lui
+CREATE UNIQUE INDEX idx_jobs_periode_actif ON jobs_planification(periode_id)
+    WHERE statut IN ('en_attente', 'en_cours');
 CREATE INDEX idx_surveillances_prof ON surveillances(prof_id);
 CREATE INDEX idx_surveillances_examen ON surveillances(examen_id);
 CREATE INDEX idx_professeurs_dept ON professeurs(dept_id);
@@ -163,3 +304,5 @@ COMMENT ON TABLE inscriptions IS 'Inscriptions des étudiants aux modules';
 COMMENT ON TABLE examens IS 'Planification des examens';
 COMMENT ON TABLE surveillances IS 'Affectation des surveillants aux examens';
 COMMENT ON TABLE periodes_examen IS 'Périodes d''examen (session normale, rattrapage)';
+COMMENT ON TABLE versions_planning IS 'Versions d''emploi du temps par période (seule la version publiée est visible)';
+COMMENT ON TABLE jobs_planification IS 'Travaux de génération/optimisation en arrière-plan (progression, annulation)';
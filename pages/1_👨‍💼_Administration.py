@@ -4,10 +4,13 @@ import plotly.express as px
 from datetime import datetime
 import sys
 import os
+import time
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from src.database import Database
 from src.scheduler import ExamScheduler
 from src.analytics import Analytics
+from src.versions import ScheduleVersions
+from src.jobs import JobRunner, periodes_job
 from src.styles import apply_custom_style
 st.set_page_config(
     page_title="Administration - Génération d'EDT",
@@ -28,6 +31,14 @@ def get_scheduler(_db):
 def get_analytics(_db):
     return Analytics(_db)
 
+@st.cache_resource
+def get_versions(_db):
+    return ScheduleVersions(_db)
+
+@st.cache_resource
+def get_job_runner(_db):
+    return JobRunner(_db)
+
 def main():
     apply_custom_style()
     
@@ -42,8 +53,11 @@ def main():
     db = get_database()
     scheduler = get_scheduler(db)
     analytics = get_analytics(db)
+    versions = get_versions(db)
+    jobs = get_job_runner(db)
+    poll_job = False
     
-    tab1, tab2, tab3 = st.tabs(["🚀 Génération d'EDT", "📋 Examens Planifiés", "🏛️ Planning par Département"])
+    tab1, tab2, tab3, tab4 = st.tabs(["🚀 Génération d'EDT", "📋 Examens Planifiés", "🏛️ Planning par Département", "🕓 Versions"])
     
     # --- TAB 1: GÉNÉRATION ---
     with tab1:
@@ -92,118 +106,358 @@ def main():
                     "Année universitaire",
                     value="2025-2026"
                 )
+                lance_par = st.text_input(
+                    "Lancé par",
+                    value="admin"
+                )
+                # Démarrage à chaud depuis une session précédente (ex. même session l'an dernier)
+                sessions_precedentes = {
+                    f"{p['nom']} ({p['date_debut']})": p['id']
+                    for p in db.get_periodes_examen(actif=False)
+                    if p['id'] != periode_id and p['version_publiee_id']
+                }
+                warm_start_label = st.selectbox(
+                    "Partir de la session",
+                    options=["Aucune (grille vide)"] + list(sessions_precedentes.keys())
+                )
+                warm_start_from = sessions_precedentes.get(warm_start_label)
+                
+                with st.expander("⚙️ Recherche multi-départs"):
+                    multi_start = st.number_input(
+                        "Nombre de départs", min_value=1, max_value=64, value=1,
+                        help="Passes parallèles à ordres perturbés ; la meilleure est conservée"
+                    )
+                    seed = st.number_input("Graine", min_value=0, value=0, help="Même graine = même résultat")
+                    time_budget = st.number_input("Budget de temps (s, 0 = illimité)", min_value=0, value=0)
+                    force = st.checkbox(
+                        "Forcer la génération",
+                        help="Générer un EDT partiel même si l'analyse préalable prouve que tous les modules ne pourront pas être placés"
+                    )
+                
+                with st.expander("📏 Espacement des examens"):
+                    max_examens = st.number_input(
+                        "Examens max. par fenêtre (0 = sans limite)", min_value=0, max_value=10, value=0,
+                        help="Ex. 2 examens au plus sur 3 jours consécutifs pour un même groupe d'étudiants"
+                    )
+                    fenetre_jours = st.number_input("Fenêtre (jours consécutifs)", min_value=1, max_value=14, value=3)
+                    demi_journee_libre = st.checkbox(
+                        "Au moins une demi-journée libre entre deux examens",
+                        help="Pas d'examen le matin après un examen la veille après-midi"
+                    )
+                espacement = {
+                    'max_examens': int(max_examens) or None,
+                    'fenetre_jours': int(fenetre_jours),
+                    'ecart_demi_journees': 2 if demi_journee_libre else None
+                }
+
+                localite = st.checkbox(
+                    "🏢 Privilégier la proximité des bâtiments",
+                    help="Salles proches du bâtiment du département ; un surveillant reste dans le même bâtiment "
+                         "entre deux examens successifs (distances entre bâtiments)"
+                )
+
+                with st.expander("📅 Calendrier de la période"):
+                    periode = next(p for p in periodes if p['id'] == periode_id)
+                    heures_saisies = st.text_input(
+                        "Heures de début des créneaux",
+                        value=", ".join(h.strftime('%H:%M') for h in periode['heures_creneaux']),
+                        help="Séparées par des virgules, ex. 08:30, 11:00, 14:00"
+                    )
+                    noms_jours = {1: "Lun", 2: "Mar", 3: "Mer", 4: "Jeu", 5: "Ven", 6: "Sam", 7: "Dim"}
+                    jours_ouvres = st.multiselect(
+                        "Jours ouvrés", options=list(noms_jours), default=list(periode['jours_ouvres']),
+                        format_func=noms_jours.get
+                    )
+                    if st.button("💾 Enregistrer le calendrier"):
+                        try:
+                            heures = [datetime.strptime(h.strip(), '%H:%M').time() for h in heures_saisies.split(',') if h.strip()]
+                        except ValueError:
+                            heures = []
+                        if not heures or not jours_ouvres:
+                            st.error("Au moins une heure de créneau (HH:MM) et un jour ouvré sont requis")
+                        else:
+                            db.update_calendrier_periode(periode_id, sorted(set(heures)), sorted(jours_ouvres))
+                            st.success("Calendrier enregistré")
+                            st.rerun()
+
+                    jours_exclus = db.get_jours_exclus(periode_id)
+                    if jours_exclus:
+                        st.dataframe(pd.DataFrame(jours_exclus)[['date_exclue', 'motif', 'periode_id']], use_container_width=True)
+                    col_j1, col_j2 = st.columns(2)
+                    date_exclue = col_j1.date_input(
+                        "Jour sans examen", value=periode['date_debut'],
+                        min_value=periode['date_debut'], max_value=periode['date_fin']
+                    )
+                    motif = col_j2.text_input("Motif", value="Jour férié")
+                    if st.button("➕ Exclure ce jour"):
+                        db.add_jour_exclu(date_exclue, periode_id, motif)
+                        st.rerun()
+                    if jours_exclus:
+                        col_j3, col_j4 = st.columns([3, 1])
+                        jour_id = col_j3.selectbox(
+                            "Jour exclu", options=[j['id'] for j in jours_exclus],
+                            format_func=lambda i: next(f"{j['date_exclue']} ({j['motif'] or 'sans motif'})"
+                                                       for j in jours_exclus if j['id'] == i)
+                        )
+                        if col_j4.button("↩️ Rétablir ce jour"):
+                            db.delete_jour_exclu(jour_id)
+                            st.rerun()
+
+                    st.markdown("**Horaires d'ouverture des bâtiments**")
+                    st.caption("Sans horaire déclaré, un bâtiment est ouvert sur tous les créneaux de la période")
+                    horaires = {h['batiment']: h for h in db.get_horaires_batiments()}
+                    if horaires:
+                        st.dataframe(pd.DataFrame(list(horaires.values()))[['batiment', 'ouverture', 'fermeture']],
+                                     use_container_width=True, hide_index=True)
+                    batiment = st.selectbox("Bâtiment", options=sorted({s['batiment'] for s in db.get_lieu_examen()}),
+                                            key="horaires_batiment")
+                    actuel = horaires.get(batiment)
+                    col_h1, col_h2 = st.columns(2)
+                    ouverture = col_h1.time_input(
+                        "Ouverture", key=f"ouverture_{batiment}",
+                        value=actuel['ouverture'] if actuel else datetime.min.time().replace(hour=8)
+                    )
+                    fermeture = col_h2.time_input(
+                        "Fermeture", key=f"fermeture_{batiment}",
+                        value=actuel['fermeture'] if actuel else datetime.min.time().replace(hour=18)
+                    )
+                    col_h3, col_h4 = st.columns(2)
+                    if col_h3.button("💾 Enregistrer les horaires") and batiment:
+                        if fermeture <= ouverture:
+                            st.error("La fermeture doit être postérieure à l'ouverture")
+                        else:
+                            db.set_horaires_batiment(batiment, ouverture, fermeture)
+                            st.rerun()
+                    if actuel and col_h4.button("🗑️ Supprimer les horaires"):
+                        db.delete_horaires_batiment(batiment)
+                        st.rerun()
+
+                with st.expander("🚫 Indisponibilités des professeurs"):
+                    fichier = st.file_uploader(
+                        "Importer un CSV", type=['csv'],
+                        help="Colonnes : email (ou prof_id), debut, fin, motif. Une fin sans heure (ou à minuit) "
+                             "inclut toute la journée"
+                    )
+                    remplacer = st.checkbox("Remplacer les indisponibilités existantes des professeurs importés")
+                    if fichier is not None and st.button("📥 Importer"):
+                        nb_importes, rejets = db.import_indisponibilites(pd.read_csv(fichier, dtype=str), replace=remplacer)
+                        st.success(f"{nb_importes} indisponibilité(s) importée(s)")
+                        if rejets:
+                            st.warning(f"{len(rejets)} ligne(s) rejetée(s)")
+                            st.dataframe(pd.DataFrame(rejets), use_container_width=True)
+                    professeurs = {f"{p['nom']} {p['prenom']}": p['id'] for p in db.get_professeurs()}
+                    col_i1, col_i2 = st.columns(2)
+                    prof_indisponible = col_i1.selectbox("Professeur", options=list(professeurs), key="indispo_prof")
+                    motif_indisponibilite = col_i2.text_input("Motif", key="indispo_motif")
+                    col_i3, col_i4, col_i5, col_i6 = st.columns(4)
+                    debut_jour = col_i3.date_input("Du", value=periode['date_debut'], key="indispo_debut_jour")
+                    debut_heure = col_i4.time_input("à", value=datetime.min.time(), key="indispo_debut_heure")
+                    fin_jour = col_i5.date_input("Au", value=periode['date_debut'], key="indispo_fin_jour")
+                    fin_heure = col_i6.time_input("à ", value=datetime.min.time().replace(hour=23, minute=59),
+                                                  key="indispo_fin_heure")
+                    if st.button("➕ Déclarer l'indisponibilité") and prof_indisponible:
+                        debut = datetime.combine(debut_jour, debut_heure)
+                        fin = datetime.combine(fin_jour, fin_heure)
+                        if fin <= debut:
+                            st.error("La fin doit être postérieure au début")
+                        else:
+                            db.add_indisponibilite(professeurs[prof_indisponible], debut, fin, motif_indisponibilite or None)
+                            st.rerun()
+
+                    indisponibilites = db.get_indisponibilites(periode_id)
+                    if indisponibilites:
+                        st.dataframe(
+                            pd.DataFrame(indisponibilites)[['nom', 'prenom', 'debut', 'fin', 'motif']],
+                            use_container_width=True
+                        )
+                        libelles = {
+                            i['id']: f"{i['nom']} {i['prenom']} : {i['debut']:%d/%m %H:%M} → {i['fin']:%d/%m %H:%M}"
+                            for i in indisponibilites
+                        }
+                        col_s1, col_s2 = st.columns([3, 1])
+                        indisponibilite_id = col_s1.selectbox("Indisponibilité", options=list(libelles),
+                                                              format_func=libelles.get, key="indispo_suppr")
+                        if col_s2.button("🗑️ Supprimer", key="indispo_suppr_btn"):
+                            db.delete_indisponibilite(indisponibilite_id)
+                            st.rerun()
+
+                with st.expander("🧰 Exigences de salle des modules"):
+                    modules_exigences = {f"{m['nom']} ({m['code']})": m for m in db.get_modules()}
+                    salles_equipees = db.get_lieu_examen()
+                    types_salle = {None: "Indifférent", 'salle': "Salle", 'amphitheatre': "Amphithéâtre"}
+                    module_label = st.selectbox("Module", options=list(modules_exigences), key="exigences_module")
+                    if module_label:
+                        module = modules_exigences[module_label]
+                        col_e1, col_e2 = st.columns(2)
+                        type_salle = col_e1.selectbox(
+                            "Type de salle", options=list(types_salle), format_func=types_salle.get,
+                            index=list(types_salle).index(module['type_salle']), key=f"type_salle_{module['id']}"
+                        )
+                        equipements_requis = col_e2.multiselect(
+                            "Équipements requis",
+                            options=sorted({e for s in salles_equipees for e in s['equipements'] or ()}
+                                           | set(module['equipements_requis'] or ())),
+                            default=list(module['equipements_requis'] or ()), key=f"equipements_{module['id']}"
+                        )
+                        if st.button("💾 Enregistrer les exigences"):
+                            db.update_exigences_module(module['id'], type_salle, equipements_requis)
+                            st.success("Exigences enregistrées")
+
+                time_limit = st.number_input(
+                    "Délai d'optimisation (s)", min_value=5, max_value=600, value=30,
+                    help="La recherche locale améliore l'EDT publié jusqu'à ce délai ; un calcul annulé reprend là où il s'était arrêté"
+                )
+            
+            # Analyse de faisabilité : bornes calculées en quelques millisecondes, sans résolution
+            if st.button("🔎 Analyser la faisabilité"):
+                ok, rapport = scheduler.analyser_faisabilite(periode_id, espacement=espacement)
+                if not ok:
+                    st.error(rapport['error'])
+                else:
+                    if rapport['faisable']:
+                        st.success(f"Aucune impossibilité détectée ({rapport['duree_ms']} ms)")
+                    for raison in rapport['raisons']:
+                        st.error(raison)
+                    for avertissement in rapport['avertissements']:
+                        st.warning(avertissement)
+                    bornes = rapport['bornes']
+                    col_b1, col_b2, col_b3, col_b4 = st.columns(4)
+                    col_b1.metric("Jours (min / dispo)", f"{bornes['jours_min']} / {bornes['jours_disponibles']}")
+                    col_b2.metric("Créneaux-salles", f"{bornes['creneaux_salles_demandes']} / {bornes['creneaux_salles_disponibles']}")
+                    col_b3.metric("Places-créneaux", f"{bornes['places_demandees']:,} / {bornes['places_disponibles']:,}")
+                    col_b4.metric("Surveillances", f"{bornes['surveillances_demandees']} / {bornes['surveillances_disponibles']}")
+            
+            # Scénarios « et si » : résolus en mémoire sur une copie des données, rien n'est publié
+            with st.expander("🧪 Scénarios « et si »"):
+                batiments = sorted({s['batiment'] for s in db.get_lieu_examen()})
+                col_sc1, col_sc2, col_sc3 = st.columns(3)
+                with col_sc1:
+                    batiments_fermes = st.multiselect("Fermer les bâtiments", options=batiments)
+                with col_sc2:
+                    jours_supplementaires = st.number_input("Jours ajoutés en fin de période", min_value=0, max_value=30, value=0)
+                with col_sc3:
+                    ratio_amphis = st.slider("Capacité des amphithéâtres (%)", min_value=10, max_value=100, value=100, step=5)
+                
+                modifications = []
+                if batiments_fermes:
+                    modifications.append({'nom': f"Fermeture {', '.join(batiments_fermes)}", 'batiments_fermes': batiments_fermes})
+                if jours_supplementaires:
+                    modifications.append({'nom': f"+{int(jours_supplementaires)} jour(s)", 'jours_supplementaires': int(jours_supplementaires)})
+                if ratio_amphis < 100:
+                    modifications.append({'nom': f"Amphis à {ratio_amphis} %", 'ratio_capacite': {'amphitheatre': ratio_amphis / 100}})
+                if len(modifications) > 1:
+                    combine = {'nom': "Combiné"}
+                    for m in modifications:
+                        combine.update({k: v for k, v in m.items() if k != 'nom'})
+                    modifications.append(combine)
+                
+                if st.button("▶️ Comparer les scénarios", disabled=not modifications):
+                    # Résolus en parallèle par un travail de fond ; le tableau s'affiche ci-dessous
+                    success, submitted = jobs.submit(
+                        periode_id, 'scenarios',
+                        parametres={'scenarios': modifications, 'espacement': espacement, 'localite': localite},
+                        lance_par=lance_par
+                    )
+                    if success:
+                        st.session_state['job_id'] = submitted['job_id']
+                        if submitted['existant']:
+                            st.info("Un calcul est déjà en cours pour cette période : suivi de ce calcul.")
+                    else:
+                        st.error(submitted['error'])
+            
+            # Dimensionnement : plus petite période ou plus petit parc de salles suffisant
+            with st.expander("📐 Dimensionnement de la session"):
+                critere = st.radio("Minimiser", options=["Nombre de jours", "Nombre de salles"], horizontal=True)
+                if st.button("🔍 Rechercher le minimum"):
+                    # Recherche (bornes puis résolutions en parallèle) confiée à un travail de fond
+                    success, submitted = jobs.submit(
+                        periode_id, 'dimensionnement',
+                        parametres={'critere': 'jours' if critere == "Nombre de jours" else 'salles',
+                                    'espacement': espacement},
+                        lance_par=lance_par
+                    )
+                    if success:
+                        st.session_state['job_id'] = submitted['job_id']
+                        if submitted['existant']:
+                            st.info("Un calcul est déjà en cours pour cette période : suivi de ce calcul.")
+                    else:
+                        st.error(submitted['error'])
+            
+            # Planification conjointe : sessions qui se chevauchent et partagent salles et professeurs
+            with st.expander("🔗 Planification conjointe de plusieurs périodes"):
+                periodes_conjointes = st.multiselect(
+                    "Périodes à planifier ensemble",
+                    options=list(periode_options.keys()),
+                    default=[selected_periode],
+                    help="Ex. session normale et rattrapage : aucune salle ni aucun professeur n'est réservé deux fois, "
+                         "y compris avec les emplois du temps publiés des autres périodes"
+                )
+                if st.button("🔗 Générer conjointement", disabled=not periodes_conjointes):
+                    ids_conjoints = sorted(periode_options[p] for p in periodes_conjointes)
+                    # Travail rattaché à la première période ; il verrouille toutes les périodes choisies
+                    success, submitted = jobs.submit(
+                        ids_conjoints[0], 'conjoint',
+                        parametres={'periode_ids': ids_conjoints, 'force': force, 'espacement': espacement,
+                                    'localite': localite},
+                        lance_par=lance_par
+                    )
+                    if success:
+                        st.session_state['job_id'] = submitted['job_id']
+                        if submitted['existant']:
+                            st.info("Un calcul est déjà en cours pour l'une de ces périodes : suivi de ce calcul.")
+                    else:
+                        st.error(submitted['error'])
             
             st.markdown("---")
             
             col_btn1, col_btn2, col_btn3 = st.columns([1, 1, 2])
             
+            # Les calculs tournent dans le pool de processus : la page ne bloque plus et
+            # l'état du travail est relu en base à chaque rafraîchissement
             with col_btn1:
                 if st.button("🚀 Générer l'EDT", type="primary", use_container_width=True):
-                    with st.spinner("Génération en cours... Optimisé pour ~10 secondes"):
-                        progress_bar = st.progress(0)
-                        status_text = st.empty()
-                        
-                        status_text.text("Initialisation...")
-                        progress_bar.progress(10)
-                        
-                        try:
-                            status_text.text("Génération du planning...")
-                            progress_bar.progress(30)
-                            
-                            # Use ExamScheduler for scheduling
-                            success, result = scheduler.generate_schedule(periode_id)
-                            
-                            progress_bar.progress(80)
-                            status_text.text("Finalisation...")
-                            
-                            if success:
-                                progress_bar.progress(100)
-                                status_text.text("Terminé!")
-                                
-                                # Defensive check: Ensure result is a dict (in case of legacy scheduler version)
-                                if not isinstance(result, dict):
-                                    result = {
-                                        'execution_time': 0.0,
-                                        'scheduled': "Pending update",
-                                        'failed': 0,
-                                        'total_conflicts': 0,
-                                        'failed_modules': []
-                                    }
-                                
-                                st.markdown(f"""
-                                <div class="custom-alert alert-success">
-                                    <h4>✅ EDT généré avec succès en {result['execution_time']:.2f} secondes!</h4>
-                                </div>
-                                """, unsafe_allow_html=True)
-                                
-                                col_r1, col_r2, col_r3 = st.columns(3)
-                                
-                                def display_result_card(col, label, value, icon):
-                                    with col:
-                                        st.markdown(f"""
-                                        <div class="metric-card">
-                                            <div class="metric-label">{icon} {label}</div>
-                                            <div class="metric-value">{value}</div>
-                                        </div>
-                                        """, unsafe_allow_html=True)
-                                
-                                display_result_card(col_r1, "Examens planifiés", result['scheduled'], "✅")
-                                display_result_card(col_r2, "Modules non planifiés", result['failed'], "⚠️")
-                                display_result_card(col_r3, "Conflits détectés", result['total_conflicts'], "🔍")
-                                
-                                st.markdown("<br>", unsafe_allow_html=True)
-                                
-                                if result['failed'] > 0:
-                                    st.markdown("""
-                                    <div class="custom-alert alert-warning">
-                                        <h4>⚠️ Certains modules n'ont pas pu être planifiés</h4>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                                    failed_df = pd.DataFrame(result['failed_modules'])
-                                    st.dataframe(failed_df, use_container_width=True)
-                                
-                                if result['total_conflicts'] > 0:
-                                    st.markdown(f"""
-                                    <div class="custom-alert alert-error">
-                                        <h4>❌ {result['total_conflicts']} conflit(s) détecté(s)</h4>
-                                        <p>Consultez l'onglet 'Détection de Conflits'</p>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                                
-                                st.balloons()
-                            else:
-                                st.markdown(f"""
-                                <div class="custom-alert alert-error">
-                                    <h4>❌ Erreur lors de la génération</h4>
-                                    <p>{result.get('error', 'Erreur inconnue')}</p>
-                                </div>
-                                """, unsafe_allow_html=True)
-                        
-                        except Exception as e:
-                            st.markdown(f"""
-                            <div class="custom-alert alert-error">
-                                <h4>❌ Erreur: {e}</h4>
-                            </div>
-                            """, unsafe_allow_html=True)
-                            import traceback
-                            st.code(traceback.format_exc())
+                    success, submitted = jobs.submit(
+                        periode_id, 'generation',
+                        parametres={
+                            'warm_start_from': warm_start_from,
+                            'multi_start': int(multi_start),
+                            'seed': int(seed),
+                            'time_budget': time_budget or None,
+                            'force': force,
+                            'espacement': espacement,
+                            'localite': localite
+                        },
+                        lance_par=lance_par
+                    )
+                    if success:
+                        st.session_state['job_id'] = submitted['job_id']
+                        if submitted['existant']:
+                            st.info("Un calcul est déjà en cours pour cette période : suivi de ce calcul.")
+                    else:
+                        st.markdown(f"""
+                        <div class="custom-alert alert-error">
+                            <h4>❌ Erreur: {submitted['error']}</h4>
+                        </div>
+                        """, unsafe_allow_html=True)
             
             with col_btn2:
                 if st.button("🔄 Optimiser l'EDT", use_container_width=True, type="secondary"):
-                    with st.spinner("Optimisation en cours..."):
-                        try:
-                            optimizations = scheduler.optimize_schedule(periode_id)
-                            st.markdown(f"""
-                            <div class="custom-alert alert-success">
-                                <h4>✅ {optimizations} optimisation(s) effectuée(s)</h4>
-                            </div>
-                            """, unsafe_allow_html=True)
-                        except Exception as e:
-                            st.markdown(f"""
-                            <div class="custom-alert alert-error">
-                                <h4>❌ Erreur: {e}</h4>
-                            </div>
-                            """, unsafe_allow_html=True)
+                    success, submitted = jobs.submit(
+                        periode_id, 'optimisation',
+                        parametres={'time_limit': int(time_limit), 'seed': int(seed), 'espacement': espacement,
+                                    'localite': localite},
+                        lance_par=lance_par
+                    )
+                    if success:
+                        st.session_state['job_id'] = submitted['job_id']
+                        if submitted['existant']:
+                            st.info("Un calcul est déjà en cours pour cette période : suivi de ce calcul.")
+                    else:
+                        st.markdown(f"""
+                        <div class="custom-alert alert-error">
+                            <h4>❌ Erreur: {submitted['error']}</h4>
+                        </div>
+                        """, unsafe_allow_html=True)
             
             with col_btn3:
                 if st.button("🗑️ Supprimer tous les examens", use_container_width=True):
@@ -222,6 +476,151 @@ def main():
                                 <h4>❌ Erreur: {e}</h4>
                             </div>
                             """, unsafe_allow_html=True)
+            
+            # --- Suivi du travail en cours (ou du dernier lancé depuis cette session) ---
+            job = jobs.get_active_job(periode_id)
+            if job is None and st.session_state.get('job_id'):
+                job = jobs.get_job(st.session_state['job_id'])
+                if job and periode_id not in periodes_job(job):
+                    job = None
+            
+            if job and job['statut'] in ('en_attente', 'en_cours'):
+                st.markdown("---")
+                label = {'generation': "Génération", 'optimisation': "Optimisation",
+                         'conjoint': "Planification conjointe",
+                         'scenarios': "Comparaison de scénarios",
+                         'dimensionnement': "Dimensionnement"}.get(job['type_job'], job['type_job'])
+                st.markdown(f"**{label} en cours** (travail #{job['id']}, lancé par {job['lance_par'] or '-'})")
+                st.progress(min(int(job['progression']), 100))
+                col_s1, col_s2 = st.columns([3, 1])
+                with col_s1:
+                    status = job['message'] or ("En attente d'un processus..." if job['statut'] == 'en_attente' else "Initialisation...")
+                    if job['meilleur_score'] is not None:
+                        status += f" — meilleur score : {job['meilleur_score']}"
+                    st.caption(status)
+                with col_s2:
+                    if st.button("⏹️ Annuler", key=f"cancel_{job['id']}", use_container_width=True):
+                        jobs.cancel(job['id'])
+                poll_job = True
+            
+            elif job and job['statut'] == 'terminé':
+                st.markdown("---")
+                result = job['resultat'] or {}
+                
+                if job['type_job'] == 'optimisation':
+                    st.markdown(f"""
+                    <div class="custom-alert alert-success">
+                        <h4>✅ {result.get('message', 'Optimisation terminée')}</h4>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    
+                    if result.get('courbe'):
+                        courbe_df = pd.DataFrame(result['courbe'], columns=['secondes', 'score'])
+                        fig = px.line(courbe_df, x='secondes', y='score', markers=True,
+                                      title="Courbe d'amélioration (meilleur score)")
+                        st.plotly_chart(fig, use_container_width=True)
+                elif job['type_job'] == 'conjoint':
+                    st.markdown("""
+                    <div class="custom-alert alert-success">
+                        <h4>✅ Planification conjointe publiée</h4>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    for resultat in result.get('periodes', []):
+                        st.success(f"{resultat['nom']} : {resultat['scheduled']} examens planifiés, "
+                                   f"{resultat['failed']} échec(s)")
+                elif job['type_job'] == 'scenarios':
+                    st.markdown("**🧪 Comparaison des scénarios**")
+                    comparaison = pd.DataFrame(**result['comparaison'])
+                    st.dataframe(
+                        comparaison.rename(columns={
+                            'scenario': 'Scénario', 'modules': 'Modules', 'places': 'Placés', 'echecs': 'Échecs',
+                            'jours_utilises': 'Jours utilisés', 'jours_disponibles': 'Jours disponibles',
+                            'salles': 'Salles', 'score': 'Score', 'faisable': 'Faisable', 'raisons': 'Raisons',
+                            'penalite_localite': 'Pénalité localité', 'ecart_places': 'Δ placés',
+                            'ecart_jours': 'Δ jours', 'duree_s': 'Durée (s)'
+                        }),
+                        use_container_width=True, hide_index=True
+                    )
+                elif job['type_job'] == 'dimensionnement':
+                    st.markdown("**📐 Dimensionnement de la session**")
+                    if result['minimum'] is None:
+                        st.error("Aucune valeur testée ne permet de placer tous les modules")
+                    else:
+                        col_d1, col_d2, col_d3 = st.columns(3)
+                        col_d1.metric(f"Minimum trouvé ({result['critere']})", result['minimum'])
+                        col_d2.metric("Borne inférieure", result['borne_inferieure'])
+                        col_d3.metric("Actuellement", result['disponible'])
+                        if 'date_fin' in result:
+                            date_fin = datetime.fromisoformat(result['date_fin'])
+                            st.info(f"Période la plus courte : fin le {date_fin.strftime('%d/%m/%Y')}")
+                        if 'salles' in result:
+                            st.info("Salles retenues : " + ", ".join(result['salles']))
+                    st.dataframe(pd.DataFrame(**result['essais']), use_container_width=True, hide_index=True)
+                else:
+                    st.markdown(f"""
+                    <div class="custom-alert alert-success">
+                        <h4>✅ EDT généré avec succès en {result.get('execution_time', 0.0):.2f} secondes!</h4>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    if result.get('reprises'):
+                        st.caption(f"↪️ {result['reprises']} examen(s) repris de la session de départ à l'identique.")
+                    if result.get('from_cache'):
+                        st.caption("♻️ Données inchangées depuis un calcul précédent : sa solution a été republiée sans recalcul.")
+                    
+                    col_r1, col_r2, col_r3 = st.columns(3)
+                    
+                    def display_result_card(col, label, value, icon):
+                        with col:
+                            st.markdown(f"""
+                            <div class="metric-card">
+                                <div class="metric-label">{icon} {label}</div>
+                                <div class="metric-value">{value}</div>
+                            </div>
+                            """, unsafe_allow_html=True)
+                    
+                    display_result_card(col_r1, "Examens planifiés", result.get('scheduled', 0), "✅")
+                    display_result_card(col_r2, "Modules non planifiés", result.get('failed', 0), "⚠️")
+                    display_result_card(col_r3, "Conflits détectés", result.get('total_conflicts', 0), "🔍")
+                    
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    
+                    if result.get('failed', 0) > 0:
+                        st.markdown("""
+                        <div class="custom-alert alert-warning">
+                            <h4>⚠️ Certains modules n'ont pas pu être planifiés</h4>
+                        </div>
+                        """, unsafe_allow_html=True)
+                        failed_df = pd.DataFrame(result['failed_modules'])
+                        st.dataframe(failed_df, use_container_width=True)
+                    
+                    if result.get('total_conflicts', 0) > 0:
+                        st.markdown(f"""
+                        <div class="custom-alert alert-error">
+                            <h4>❌ {result['total_conflicts']} conflit(s) détecté(s)</h4>
+                            <p>Consultez l'onglet 'Détection de Conflits'</p>
+                        </div>
+                        """, unsafe_allow_html=True)
+            
+            elif job and job['statut'] in ('échoué', 'annulé'):
+                st.markdown("---")
+                st.markdown(f"""
+                <div class="custom-alert {'alert-error' if job['statut'] == 'échoué' else 'alert-warning'}">
+                    <h4>{'❌ Erreur lors du calcul' if job['statut'] == 'échoué' else '⏹️ Calcul annulé'}</h4>
+                    <p>{job['message'] or 'Erreur inconnue'}</p>
+                </div>
+                """, unsafe_allow_html=True)
+                presolve = (job['resultat'] or {}).get('presolve')
+                if presolve:
+                    for raison in presolve['raisons']:
+                        st.error(raison)
+                    st.caption("Cochez « Forcer la génération » pour produire malgré tout un EDT partiel.")
+            
+            with st.expander("🗂️ Derniers travaux de la période"):
+                jobs_df = jobs.list_jobs(periode_id)
+                if not jobs_df.empty:
+                    st.dataframe(jobs_df, use_container_width=True, hide_index=True)
+                else:
+                    st.caption("Aucun travail lancé pour cette période")
     
     # --- TAB 2: EXAMENS PLANIFIÉS ---
     with tab2:
@@ -243,16 +642,15 @@ def main():
             
             periode_id_view = periode_options[selected_periode_view]
             
-            examens = db.get_examens(periode_id_view)
+            df = db.get_examens(periode_id_view, frame=True)
             
-            if examens:
-                df = pd.DataFrame(examens)
+            if not df.empty:
                 
                 # Metric card for total
                 st.markdown(f"""
                 <div class="metric-card">
                     <div class="metric-label">📊 Total d'examens planifiés</div>
-                    <div class="metric-value">{len(examens)}</div>
+                    <div class="metric-value">{len(df)}</div>
                 </div>
                 """, unsafe_allow_html=True)
                 
@@ -338,7 +736,7 @@ def main():
                         p.nom || ' ' || p.prenom as professeur,
                         d.nom as departement,
                         f.nom as formation
-                    FROM examens e
+                    FROM examens_publies e
                     JOIN modules m ON e.module_id = m.id
                     JOIN lieu_examen l ON e.salle_id = l.id
                     JOIN professeurs p ON e.prof_responsable_id = p.id
@@ -348,15 +746,14 @@ def main():
                     ORDER BY d.nom, e.date_heure, m.nom
                 """
                 
-                examens_dept = db.execute_query(query, (periode_id_dept,))
+                df_dept = db.fetch_frame(query, (periode_id_dept,))
                 
-                if examens_dept:
+                if not df_dept.empty:
                     # Filter by department if selected
                     if selected_dept != "Tous les départements":
-                        examens_dept = [e for e in examens_dept if e['departement'] == selected_dept]
+                        df_dept = df_dept[df_dept['departement'] == selected_dept]
                     
-                    if examens_dept:
-                        df_dept = pd.DataFrame(examens_dept)
+                    if not df_dept.empty:
                         
                         # Summary metrics
                         col1, col2, col3, col4 = st.columns(4)
@@ -370,7 +767,7 @@ def main():
                                 </div>
                                 """, unsafe_allow_html=True)
                         
-                        display_dept_card(col1, "Total Examens", len(examens_dept), "📝")
+                        display_dept_card(col1, "Total Examens", len(df_dept), "📝")
                         display_dept_card(col2, "Départements", df_dept['departement'].nunique(), "🏛️")
                         display_dept_card(col3, "Total Étudiants", f"{df_dept['nb_inscrits'].sum():,}", "👨‍🎓")
                         display_dept_card(col4, "Salles Utilisées", df_dept['salle_nom'].nunique(), "🏫")
@@ -476,6 +873,114 @@ def main():
                 <h4>⚠️ Aucune période d'examen active</h4>
             </div>
             """, unsafe_allow_html=True)
+    
+    # --- TAB 4: VERSIONS ---
+    with tab4:
+        st.markdown('<div class="section-header"><h3>🕓 Historique des Versions</h3></div>', unsafe_allow_html=True)
+        
+        periodes = db.get_periodes_examen(actif=True)
+        
+        if periodes:
+            periode_options = {
+                f"{p['nom']} ({p['date_debut']} - {p['date_fin']})": p['id'] 
+                for p in periodes
+            }
+            
+            selected_periode_versions = st.selectbox(
+                "Période d'examen",
+                options=list(periode_options.keys()),
+                key="versions_periode"
+            )
+            
+            periode_id_versions = periode_options[selected_periode_versions]
+            
+            df_versions = versions.list_versions(periode_id_versions)
+            
+            if not df_versions.empty:
+                st.dataframe(
+                    df_versions[['id', 'statut', 'lance_par', 'strategie', 'metriques', 'duree_execution',
+                                 'created_at', 'publie_at', 'taille_encodage', 'materialisee']],
+                    use_container_width=True,
+                    hide_index=True
+                )
+                
+                version_ids = df_versions['id'].tolist()
+                
+                st.markdown("---")
+                
+                col_rb1, col_rb2 = st.columns([2, 1])
+                
+                with col_rb1:
+                    rollback_id = st.selectbox("Version à republier", options=version_ids, key="rollback_version")
+                
+                with col_rb2:
+                    st.markdown("<br>", unsafe_allow_html=True)
+                    if st.button("⏪ Revenir à cette version", use_container_width=True):
+                        success, result = versions.rollback(periode_id_versions, rollback_id)
+                        if success:
+                            st.markdown(f"""
+                            <div class="custom-alert alert-success">
+                                <h4>✅ Version {rollback_id} republiée</h4>
+                            </div>
+                            """, unsafe_allow_html=True)
+                        else:
+                            st.markdown(f"""
+                            <div class="custom-alert alert-error">
+                                <h4>❌ {result.get('error', 'Erreur inconnue')}</h4>
+                            </div>
+                            """, unsafe_allow_html=True)
+                
+                if len(version_ids) > 1:
+                    st.markdown("---")
+                    st.markdown("#### 🔍 Comparer deux versions")
+                    
+                    col_d1, col_d2 = st.columns(2)
+                    
+                    with col_d1:
+                        version_a = st.selectbox("Version de référence", options=version_ids, index=1, key="diff_a")
+                    
+                    with col_d2:
+                        version_b = st.selectbox("Version comparée", options=version_ids, index=0, key="diff_b")
+                    
+                    try:
+                        diff = versions.diff(version_a, version_b)
+                        
+                        col_m1, col_m2, col_m3, col_m4 = st.columns(4)
+                        col_m1.metric("Examens déplacés", len(diff['deplaces']))
+                        col_m2.metric("Salles modifiées", len(diff['salles']))
+                        col_m3.metric("Surveillants modifiés", len(diff['surveillants']))
+                        col_m4.metric("Modules ajoutés / retirés", f"{len(diff['ajoutes'])} / {len(diff['retires'])}")
+                        
+                        modules_df = db.get_modules(frame=True)[['id', 'nom']].rename(
+                            columns={'id': 'module_id', 'nom': 'module_nom'}
+                        )
+                        
+                        for label, key in [("Examens déplacés", 'deplaces'), ("Salles modifiées", 'salles'),
+                                           ("Surveillants modifiés", 'surveillants')]:
+                            if not diff[key].empty:
+                                with st.expander(f"{label} ({len(diff[key])})"):
+                                    st.dataframe(
+                                        diff[key].merge(modules_df, on='module_id', how='left'),
+                                        use_container_width=True,
+                                        hide_index=True
+                                    )
+                    except ValueError as e:
+                        st.markdown(f"""
+                        <div class="custom-alert alert-warning">
+                            <h4>ℹ️ {e}</h4>
+                        </div>
+                        """, unsafe_allow_html=True)
+            else:
+                st.markdown("""
+                <div class="custom-alert alert-warning">
+                    <h4>ℹ️ Aucune version enregistrée pour cette période</h4>
+                </div>
+                """, unsafe_allow_html=True)
+    
+    # Rafraîchissement périodique tant qu'un calcul est en cours
+    if poll_job:
+        time.sleep(1)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
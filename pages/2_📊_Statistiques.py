@@ -34,13 +34,36 @@ def main():
     db = get_database()
     analytics = get_analytics(db)
     
-    tab1, tab2, tab3, tab4 = st.tabs(["📈 KPIs Globaux", "🏛️ Par Département", "👨‍🏫 Charge Professeurs", "💺 Occupation Salles"])
+    periodes = db.get_periodes_examen(actif=True)
+    periode_id = None
+    
+    if periodes:
+        periode_options = {
+            f"{p['nom']}": p['id'] 
+            for p in periodes
+        }
+        
+        selected_periode = st.selectbox(
+            "Sélectionnez une période",
+            options=list(periode_options.keys())
+        )
+        
+        periode_id = periode_options[selected_periode]
+    
+    # Un seul aller-retour pour tout le tableau de bord de la période
+    try:
+        dashboard = analytics.get_dashboard_payload(periode_id)
+    except Exception as e:
+        st.error(f"Erreur lors du chargement du tableau de bord: {e}")
+        return
+    
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["📈 KPIs Globaux", "🏛️ Par Département", "👨‍🏫 Charge Professeurs", "💺 Occupation Salles", "📏 Espacement"])
     
     with tab1:
         st.header("📈 Indicateurs Clés de Performance")
         
         try:
-            kpis = analytics.get_dashboard_kpis()
+            kpis = dashboard['kpis']
             
             col1, col2, col3 = st.columns(3)
             
@@ -76,37 +99,21 @@ def main():
                 avg_per_student = total_inscriptions / max(kpis.get('total_etudiants', 1), 1)
                 st.metric("Moyenne par étudiant", f"{avg_per_student:.1f} modules")
             
+            efficiency = analytics.calculate_efficiency_score(periode_id) if periode_id else {'score': 0, 'metrics': {}}
+            
             with col_ins2:
-                # Define periodes here so it's available for calculation
-                periodes = db.get_periodes_examen(actif=True)
-                
                 avg_per_module = total_inscriptions / max(kpis.get('total_modules', 1), 1)
                 st.metric("Moyenne par module", f"{avg_per_module:.1f} étudiants")
                 
                 # Use filling rate (Taux de Remplissage) instead of utilization rate
                 # Fetch efficiency metrics which contain the true filling rate
-                efficiency_data = analytics.calculate_efficiency_score(periodes[0]['id'] if periodes else None)
-                filling_rate = efficiency_data['metrics'].get('utilization_rate', 0)
+                filling_rate = efficiency['metrics'].get('utilization_rate', 0)
                 
                 st.metric("Taux de Remplissage Salles", f"{filling_rate:.1f}%")
             if periodes:
                 st.markdown("---")
                 st.subheader("🎯 Score d'Efficacité du Planning")
                 
-                periode_options = {
-                    f"{p['nom']}": p['id'] 
-                    for p in periodes
-                }
-                
-                selected_periode = st.selectbox(
-                    "Sélectionnez une période",
-                    options=list(periode_options.keys())
-                )
-                
-                periode_id = periode_options[selected_periode]
-                
-                efficiency = analytics.calculate_efficiency_score(periode_id)
-                
                 score = efficiency['score']
                 
                 if score >= 80:
@@ -137,7 +144,16 @@ def main():
                 
                 with col_eff3:
                     st.metric("Examens/jour (moy)", f"{metrics['avg_exams_per_day']:.1f}")
-        
+                    if metrics.get('ecart_moyen_jours') is not None:
+                        st.metric("Écart moyen entre examens", f"{metrics['ecart_moyen_jours']:.1f} j")
+
+                if metrics:
+                    st.caption(
+                        f"Conflits étudiants : {metrics['conflits_etudiants']} · "
+                        f"Conflits professeurs : {metrics['conflits_professeurs']} · "
+                        f"Déséquilibre des surveillances (écart type) : {metrics['desequilibre_surveillances']:.2f}"
+                    )
+
         except Exception as e:
             st.error(f"Erreur lors du chargement des KPIs: {e}")
     
@@ -145,7 +161,7 @@ def main():
         st.header("🏛️ Statistiques par Département")
         
         try:
-            dept_stats = analytics.get_department_stats()
+            dept_stats = dashboard['departements']
             
             if not dept_stats.empty:
                 st.dataframe(
@@ -213,7 +229,7 @@ def main():
         st.header("👨‍🏫 Charge de Travail des Professeurs")
         
         try:
-            charge_profs = analytics.get_professor_workload()
+            charge_profs = dashboard['charge_professeurs']
             
             if not charge_profs.empty:
                 col_filter1, col_filter2 = st.columns(2)
@@ -282,13 +298,9 @@ def main():
         st.header("💺 Occupation des Salles")
         
         try:
-            occupation = analytics.get_occupation_analysis()
+            occupation = dashboard['occupation']
             
             if not occupation.empty:
-                # Force add the total rooms column manually in Python to ensure it appears
-                total_salles_count = db.execute_query("SELECT COUNT(*) as count FROM lieu_examen WHERE disponible = TRUE")[0]['count']
-                occupation['salles_totales'] = total_salles_count
-                
                 # Reorder columns for better readability
                 cols_order = [
                     'date_examen', 
@@ -380,6 +392,45 @@ def main():
         
         except Exception as e:
             st.error(f"Erreur: {e}")
+    
+    with tab5:
+        st.header("📏 Espacement des Examens par Étudiant")
+        
+        try:
+            fenetre_jours = st.number_input("Fenêtre (jours consécutifs)", min_value=1, max_value=14, value=3)
+            rapport = analytics.get_spacing_report(periode_id, int(fenetre_jours)) if periode_id else {}
+            
+            if rapport:
+                etudiants = rapport['etudiants']
+                col_esp1, col_esp2, col_esp3 = st.columns(3)
+                col_esp1.metric("Étalement moyen", f"{etudiants['etalement'].mean():.1f} jours")
+                col_esp2.metric(f"Max. examens sur {rapport['fenetre_jours']} jours", int(etudiants['max_fenetre'].max()))
+                col_esp3.metric("Examens consécutifs sans demi-journée libre", rapport['sans_demi_journee_libre'])
+                
+                col_esp4, col_esp5 = st.columns(2)
+                
+                with col_esp4:
+                    ecarts = rapport['ecarts_demi_journees']
+                    fig_ecarts = px.bar(
+                        x=ecarts.index, y=ecarts.values,
+                        title='Écart entre deux examens consécutifs',
+                        labels={'x': 'Demi-journées', 'y': "Paires d'examens"}
+                    )
+                    st.plotly_chart(fig_ecarts, use_container_width=True)
+                
+                with col_esp5:
+                    fenetres = rapport['max_fenetre']
+                    fig_fenetres = px.bar(
+                        x=fenetres.index, y=fenetres.values,
+                        title=f"Examens max. sur {rapport['fenetre_jours']} jours consécutifs",
+                        labels={'x': 'Examens', 'y': 'Étudiants'}
+                    )
+                    st.plotly_chart(fig_fenetres, use_container_width=True)
+            else:
+                st.info("Aucun examen publié pour cette période")
+        
+        except Exception as e:
+            st.error(f"Erreur: {e}")
 
 if __name__ == "__main__":
     main()
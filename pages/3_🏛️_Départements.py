@@ -93,8 +93,8 @@ def main():
                 
                 formation_stats = []
                 for formation in formations:
-                    etudiants = db.get_etudiants(formation['id'])
-                    modules = db.get_modules(formation['id'])
+                    etudiants = db.get_etudiants(formation['id'], frame=True)
+                    modules = db.get_modules(formation['id'], frame=True)
                     
                     formation_stats.append({
                         'Formation': formation['nom'],
@@ -134,18 +134,17 @@ def main():
                         st.write(f"**Niveau:** {formation['niveau']}")
                     
                     with col_f2:
-                        etudiants = db.get_etudiants(formation['id'])
+                        etudiants = db.get_etudiants(formation['id'], frame=True)
                         st.write(f"**Étudiants:** {len(etudiants)}")
                     
                     with col_f3:
-                        modules = db.get_modules(formation['id'])
+                        modules = db.get_modules(formation['id'], frame=True)
                         st.write(f"**Modules:** {len(modules)}")
                     
-                    if modules:
+                    if not modules.empty:
                         st.markdown("##### Modules:")
-                        modules_df = pd.DataFrame(modules)
                         st.dataframe(
-                            modules_df[['nom', 'code', 'credits', 'semestre', 'duree_examen']],
+                            modules[['nom', 'code', 'credits', 'semestre', 'duree_examen']],
                             use_container_width=True,
                             hide_index=True
                         )
@@ -155,12 +154,10 @@ def main():
     with tab3:
         st.header("👨‍🏫 Professeurs du Département")
         
-        professeurs = db.get_professeurs(dept_id)
+        profs_df = db.get_professeurs(dept_id, frame=True)
         
-        if professeurs:
-            st.metric("Total Professeurs", len(professeurs))
-            
-            profs_df = pd.DataFrame(professeurs)
+        if not profs_df.empty:
+            st.metric("Total Professeurs", len(profs_df))
             
             grade_counts = profs_df['grade'].value_counts()
             
@@ -227,13 +224,10 @@ def main():
             formations = db.get_formations(dept_id)
             formation_ids = [f['id'] for f in formations]
             
-            all_examens = db.get_examens(periode_id)
+            examens_df = db.get_examens(periode_id, frame=True)
             
-            if all_examens:
-                examens_df = pd.DataFrame(all_examens)
-                
-                modules = db.get_modules()
-                modules_df = pd.DataFrame(modules)
+            if not examens_df.empty:
+                modules_df = db.get_modules(frame=True)
                 
                 dept_modules = modules_df[modules_df['formation_id'].isin(formation_ids)]
                 dept_module_ids = dept_modules['id'].tolist()
@@ -0,0 +1,119 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from src.exam_calendar import ExamCalendar
+from src.room_index import RoomIndex
+from src.scheduler import solve_first_fit
+
+# Banc d'essai du moteur glouton sur un problème synthétique construit en mémoire (sans base) :
+# chaque étudiant suit MODULES_PAR_ETUDIANT modules de sa formation, d'où la taille des modules,
+# et quelques modules partagent des étudiants avec d'autres formations (conflits de co-inscription).
+MODULES_PAR_FORMATION = 12
+MODULES_PAR_ETUDIANT = 10
+ETUDIANTS_PAR_FORMATION = (120, 300)
+
+
+def generer_probleme(nb_inscriptions, nb_jours=30, seed=0):
+    rng = random.Random(seed)
+    nb_etudiants = nb_inscriptions // MODULES_PAR_ETUDIANT
+    modules, formation, etudiants = [], 0, 0
+    while etudiants < nb_etudiants:
+        effectif = min(rng.randint(*ETUDIANTS_PAR_FORMATION), nb_etudiants - etudiants)
+        for _ in range(MODULES_PAR_FORMATION):
+            modules.append({
+                'id': len(modules) + 1,
+                'nom': f"Module {len(modules) + 1}",
+                'formation_id': formation,
+                'dept_id': formation % 7 + 1,
+                'duree_examen': rng.choice((90, 90, 120, 180)),
+                'nb_inscrits': max(1, round(effectif * MODULES_PAR_ETUDIANT / MODULES_PAR_FORMATION
+                                            * rng.uniform(0.8, 1.2))),
+                'type_salle': None,
+                'equipements_requis': []
+            })
+        formation += 1
+        etudiants += effectif
+    modules.sort(key=lambda m: (-m['nb_inscrits'], m['id']))
+
+    # Co-inscriptions entre formations voisines : deux modules par module en moyenne
+    conflits = {}
+    for m in modules:
+        for _ in range(2):
+            autre = modules[rng.randrange(len(modules))]
+            if autre['formation_id'] != m['formation_id']:
+                conflits.setdefault(m['id'], []).append(autre['id'])
+                conflits.setdefault(autre['id'], []).append(m['id'])
+
+    # Parc de salles et de surveillants dimensionné sur la demande en places-créneaux
+    places = sum(m['nb_inscrits'] for m in modules)
+    salles = []
+    while sum(s['capacite_examen'] for s in salles) * nb_jours * 3 < 4 * places:
+        amphi = rng.random() < 0.25
+        capacite = rng.randint(200, 420) if amphi else rng.randint(30, 120)
+        salles.append({
+            'id': len(salles) + 1,
+            'nom': f"Salle {len(salles) + 1}",
+            'capacite': capacite,
+            'capacite_examen': capacite,
+            'type': 'amphitheatre' if amphi else 'salle',
+            'batiment': f"Bâtiment {chr(65 + len(salles) % 7)}",
+            'equipements': []
+        })
+    profs = [{'id': i + 1, 'nom': f"Prof {i + 1}", 'prenom': ''}
+             for i in range(max(50, len(modules) // nb_jours + len(modules) // 4))]
+
+    calendrier = ExamCalendar.compiler(date(2026, 1, 5), date(2026, 1, 5) + timedelta(days=nb_jours - 1))
+    return {
+        'periode_id': 1,
+        'date_debut': calendrier.jours[0],
+        'date_fin': calendrier.jours[-1],
+        'calendrier': calendrier,
+        'modules': modules,
+        'salles': salles,
+        'index_salles': RoomIndex(salles),
+        'profs': profs,
+        'conflits': conflits,
+        'indisponibilites': {},
+        'localite': None,
+        'espacement': None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai du moteur glouton (temps et mémoire)")
+    parser.add_argument('--inscriptions', type=int, default=1_000_000)
+    parser.add_argument('--jours', type=int, default=30)
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    probleme = generer_probleme(args.inscriptions, args.jours, args.seed)
+    print(f"Problème : {args.inscriptions:,} inscriptions, {len(probleme['modules']):,} modules, "
+          f"{len(probleme['salles']):,} salles, {len(probleme['profs']):,} professeurs, "
+          f"{probleme['calendrier'].nb_jours} jours ({time.perf_counter() - debut:.1f} s)")
+
+    durees = []
+    for _ in range(args.repetitions):
+        debut = time.perf_counter()
+        solution = solve_first_fit(probleme, variante=f"{args.seed}:bench")
+        durees.append(time.perf_counter() - debut)
+    print(f"Placement : {len(solution['examens']):,} placés, {len(solution['echecs']):,} échecs")
+    print(f"Temps : meilleur {min(durees):.3f} s, médian {sorted(durees)[len(durees) // 2]:.3f} s")
+
+    tracemalloc.start()
+    solve_first_fit(probleme, variante=f"{args.seed}:bench")
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Mémoire : pic {pic / 2 ** 20:.1f} Mio alloués pendant le placement")
+
+
+if __name__ == "__main__":
+    main()
@@ -45,7 +45,8 @@ def generate_salles():
                 capacite,
                 'salle',
                 f"Bâtiment {batiment}",
-                ['tableau', 'projecteur']
+                # Les trois premières salles de chaque bâtiment sont équipées d'ordinateurs
+                ['tableau', 'projecteur', 'ordinateurs'] if i <= 3 else ['tableau', 'projecteur']
             ))
         
         for i in range(1, 4):
@@ -76,6 +77,11 @@ def generate_salles():
     """
     db.execute_many(query, salles_final)
     
+    # Bâtiments alignés le long du campus, à 150 m les uns des autres
+    for i, a in enumerate(batiments):
+        for j, b in enumerate(batiments[i + 1:], start=i + 1):
+            db.set_distance_batiments(f"Bâtiment {a}", f"Bâtiment {b}", 150 * (j - i))
+    
     print(f"✅ {len(salles_final)} salles créées")
     return len(salles_final)
 
@@ -270,14 +276,15 @@ def generate_periode_examen():
     date_fin = datetime(2026, 2, 7).date()
     
     query = """
-        INSERT INTO periodes_examen (nom, date_debut, date_fin, session, annee_universitaire, actif)
-        VALUES (%s, %s, %s, %s, %s, %s) RETURNING id
+        INSERT INTO periodes_examen (nom, date_debut, date_fin, session, semestre, annee_universitaire, actif)
+        VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id
     """
     result = db.execute_query(query, (
         'Session Normale Janvier 2026',
         date_debut,
         date_fin,
         'normale',
+        1,
         '2025-2026',
         True
     ))
@@ -293,7 +300,7 @@ def main():
     
     try:
         print("Nettoyage des données existantes...")
-        db.execute_query("TRUNCATE departements, lieu_examen, formations, professeurs, etudiants, modules, inscriptions, examens, surveillances, periodes_examen CASCADE", fetch=False)
+        db.execute_query("TRUNCATE departements, lieu_examen, formations, professeurs, etudiants, modules, inscriptions, examens, surveillances, versions_planning, jobs_planification, periodes_examen CASCADE", fetch=False)
         
         dept_ids = generate_departements()
         generate_salles()
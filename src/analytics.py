@@ -1,58 +1,90 @@
+import numpy as np
 import pandas as pd
 from typing import Dict, List
+from src.incidence import IncidenceCache
 
 class Analytics:
-    def __init__(self, db):
+    def __init__(self, db, incidence=None):
         self.db = db
+        self.incidence = incidence or IncidenceCache(db)
     
     def get_dashboard_kpis(self) -> Dict:
         kpis = self.db.get_kpi_global()
         return kpis
     
     def get_occupation_analysis(self) -> pd.DataFrame:
-        data = self.db.get_occupation_salles()
-        if data:
-            df = pd.DataFrame(data)
-            return df
-        return pd.DataFrame()
+        return self.db.get_occupation_salles(frame=True)
     
     def get_department_stats(self) -> pd.DataFrame:
-        data = self.db.get_stats_departement()
-        if data:
-            df = pd.DataFrame(data)
-            return df
-        return pd.DataFrame()
+        return self.db.get_stats_departement(frame=True)
     
     def get_professor_workload(self) -> pd.DataFrame:
-        data = self.db.get_charge_professeurs()
-        if data:
-            df = pd.DataFrame(data)
-            return df
-        return pd.DataFrame()
+        return self.db.get_charge_professeurs(frame=True)
     
+    def get_dashboard_payload(self, periode_id: int = None) -> Dict:
+        payload = self.db.get_dashboard_periode(periode_id) or {}
+
+        occupation = pd.DataFrame(payload.get('occupation') or [])
+        if not occupation.empty:
+            occupation['date_examen'] = pd.to_datetime(occupation['date_examen']).dt.date
+
+        return {
+            'kpis': payload.get('kpis') or {},
+            'departements': pd.DataFrame(payload.get('departements') or []),
+            'charge_professeurs': pd.DataFrame(payload.get('charge_professeurs') or []),
+            'occupation': occupation,
+            'conflits': payload.get('conflits') or {}
+        }
+
     def calculate_efficiency_score(self, periode_id: int) -> Dict:
-        examens = self.db.get_examens(periode_id)
+        """
+        Score d'efficacité de l'emploi du temps publié de la période. Les colonnes des examens
+        et des surveillances sont lues en une requête (un tableau par colonne) et toutes les
+        mesures sont vectorisées : remplissage des salles, conflits étudiants (matrice
+        d'incidence en cache) et professeurs, étalement et équilibre des charges.
+        """
+        colonnes = self.db.get_colonnes_examens(periode_id)
+        module_ids = np.asarray(colonnes['module_id'] if colonnes else [], dtype=np.int64)
         
-        if not examens:
+        if not len(module_ids):
             return {
                 'score': 0,
                 'metrics': {}
             }
         
-        total_capacity = sum(e.get('capacite_examen', 0) for e in examens)
-        total_students = sum(e.get('nb_inscrits', 0) for e in examens)
+        jours = np.asarray(colonnes['jour'], dtype=np.int64)
+        nb_inscrits = np.asarray(colonnes['nb_inscrits'], dtype=np.int64)
+        capacites = np.asarray(colonnes['capacite_examen'], dtype=np.int64)
+        total_capacity = capacites.sum()
+        utilization_rate = (nb_inscrits.sum() / total_capacity * 100) if total_capacity > 0 else 0
         
-        utilization_rate = (total_students / total_capacity * 100) if total_capacity > 0 else 0
+        # Examens par jour : étalement de la période et équilibre entre jours
+        _, examens_par_jour = np.unique(jours, return_counts=True)
+        unique_dates = len(examens_par_jour)
         
-        # Get conflicts 
-        conflicts_etudiants = self.db.get_conflits_etudiants() or []
-        conflicts_professeurs = self.db.get_conflits_professeurs() or []
+        # Conflits professeurs : plus de 3 examens surveillés le même jour
+        profs = np.asarray(colonnes['surveillance_prof'], dtype=np.int64)
+        jours_surveillances = np.asarray(colonnes['surveillance_jour'], dtype=np.int64)
+        conflits_professeurs = 0
+        desequilibre = 0.0
+        if len(profs):
+            _, par_prof_jour = np.unique(np.stack([profs, jours_surveillances], axis=1), axis=0, return_counts=True)
+            conflits_professeurs = int((par_prof_jour > 3).sum())
+            desequilibre = float(np.unique(profs, return_counts=True)[1].std())
         
-        total_conflicts = len(conflicts_etudiants) + len(conflicts_professeurs)
-        conflict_rate = (total_conflicts / len(examens) * 100) if examens else 0
+        # Conflits étudiants (plus d'un examen le même jour) et écart entre examens consécutifs
+        incidence = self.incidence.load(periode_id)
+        ecart_moyen = None
+        if incidence is not None:
+            jours_modules = dict(zip(module_ids.tolist(), (jours - jours.min()).tolist()))
+            conflits_etudiants = incidence.journees_multiples(jours_modules)
+            ecarts = incidence.ecarts_consecutifs(jours_modules)
+            ecart_moyen = round(float(ecarts.mean()), 2) if len(ecarts) else None
+        else:
+            conflits_etudiants = len(self.db.get_conflits_etudiants(periode_id))
         
-        unique_dates = len(set(e['date_heure'].date() for e in examens if e.get('date_heure')))
-        avg_exams_per_day = len(examens) / unique_dates if unique_dates > 0 else 0
+        total_conflicts = conflits_etudiants + conflits_professeurs
+        conflict_rate = total_conflicts / len(module_ids) * 100
         
         # Calculate Score 
         score = 100.0
@@ -62,31 +94,77 @@ class Analytics:
 
         score -= (100 - utilization_rate) * 0.05
         
-        score = max(0.0, min(100.0, score))
+        score = max(0.0, min(100.0, float(score)))
         
         return {
             'score': round(score, 2),
             'metrics': {
-                'utilization_rate': round(utilization_rate, 2),
+                'utilization_rate': round(float(utilization_rate), 2),
                 'conflict_rate': round(conflict_rate, 2),
-                'avg_exams_per_day': round(avg_exams_per_day, 2),
-                'total_exams': len(examens),
-                'unique_dates': unique_dates
+                'avg_exams_per_day': round(len(module_ids) / unique_dates, 2),
+                'total_exams': len(module_ids),
+                'unique_dates': unique_dates,
+                'etalement_jours': int(jours.max() - jours.min() + 1),
+                'ecart_type_examens_jour': round(float(examens_par_jour.std()), 2),
+                'conflits_etudiants': conflits_etudiants,
+                'conflits_professeurs': conflits_professeurs,
+                'ecart_moyen_jours': ecart_moyen,
+                'desequilibre_surveillances': round(desequilibre, 2)
             }
         }
     
-    def get_conflict_summary(self) -> Dict:
+    def get_student_spread(self, periode_id: int) -> pd.DataFrame:
+        """
+        Étalement des examens publiés de chaque étudiant de la période (jours comptés depuis
+        le premier examen de la période), calculé sur la matrice d'incidence en cache.
+        """
+        incidence = self.incidence.load(periode_id)
+        placements = self.db.get_placements_publies(periode_id)
+        if incidence is None or not placements:
+            return pd.DataFrame()
+        
+        premier_jour = min(p['date_heure'] for p in placements).date()
+        jours = {p['module_id']: (p['date_heure'].date() - premier_jour).days for p in placements}
+        return incidence.etalement_examens(jours)
+    
+    def get_spacing_report(self, periode_id: int, fenetre_jours: int = 3) -> Dict:
+        """
+        Distribution de l'espacement des examens publiés, par étudiant : écarts entre examens
+        consécutifs (en demi-journées) et nombre maximal d'examens sur fenetre_jours jours.
+        """
+        incidence = self.incidence.load(periode_id)
+        placements = self.db.get_placements_publies(periode_id)
+        if incidence is None or not placements:
+            return {}
+        
+        premier_jour = min(p['date_heure'] for p in placements).date()
+        jours = {p['module_id']: (p['date_heure'].date() - premier_jour).days for p in placements}
+        demi_journees = {
+            p['module_id']: 2 * jours[p['module_id']] + (p['date_heure'].hour >= 12) for p in placements
+        }
+        etudiants = incidence.etalement_examens(jours, fenetre_jours)
+        ecarts = pd.Series(incidence.ecarts_consecutifs(demi_journees))
+        return {
+            'etudiants': etudiants,
+            'ecarts_demi_journees': ecarts.value_counts().sort_index(),
+            'max_fenetre': etudiants['max_fenetre'].value_counts().sort_index(),
+            # Paires d'examens consécutifs sans demi-journée libre entre elles
+            'sans_demi_journee_libre': int((ecarts < 2).sum()),
+            'fenetre_jours': fenetre_jours
+        }
+    
+    def get_conflict_summary(self, periode_id: int = None) -> Dict:
         return {
-            'etudiants': len(self.db.get_conflits_etudiants()),
-            'professeurs': len(self.db.get_conflits_professeurs()),
-            'capacite': len(self.db.get_conflits_capacite()),
-            'salles': len(self.db.get_conflits_salles())
+            'etudiants': len(self.db.get_conflits_etudiants(periode_id)),
+            'professeurs': len(self.db.get_conflits_professeurs(periode_id)),
+            'capacite': len(self.db.get_conflits_capacite(periode_id)),
+            'indisponibilites': len(self.db.get_conflits_indisponibilites(periode_id)),
+            'salles': len(self.db.get_conflits_salles(periode_id))
         }
     
     def export_schedule_to_csv(self, periode_id: int, filepath: str):
-        examens = self.db.get_examens(periode_id)
-        if examens:
-            df = pd.DataFrame(examens)
+        df = self.db.get_examens(periode_id, frame=True)
+        if not df.empty:
             df.to_csv(filepath, index=False, encoding='utf-8')
             return True
         return False
@@ -0,0 +1,178 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from src.presolve import analyser_faisabilite
+from src.scenarios import appliquer_scenario, run_scenario
+from src.scheduler import ExamScheduler
+
+# Au-delà de la période, les jours sont ajoutés par doublement jusqu'à cette borne (jours d'examen)
+JOURS_MAX = 180
+
+
+class CapacityPlanner:
+    """
+    Dimensionnement d'une session : plus petit nombre de jours d'examen, ou de salles, avec
+    lequel le moteur place tous les modules plaçables sans conflit. La recherche se fait en
+    deux temps sur la valeur k (jours ou salles) :
+      1. dichotomie sur les seules bornes de l'analyse préalable (quelques millisecondes par
+         essai) : aucune valeur en dessous ne peut convenir, c'est la borne inférieure ;
+      2. recherche k-aire entre cette borne et une valeur admissible : à chaque tour, autant
+         de valeurs que de processus sont résolues en parallèle (une seule = dichotomie).
+    Le moteur étant glouton, le minimum trouvé est une borne supérieure du vrai minimum ;
+    l'écart avec la borne inférieure en donne la marge. Rien n'est écrit en base.
+    """
+
+    def __init__(self, db, scheduler: Optional[ExamScheduler] = None):
+        self.db = db
+        self.scheduler = scheduler or ExamScheduler(db)
+
+    def _verdict_presolve(self, probleme, scenario, nb_impossibles) -> Optional[str]:
+        """Raison pour laquelle les bornes excluent le scénario, ou None."""
+        rapport = analyser_faisabilite(appliquer_scenario(probleme, scenario))
+        if rapport['raisons']:
+            return rapport['raisons'][0]
+        if len(rapport['modules_impossibles']) > nb_impossibles:
+            return f"{len(rapport['modules_impossibles']) - nb_impossibles} module(s) sans salle assez grande"
+        return None
+
+    def _rechercher(self, probleme, scenario_pour: Callable[[int], Dict], haut: int, haut_max: int,
+                    max_workers=None, progress=None):
+        """
+        Plus petit k de [1, haut_max] admissible, en supposant l'admissibilité croissante en k.
+        progress(faits, total, score, unité) est appelé après chaque tour de résolutions ; s'il
+        renvoie False, la recherche s'arrête. Renvoie (minimum ou None, borne inférieure, essais),
+        ou None si la recherche a été annulée.
+        """
+        reference = analyser_faisabilite(probleme)
+        nb_impossibles = len(reference['modules_impossibles'])
+        cible = len(probleme['modules']) - nb_impossibles
+        essais = []
+
+        # 1. Borne inférieure par les seules bornes de l'analyse préalable
+        bas, h = 1, haut_max
+        while bas < h:
+            k = (bas + h) // 2
+            if self._verdict_presolve(probleme, scenario_pour(k), nb_impossibles) is None:
+                h = k
+            else:
+                bas = k + 1
+        borne_inferieure = bas
+        if self._verdict_presolve(probleme, scenario_pour(bas), nb_impossibles) is not None:
+            return None, borne_inferieure, essais
+
+        nb_workers = max_workers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=nb_workers, mp_context=multiprocessing.get_context('spawn'))
+        resultats = {}
+
+        def evaluer(valeurs):
+            """Résout en parallèle les valeurs non encore essayées ; True si tous les modules sont placés."""
+            a_resoudre = [k for k in valeurs if k not in resultats]
+            for k in list(a_resoudre):
+                raison = self._verdict_presolve(probleme, scenario_pour(k), nb_impossibles)
+                if raison:
+                    resultats[k] = False
+                    essais.append({'valeur': k, 'admissible': False, 'verdict': 'bornes', 'detail': raison})
+                    a_resoudre.remove(k)
+            futures = {k: executor.submit(run_scenario, probleme, scenario_pour(k)) for k in a_resoudre}
+            for k, future in futures.items():
+                ligne = future.result()
+                resultats[k] = ligne['places'] >= cible
+                essais.append({'valeur': k, 'admissible': resultats[k], 'verdict': 'moteur',
+                               'detail': f"{ligne['places']}/{cible} modules placés, {ligne['jours_utilises']} jours utilisés",
+                               'duree_s': ligne['duree_s']})
+            return [resultats[k] for k in valeurs]
+
+        try:
+            # 2. Une valeur admissible : haut, puis par doublement jusqu'à haut_max
+            bas, haut = borne_inferieure, max(haut, borne_inferieure)
+            while not evaluer([haut])[0]:
+                if haut >= haut_max:
+                    return None, borne_inferieure, essais
+                bas, haut = haut + 1, min(2 * haut, haut_max)
+                if progress and progress(0, 1, None, 'valeurs écartées') is False:
+                    return None
+
+            # 3. Recherche k-aire dans [bas, haut[ : haut est admissible
+            largeur = haut - bas
+            while bas < haut:
+                n = min(nb_workers, haut - bas)
+                valeurs = sorted({bas + (haut - bas) * i // (n + 1) for i in range(1, n + 1)})
+                verdicts = evaluer(valeurs)
+                admissibles = [k for k, ok in zip(valeurs, verdicts) if ok]
+                if admissibles:
+                    haut = admissibles[0]
+                echecs = [k for k, ok in zip(valeurs, verdicts) if not ok and k < haut]
+                if echecs:
+                    bas = max(bas, echecs[-1] + 1)
+                if progress and progress(largeur - (haut - bas), largeur, None, 'valeurs écartées') is False:
+                    return None
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return haut, borne_inferieure, essais
+
+    def jours_minimum(self, periode_id, dept_id=None, espacement=None, max_workers=None, progress=None):
+        """
+        Plus petit nombre de jours d'examen (jours ouvrés hors jours exclus, depuis le début de
+        la période) plaçant tous les modules. Au-delà de la période, des jours sont ajoutés
+        après sa fin. progress : voir _rechercher. Renvoie (True, rapport) ou (False, {"error": ...}).
+        """
+        target_periode, probleme = self.scheduler._charger_probleme(periode_id, dept_id, espacement)
+        if target_periode is None:
+            return False, {"error": probleme}
+        calendrier = probleme['calendrier']
+        nb_jours = calendrier.nb_jours
+
+        def scenario_pour(k):
+            if k <= nb_jours:
+                return {'date_fin': calendrier.jours[k - 1]}
+            return {'jours_supplementaires': k - nb_jours}
+
+        recherche = self._rechercher(
+            probleme, scenario_pour, max(nb_jours, 1), max(JOURS_MAX, nb_jours), max_workers, progress
+        )
+        if recherche is None:
+            return False, {"error": "Recherche annulée", "cancelled": True}
+        minimum, borne_inferieure, essais = recherche
+        rapport = {
+            'critere': 'jours',
+            'disponible': nb_jours,
+            'minimum': minimum,
+            'borne_inferieure': borne_inferieure,
+            'essais': pd.DataFrame(essais)
+        }
+        if minimum is not None:
+            rapport['date_fin'] = appliquer_scenario(probleme, scenario_pour(minimum))['date_fin']
+        return True, rapport
+
+    def salles_minimum(self, periode_id, dept_id=None, espacement=None, max_workers=None, progress=None):
+        """
+        Plus petit nombre de salles (retenues par capacité décroissante) plaçant tous les
+        modules sur la période telle qu'elle est. progress : voir _rechercher.
+        Renvoie (True, rapport) ou (False, {"error": ...}).
+        """
+        target_periode, probleme = self.scheduler._charger_probleme(periode_id, dept_id, espacement)
+        if target_periode is None:
+            return False, {"error": probleme}
+        ordre: List[Dict] = sorted(probleme['salles'], key=lambda s: (-s['capacite_examen'], s['id']))
+
+        def scenario_pour(k):
+            return {'salles_fermees': [s['id'] for s in ordre[k:]]}
+
+        recherche = self._rechercher(probleme, scenario_pour, len(ordre), len(ordre), max_workers, progress)
+        if recherche is None:
+            return False, {"error": "Recherche annulée", "cancelled": True}
+        minimum, borne_inferieure, essais = recherche
+        rapport = {
+            'critere': 'salles',
+            'disponible': len(ordre),
+            'minimum': minimum,
+            'borne_inferieure': borne_inferieure,
+            'essais': pd.DataFrame(essais)
+        }
+        if minimum is not None:
+            rapport['salles'] = [s['nom'] for s in ordre[:minimum]]
+        return True, rapport
@@ -0,0 +1,72 @@
+from array import array
+from typing import Dict, List, Sequence, Tuple
+
+
+class CompactModel:
+    """
+    Représentation compacte d'un problème pour le moteur glouton : modules, salles,
+    professeurs et formations renumérotés en index denses (0 .. n - 1), attributs lus dans
+    la boucle de placement rangés en tableaux contigus (array), et occupation tenue en
+    bitsets de créneaux (un entier Python par salle et par professeur, bit s = créneau s).
+    Tester une salle ou un professeur pour un examen est alors un seul ET avec le masque
+    des créneaux recouverts, au lieu d'un test d'appartenance par créneau sur des clés
+    (identifiant, créneau) ; absences déclarées et réservations d'autres périodes sont
+    fusionnées dès la construction dans les bitsets de départ.
+    """
+
+    __slots__ = ('modules', 'module_ids', 'durees', 'nb_inscrits', 'formations', 'voisins',
+                 'salle_ids', 'salle_index', 'batiments', 'prof_ids', 'prof_index', 'nb_jours',
+                 'occ_salle', 'occ_prof', 'charge_jour', 'jours_formation', 'jour_module', '_salles_denses')
+
+    def __init__(self, probleme: Dict, profs: Sequence[Dict]):
+        self.modules: List[Dict] = probleme['modules']
+        modules = self.modules
+        self.module_ids = array('q', (m['id'] for m in modules))
+        self.durees = array('i', (m['duree_examen'] for m in modules))
+        self.nb_inscrits = array('i', (m['nb_inscrits'] for m in modules))
+        index_formation = {}
+        self.formations = array('i', (index_formation.setdefault(m['formation_id'], len(index_formation))
+                                      for m in modules))
+        position = {m['id']: i for i, m in enumerate(modules)}
+        conflits = probleme.get('conflits') or {}
+        self.voisins = [
+            tuple(position[v] for v in conflits.get(m['id'], ()) if v in position) for m in modules
+        ]
+
+        salles = probleme['salles']
+        self.salle_ids = array('q', (s['id'] for s in salles))
+        self.salle_index = {s['id']: i for i, s in enumerate(salles)}
+        self.batiments = [s['batiment'] for s in salles]
+
+        self.prof_ids = array('q', (p['id'] for p in profs))
+        self.prof_index = {p['id']: i for i, p in enumerate(profs)}
+        self.nb_jours = probleme['calendrier'].nb_jours
+
+        # Occupation de départ : réservations d'autres périodes, absences déclarées
+        salles_reservees = probleme.get('salles_reservees') or {}
+        indisponibilites = probleme.get('indisponibilites') or {}
+        self.occ_salle = [salles_reservees.get(s['id'], 0) for s in salles]
+        self.occ_prof = [indisponibilites.get(p['id'], 0) for p in profs]
+        self.charge_jour = array('i', bytes(4 * len(profs) * self.nb_jours))
+        for (prof_id, jour), n in (probleme.get('surveillances_externes') or {}).items():
+            if prof_id in self.prof_index:
+                self.charge_jour[self.prof_index[prof_id] * self.nb_jours + jour] += n
+        # Jours occupés par formation (bit j = jour j) et jour de chaque module placé (-1 sinon)
+        self.jours_formation = [0] * len(index_formation)
+        self.jour_module = array('i', [-1]) * len(modules)
+        self._salles_denses = {}
+
+    def salles_denses(self, salles: List[Dict]) -> Tuple[int, ...]:
+        """Index denses d'une liste de salles de l'index (mémorisée : les listes de l'index le sont aussi)."""
+        entree = self._salles_denses.get(id(salles))
+        if entree is None:
+            entree = (salles, tuple(self.salle_index[s['id']] for s in salles))
+            self._salles_denses[id(salles)] = entree
+        return entree[1]
+
+    def jour_interdit(self, m: int, jour: int) -> bool:
+        """La formation du module, ou un module partageant ses étudiants, passe déjà un examen ce jour-là."""
+        if self.jours_formation[self.formations[m]] >> jour & 1:
+            return True
+        jour_module = self.jour_module
+        return any(jour_module[v] == jour for v in self.voisins[m])
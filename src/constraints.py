@@ -1,17 +1,32 @@
 from datetime import datetime, timedelta
 from typing import List, Dict, Tuple
+from src.incidence import IncidenceCache
 
 class ConstraintChecker:
-    def __init__(self, db):
+    def __init__(self, db, incidence=None):
         self.db = db
+        self.incidence = incidence or IncidenceCache(db)
     
     def check_student_conflicts(self, examen_data: Dict, existing_examens: List[Dict]) -> Tuple[bool, str]:
         exam_date = examen_data['date_heure'].date() if isinstance(examen_data['date_heure'], datetime) else examen_data['date_heure']
         
+        same_day = []
         for existing in existing_examens:
             existing_date = existing['date_heure'].date() if isinstance(existing['date_heure'], datetime) else existing['date_heure']
             if existing_date == exam_date and existing['module_id'] != examen_data['module_id']:
-                return False, "Conflit potentiel étudiant"
+                same_day.append(existing['module_id'])
+        
+        if not same_day:
+            return True, "OK"
+        
+        # Avec la période, les étudiants réellement communs sont comptés sur la matrice d'incidence
+        incidence = self.incidence.load(examen_data['periode_id']) if examen_data.get('periode_id') else None
+        if incidence is None:
+            return False, "Conflit potentiel étudiant"
+        
+        communs = incidence.etudiants_communs(examen_data['module_id'], same_day)
+        if communs:
+            return False, f"Conflit: {communs} étudiant(s) ont déjà un examen ce jour"
         
         return True, "OK"
     
@@ -21,7 +36,7 @@ class ConstraintChecker:
         query = """
             SELECT COUNT(DISTINCT ex.id) as count
             FROM surveillances s
-            JOIN examens ex ON s.examen_id = ex.id
+            JOIN examens_publies ex ON s.examen_id = ex.id
             WHERE s.prof_id = %s AND DATE(ex.date_heure) = %s
         """
         result = self.db.execute_query(query, (prof_id, exam_date))
@@ -32,20 +47,38 @@ class ConstraintChecker:
         query_overlap = """
             SELECT ex.id, m.nom
             FROM surveillances s
-            JOIN examens ex ON s.examen_id = ex.id
+            JOIN examens_publies ex ON s.examen_id = ex.id
             JOIN modules m ON ex.module_id = m.id
             WHERE s.prof_id = %s
-              AND ex.date_heure < %s
-              AND ex.date_heure + (ex.duree_minutes || ' minutes')::INTERVAL > %s
+              AND ex.creneau && tsrange(%s, %s)
         """
         end_time = date_heure + timedelta(minutes=duree_minutes)
-        overlaps = self.db.execute_query(query_overlap, (prof_id, end_time, date_heure))
+        overlaps = self.db.execute_query(query_overlap, (prof_id, date_heure, end_time))
         
         if overlaps:
             return False, f"Conflit: Chevauchement horaire avec l'examen {overlaps[0]['nom']}"
         
         return True, "OK"
     
+    def check_professor_availability(self, prof_id: int, date_heure: datetime, duree_minutes: int) -> Tuple[bool, str]:
+        query = """
+            SELECT debut, fin, motif
+            FROM professeur_indisponibilites
+            WHERE prof_id = %s
+              AND tsrange(debut, fin) && tsrange(%s, %s)
+            ORDER BY debut
+            LIMIT 1
+        """
+        end_time = date_heure + timedelta(minutes=duree_minutes)
+        absences = self.db.execute_query(query, (prof_id, date_heure, end_time))
+        
+        if absences:
+            absence = absences[0]
+            motif = f" ({absence['motif']})" if absence['motif'] else ""
+            return False, f"Professeur indisponible du {absence['debut']:%d/%m %H:%M} au {absence['fin']:%d/%m %H:%M}{motif}"
+        
+        return True, "OK"
+    
     def check_room_capacity(self, salle_id: int, nb_inscrits: int) -> Tuple[bool, str]:
         query = "SELECT capacite_examen, nom FROM lieu_examen WHERE id = %s"
         result = self.db.execute_query(query, (salle_id,))
@@ -64,13 +97,12 @@ class ConstraintChecker:
         
         query = """
             SELECT ex.id, m.nom
-            FROM examens ex
+            FROM examens_publies ex
             JOIN modules m ON ex.module_id = m.id
             WHERE ex.salle_id = %s
-              AND ex.date_heure < %s
-              AND ex.date_heure + (ex.duree_minutes || ' minutes')::INTERVAL > %s
+              AND ex.creneau && tsrange(%s, %s)
         """
-        conflicts = self.db.execute_query(query, (salle_id, end_time, date_heure))
+        conflicts = self.db.execute_query(query, (salle_id, date_heure, end_time))
         
         if conflicts:
             return False, f"Salle occupée par l'examen {conflicts[0]['nom']}"
@@ -104,14 +136,23 @@ class ConstraintChecker:
         if not valid:
             errors.append(msg)
         
+        valid, msg = self.check_professor_availability(
+            examen_data['prof_responsable_id'],
+            examen_data['date_heure'],
+            examen_data['duree_minutes']
+        )
+        if not valid:
+            errors.append(msg)
+        
         return len(errors) == 0, errors
     
-    def get_all_conflicts(self):
+    def get_all_conflicts(self, periode_id: int = None):
         conflicts = {
-            'etudiants': self.db.get_conflits_etudiants(),
-            'professeurs': self.db.get_conflits_professeurs(),
-            'capacite': self.db.get_conflits_capacite(),
-            'salles': self.db.get_conflits_salles()
+            'etudiants': self.db.get_conflits_etudiants(periode_id),
+            'professeurs': self.db.get_conflits_professeurs(periode_id),
+            'capacite': self.db.get_conflits_capacite(periode_id),
+            'salles': self.db.get_conflits_salles(periode_id),
+            'indisponibilites': self.db.get_conflits_indisponibilites(periode_id)
         }
         
         total = sum(len(v) for v in conflicts.values())
@@ -1,8 +1,16 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, Json
+import numpy as np
+import pandas as pd
 import os
 from contextlib import contextmanager
 
+# PostgreSQL type OIDs read by fetch_frame into typed numpy columns
+PG_ENTIERS = {20, 21, 23}           # int8, int2, int4
+PG_REELS = {700, 701, 1700}         # float4, float8, numeric
+PG_BOOLEENS = {16}
+PG_HORODATAGES = {1114, 1184}       # timestamp, timestamptz
+
 class Database:
     def __init__(self):
         # Try Streamlit Cloud secrets first (production)
@@ -60,6 +68,34 @@ class Database:
                 return cursor.fetchall()
             return None
     
+    def fetch_frame(self, query, params=None):
+        """
+        Runs a query and returns a DataFrame built column by column: rows are read with a plain
+        tuple cursor (no dict per row) and each column is converted once from its PostgreSQL
+        type (integers, reals and numerics, booleans, timestamps). Integer or boolean columns
+        holding NULLs fall back to float / object, as pandas would infer them.
+        """
+        with self.get_cursor(dict_cursor=False) as cursor:
+            cursor.execute(query, params)
+            description = cursor.description
+            rows = cursor.fetchall()
+        
+        n = len(rows)
+        columns = zip(*rows) if n else ((),) * len(description)
+        data = {}
+        for col, values in zip(description, columns):
+            if col.type_code in PG_ENTIERS and None not in values:
+                data[col.name] = np.fromiter(values, dtype=np.int64, count=n)
+            elif col.type_code in PG_ENTIERS or col.type_code in PG_REELS:
+                data[col.name] = np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64, count=n)
+            elif col.type_code in PG_BOOLEENS and None not in values:
+                data[col.name] = np.fromiter(values, dtype=bool, count=n)
+            elif col.type_code in PG_HORODATAGES:
+                data[col.name] = pd.to_datetime(pd.Series(values, dtype=object))
+            else:
+                data[col.name] = pd.Series(values)
+        return pd.DataFrame(data, index=pd.RangeIndex(n))
+    
     def execute_many(self, query, params_list):
         with self.get_cursor(dict_cursor=False) as cursor:
             cursor.executemany(query, params_list)
@@ -100,33 +136,37 @@ class Database:
         query = "SELECT * FROM departements ORDER BY nom"
         return self.execute_query(query)
     
-    def get_formations(self, dept_id=None):
+    def get_formations(self, dept_id=None, frame=False):
+        read = self.fetch_frame if frame else self.execute_query
         if dept_id:
             query = "SELECT * FROM formations WHERE dept_id = %s ORDER BY nom"
-            return self.execute_query(query, (dept_id,))
+            return read(query, (dept_id,))
         query = "SELECT * FROM formations ORDER BY nom"
-        return self.execute_query(query)
+        return read(query)
     
-    def get_etudiants(self, formation_id=None):
+    def get_etudiants(self, formation_id=None, frame=False):
+        read = self.fetch_frame if frame else self.execute_query
         if formation_id:
             query = "SELECT * FROM etudiants WHERE formation_id = %s ORDER BY nom, prenom"
-            return self.execute_query(query, (formation_id,))
+            return read(query, (formation_id,))
         query = "SELECT * FROM etudiants ORDER BY nom, prenom"
-        return self.execute_query(query)
+        return read(query)
     
-    def get_professeurs(self, dept_id=None):
+    def get_professeurs(self, dept_id=None, frame=False):
+        read = self.fetch_frame if frame else self.execute_query
         if dept_id:
             query = "SELECT * FROM professeurs WHERE dept_id = %s ORDER BY nom, prenom"
-            return self.execute_query(query, (dept_id,))
+            return read(query, (dept_id,))
         query = "SELECT * FROM professeurs ORDER BY nom, prenom"
-        return self.execute_query(query)
+        return read(query)
     
-    def get_modules(self, formation_id=None):
+    def get_modules(self, formation_id=None, frame=False):
+        read = self.fetch_frame if frame else self.execute_query
         if formation_id:
             query = "SELECT * FROM modules WHERE formation_id = %s ORDER BY nom"
-            return self.execute_query(query, (formation_id,))
+            return read(query, (formation_id,))
         query = "SELECT * FROM modules ORDER BY nom"
-        return self.execute_query(query)
+        return read(query)
     
     def get_lieu_examen(self, type_lieu=None):
         if type_lieu:
@@ -137,63 +177,214 @@ class Database:
             res = self.execute_query(query)
         return res
     
-    def get_examens(self, periode_id=None):
+    def get_examens(self, periode_id=None, frame=False):
+        read = self.fetch_frame if frame else self.execute_query
         if periode_id:
             query = """
                 SELECT e.*, m.nom as module_nom, l.nom as salle_nom, l.capacite_examen,
                        p.nom || ' ' || p.prenom as professeur
-                FROM examens e
+                FROM examens_publies e
                 JOIN modules m ON e.module_id = m.id
                 JOIN lieu_examen l ON e.salle_id = l.id
                 JOIN professeurs p ON e.prof_responsable_id = p.id
                 WHERE e.periode_id = %s
                 ORDER BY e.date_heure
             """
-            return self.execute_query(query, (periode_id,))
+            return read(query, (periode_id,))
         query = """
             SELECT e.*, m.nom as module_nom, l.nom as salle_nom, l.capacite_examen,
                    p.nom || ' ' || p.prenom as professeur
-            FROM examens e
+            FROM examens_publies e
             JOIN modules m ON e.module_id = m.id
             JOIN lieu_examen l ON e.salle_id = l.id
             JOIN professeurs p ON e.prof_responsable_id = p.id
             ORDER BY e.date_heure
         """
-        return self.execute_query(query)
+        return read(query)
+    
+    def get_colonnes_examens(self, periode_id):
+        """
+        Columns of the period's published exams in a single row of arrays (one array per column,
+        aligned): module, day (days since 1970-01-01), enrolled and room capacity, plus the
+        professor and day of every surveillance
+        """
+        query = """
+            WITH ex AS (
+                SELECT e.id, e.module_id, e.date_heure::date - DATE '1970-01-01' AS jour,
+                       e.nb_inscrits, l.capacite_examen
+                FROM examens_publies e
+                JOIN lieu_examen l ON l.id = e.salle_id
+                WHERE e.periode_id = %s AND e.statut <> 'annulé'
+            )
+            SELECT
+                (SELECT COALESCE(array_agg(module_id ORDER BY id), '{}') FROM ex) AS module_id,
+                (SELECT COALESCE(array_agg(jour ORDER BY id), '{}') FROM ex) AS jour,
+                (SELECT COALESCE(array_agg(nb_inscrits ORDER BY id), '{}') FROM ex) AS nb_inscrits,
+                (SELECT COALESCE(array_agg(capacite_examen ORDER BY id), '{}') FROM ex) AS capacite_examen,
+                (SELECT COALESCE(array_agg(s.prof_id ORDER BY s.id), '{}')
+                 FROM surveillances s JOIN ex ON ex.id = s.examen_id) AS surveillance_prof,
+                (SELECT COALESCE(array_agg(ex.jour ORDER BY s.id), '{}')
+                 FROM surveillances s JOIN ex ON ex.id = s.examen_id) AS surveillance_jour
+        """
+        result = self.execute_query(query, (periode_id,))
+        return result[0] if result else None
+    
+    def get_placements_publies(self, periode_id):
+        """Module, room and start time of every exam in the period's published schedule"""
+        query = """
+            SELECT module_id, salle_id, date_heure
+            FROM examens_publies
+            WHERE periode_id = %s AND statut <> 'annulé'
+        """
+        return self.execute_query(query, (periode_id,))
+    
+    def get_occupations_publiees(self, date_debut, date_fin, exclure_periodes=()):
+        """
+        Room and professor bookings of every published schedule overlapping [date_debut, date_fin]
+        (one row per surveillance), except those of the excluded periods
+        """
+        query = """
+            SELECT ex.periode_id, ex.salle_id, s.prof_id, lower(ex.creneau) as debut, upper(ex.creneau) as fin
+            FROM examens_publies ex
+            LEFT JOIN surveillances s ON s.examen_id = ex.id
+            WHERE ex.statut <> 'annulé'
+              AND ex.creneau && tsrange(%s::date, %s::date + 1)
+              AND NOT (ex.periode_id = ANY(%s))
+        """
+        return self.execute_query(query, (date_debut, date_fin, list(exclure_periodes)))
     
     def get_kpi_global(self):
         query = "SELECT * FROM kpi_global"
         result = self.execute_query(query)
         return result[0] if result else {}
     
-    def get_conflits_etudiants(self):
+    def get_conflits_etudiants(self, periode_id=None):
+        if periode_id:
+            query = "SELECT * FROM conflits_etudiants_periode(%s) ORDER BY date_conflit, nb_examens DESC"
+            return self.execute_query(query, (periode_id,))
         query = "SELECT * FROM conflits_etudiants ORDER BY date_conflit, nb_examens DESC"
         return self.execute_query(query)
     
-    def get_conflits_professeurs(self):
+    def get_conflits_professeurs(self, periode_id=None):
+        if periode_id:
+            query = "SELECT * FROM conflits_professeurs_periode(%s) ORDER BY date_conflit, nb_examens DESC"
+            return self.execute_query(query, (periode_id,))
         query = "SELECT * FROM conflits_professeurs ORDER BY date_conflit, nb_examens DESC"
         return self.execute_query(query)
     
-    def get_conflits_capacite(self):
+    def get_conflits_capacite(self, periode_id=None):
+        if periode_id:
+            query = "SELECT * FROM conflits_capacite_periode(%s) ORDER BY depassement DESC"
+            return self.execute_query(query, (periode_id,))
         query = "SELECT * FROM conflits_capacite ORDER BY depassement DESC"
         return self.execute_query(query)
     
-    def get_conflits_salles(self):
+    def get_conflits_salles(self, periode_id=None):
+        if periode_id:
+            query = "SELECT * FROM conflits_salles_periode(%s) ORDER BY debut1"
+            return self.execute_query(query, (periode_id,))
         query = "SELECT * FROM conflits_salles ORDER BY debut1"
         return self.execute_query(query)
     
-    def get_occupation_salles(self):
-        query = "SELECT * FROM occupation_salles_par_jour ORDER BY date_examen"
+    def get_conflits_indisponibilites(self, periode_id=None):
+        if periode_id:
+            query = "SELECT * FROM conflits_indisponibilites_periode(%s) ORDER BY date_heure"
+            return self.execute_query(query, (periode_id,))
+        query = "SELECT * FROM conflits_indisponibilites ORDER BY date_heure"
         return self.execute_query(query)
+
+    def get_indisponibilites(self, periode_id=None, prof_id=None):
+        """Declared professor unavailabilities, optionally those overlapping a period and/or for one professor"""
+        query = """
+            SELECT i.*, p.nom, p.prenom, p.email
+            FROM professeur_indisponibilites i
+            JOIN professeurs p ON p.id = i.prof_id
+            WHERE (%(prof_id)s IS NULL OR i.prof_id = %(prof_id)s)
+              AND (%(periode_id)s IS NULL OR EXISTS (
+                  SELECT 1 FROM periodes_examen pe
+                  WHERE pe.id = %(periode_id)s
+                    AND i.fin > pe.date_debut AND i.debut < pe.date_fin + 1
+              ))
+            ORDER BY i.prof_id, i.debut
+        """
+        return self.execute_query(query, {'periode_id': periode_id, 'prof_id': prof_id})
+
+    def add_indisponibilite(self, prof_id, debut, fin, motif=None):
+        query = """
+            INSERT INTO professeur_indisponibilites (prof_id, debut, fin, motif)
+            VALUES (%s, %s, %s, %s) RETURNING id
+        """
+        result = self.execute_query(query, (prof_id, debut, fin, motif))
+        return result[0]['id'] if result else None
+
+    def delete_indisponibilite(self, indisponibilite_id):
+        self.execute_query("DELETE FROM professeur_indisponibilites WHERE id = %s", (indisponibilite_id,), fetch=False)
+
+    def import_indisponibilites(self, df, replace=False):
+        """
+        Bulk import of professor unavailabilities from a DataFrame with columns
+        (email or prof_id), debut, fin and optionally motif. A fin without a time of day
+        (date cell, or midnight) ends a whole day and is inclusive; otherwise ranges are
+        [debut, fin). Returns (imported count, rejected rows with a reason).
+        """
+        profs = {p['email']: p['id'] for p in self.get_professeurs() if p['email']}
+        prof_ids = set(profs.values())
+        lignes, rejets = [], []
+        # Each column parsed once; unreadable or missing values become NaT
+        bornes = {}
+        for colonne in ('debut', 'fin'):
+            valeurs = df[colonne] if colonne in df else pd.Series(None, index=df.index, dtype=object)
+            bornes[colonne] = list(pd.to_datetime(valeurs, errors='coerce', format='mixed'))
+        for numero, row in enumerate(df.to_dict('records'), start=1):
+            if pd.notna(row.get('prof_id')):
+                prof_id = int(row['prof_id'])
+            else:
+                prof_id = profs.get(str(row.get('email', '')).strip())
+            if prof_id not in prof_ids:
+                rejets.append({'ligne': numero, 'raison': "Professeur inconnu"})
+                continue
+            debut, fin = bornes['debut'][numero - 1], bornes['fin'][numero - 1]
+            if pd.isna(debut) or pd.isna(fin):
+                rejets.append({'ligne': numero, 'raison': "Date invalide"})
+                continue
+            if fin == fin.normalize():
+                fin += pd.Timedelta(days=1)
+            if fin <= debut:
+                rejets.append({'ligne': numero, 'raison': "Plage vide ou invalide"})
+                continue
+            motif = row.get('motif')
+            lignes.append((prof_id, debut.to_pydatetime(), fin.to_pydatetime(),
+                           str(motif)[:100] if pd.notna(motif) else None))
+
+        if replace and lignes:
+            self.execute_query(
+                "DELETE FROM professeur_indisponibilites WHERE prof_id = ANY(%s)",
+                (sorted({l[0] for l in lignes}),), fetch=False
+            )
+        self.bulk_copy('professeur_indisponibilites', lignes, ['prof_id', 'debut', 'fin', 'motif'])
+        return len(lignes), rejets
+
+    def get_occupation_salles(self, frame=False):
+        read = self.fetch_frame if frame else self.execute_query
+        query = "SELECT * FROM occupation_salles_par_jour ORDER BY date_examen"
+        return read(query)
     
-    def get_charge_professeurs(self):
+    def get_charge_professeurs(self, frame=False):
+        read = self.fetch_frame if frame else self.execute_query
         query = "SELECT * FROM charge_professeurs ORDER BY nb_surveillances DESC"
-        return self.execute_query(query)
+        return read(query)
     
-    def get_stats_departement(self):
+    def get_stats_departement(self, frame=False):
+        read = self.fetch_frame if frame else self.execute_query
         query = "SELECT * FROM stats_departement ORDER BY nb_etudiants DESC"
-        return self.execute_query(query)
+        return read(query)
     
+    def get_dashboard_periode(self, periode_id=None):
+        """Whole dashboard payload for a period as one JSON document (single round-trip)"""
+        query = "SELECT get_dashboard_periode(%s) as payload"
+        result = self.execute_query(query, (periode_id,))
+        return result[0]['payload'] if result else {}
+
     def get_planning_etudiant(self, etudiant_id, periode_id):
         query = "SELECT * FROM get_planning_etudiant(%s, %s)"
         return self.execute_query(query, (etudiant_id, periode_id))
@@ -208,16 +399,78 @@ class Database:
         else:
             query = "SELECT * FROM periodes_examen ORDER BY date_debut DESC"
         return self.execute_query(query)
-    
-    def create_examen(self, module_id, prof_id, salle_id, periode_id, date_heure, duree_minutes, nb_inscrits):
+
+    def get_calendrier_periode(self, periode_id):
+        """Excluded dates of a period (including those excluded for every period) and building opening hours"""
+        jours = self.execute_query("""
+            SELECT DISTINCT date_exclue FROM jours_exclus
+            WHERE periode_id = %s OR periode_id IS NULL
+        """, (periode_id,))
+        horaires = self.get_horaires_batiments()
+        return {
+            'jours_exclus': [j['date_exclue'] for j in jours],
+            'horaires_batiments': {h['batiment']: (h['ouverture'], h['fermeture']) for h in horaires}
+        }
+
+    def update_calendrier_periode(self, periode_id, heures_creneaux, jours_ouvres):
+        """Slot template (start times) and working days (ISO weekdays) of a period"""
+        query = "UPDATE periodes_examen SET heures_creneaux = %s::TIME[], jours_ouvres = %s WHERE id = %s"
+        self.execute_query(query, (list(heures_creneaux), list(jours_ouvres), periode_id), fetch=False)
+
+    def get_jours_exclus(self, periode_id=None):
+        if periode_id:
+            query = "SELECT * FROM jours_exclus WHERE periode_id = %s OR periode_id IS NULL ORDER BY date_exclue"
+            return self.execute_query(query, (periode_id,))
+        return self.execute_query("SELECT * FROM jours_exclus ORDER BY date_exclue")
+
+    def add_jour_exclu(self, date_exclue, periode_id=None, motif=None):
+        """Exclude a day from one period, or from all periods when periode_id is None"""
+        # Days excluded from all periods are kept unique by the partial index idx_jours_exclus_global
+        cible = "(date_exclue) WHERE periode_id IS NULL" if periode_id is None else "(periode_id, date_exclue)"
+        query = f"""
+            INSERT INTO jours_exclus (periode_id, date_exclue, motif) VALUES (%s, %s, %s)
+            ON CONFLICT {cible} DO UPDATE SET motif = EXCLUDED.motif
+        """
+        self.execute_query(query, (periode_id, date_exclue, motif), fetch=False)
+
+    def delete_jour_exclu(self, jour_id):
+        self.execute_query("DELETE FROM jours_exclus WHERE id = %s", (jour_id,), fetch=False)
+
+    def get_horaires_batiments(self):
+        return self.execute_query("SELECT * FROM horaires_batiments ORDER BY batiment")
+
+    def set_horaires_batiment(self, batiment, ouverture, fermeture):
+        query = """
+            INSERT INTO horaires_batiments (batiment, ouverture, fermeture) VALUES (%s, %s, %s)
+            ON CONFLICT (batiment) DO UPDATE SET ouverture = EXCLUDED.ouverture, fermeture = EXCLUDED.fermeture
+        """
+        self.execute_query(query, (batiment, ouverture, fermeture), fetch=False)
+
+    def delete_horaires_batiment(self, batiment):
+        self.execute_query("DELETE FROM horaires_batiments WHERE batiment = %s", (batiment,), fetch=False)
+
+    def get_distances_batiments(self):
+        """Walking distance in metres between buildings, as {(batiment_a, batiment_b): distance_m}"""
+        rows = self.execute_query("SELECT batiment_a, batiment_b, distance_m FROM distances_batiments")
+        return {(r['batiment_a'], r['batiment_b']): r['distance_m'] for r in rows}
+
+    def set_distance_batiments(self, batiment_a, batiment_b, distance_m):
+        batiment_a, batiment_b = sorted((batiment_a, batiment_b))
         query = """
-            INSERT INTO examens (module_id, prof_responsable_id, salle_id, periode_id, 
+            INSERT INTO distances_batiments (batiment_a, batiment_b, distance_m) VALUES (%s, %s, %s)
+            ON CONFLICT (batiment_a, batiment_b) DO UPDATE SET distance_m = EXCLUDED.distance_m
+        """
+        self.execute_query(query, (batiment_a, batiment_b, distance_m), fetch=False)
+
+    def create_examen(self, module_id, prof_id, salle_id, periode_id, date_heure, duree_minutes, nb_inscrits, version_id):
+        query = """
+            INSERT INTO examens (module_id, prof_responsable_id, salle_id, periode_id, version_id,
                                 date_heure, duree_minutes, nb_inscrits)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
             RETURNING id
         """
         result = self.execute_query(query, 
-            (module_id, prof_id, salle_id, periode_id, date_heure, duree_minutes, nb_inscrits))
+            (module_id, prof_id, salle_id, periode_id, version_id, date_heure, duree_minutes, nb_inscrits))
         return result[0]['id'] if result else None
     
     def create_surveillance(self, examen_id, prof_id, role='surveillant'):
@@ -230,50 +483,304 @@ class Database:
         result = self.execute_query(query, (examen_id, prof_id, role))
         return result[0]['id'] if result else None
     
-    def batch_insert_exams(self, exams_data, surveillances_data):
+    def batch_insert_exams(self, exams_data, surveillances_data, version_id=None, version_info=None):
         """
         Batch insert exams and surveillances for high performance.
         exams_data: list of tuples (module_id, prof_id, salle_id, periode_id, date_heure, duree_minutes, nb_inscrits)
         surveillances_data: list of tuples (module_id, periode_id, prof_id, role) - we link via module+periode
+        version_id: draft schedule version receiving the rows. When omitted, a new draft
+        version of the exams' period is created in the same transaction.
+        version_info: optional dict (lance_par, strategie, metriques, duree_execution, empreinte, encodage)
+        stored on the new version.
+        Returns the version id. Nothing becomes visible to readers until it is published.
         """
         if not exams_data:
-            return
+            return None
 
         try:
             with self.get_connection() as conn:
                 with conn.cursor() as cur:
-                    
-                    args_str = ','.join(cur.mogrify("(%s,%s,%s,%s,%s,%s,%s,'planifié')", x).decode('utf-8') for x in exams_data)
-                    cur.execute("INSERT INTO examens (module_id, prof_responsable_id, salle_id, periode_id, date_heure, duree_minutes, nb_inscrits, statut) VALUES " + args_str + " RETURNING id, module_id")
-                    
-                    rows = cur.fetchall()
-                    module_exam_map = {row[1]: row[0] for row in rows}
-                    
-                    final_surveillances = []
-                    for mod_id, per_id, prof_id, role in surveillances_data:
-                        if mod_id in module_exam_map:
-                            final_surveillances.append((module_exam_map[mod_id], prof_id, role))
-                    
-                    if final_surveillances:
-                        args_surv = ','.join(cur.mogrify("(%s,%s,%s)", x).decode('utf-8') for x in final_surveillances)
-                        cur.execute("INSERT INTO surveillances (examen_id, prof_id, role) VALUES " + args_surv)
-                
+                    version_id = self._insert_version(cur, exams_data, surveillances_data, version_id, version_info)
                 conn.commit()
+            return version_id
         except Exception as e:
             print(f"Batch insert error: {e}")
             raise e
     
+    def _insert_version(self, cur, exams_data, surveillances_data, version_id=None, version_info=None):
+        """Rows of batch_insert_exams written on the caller's cursor, inside its transaction"""
+        if version_id is None:
+            info = version_info or {}
+            cur.execute(
+                """
+                INSERT INTO versions_planning
+                    (periode_id, lance_par, strategie, metriques, duree_execution, empreinte, encodage)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING id
+                """,
+                (
+                    exams_data[0][3],
+                    info.get('lance_par'),
+                    info.get('strategie'),
+                    Json(info['metriques']) if info.get('metriques') is not None else None,
+                    info.get('duree_execution'),
+                    info.get('empreinte'),
+                    psycopg2.Binary(info['encodage']) if info.get('encodage') is not None else None
+                )
+            )
+            version_id = cur.fetchone()[0]
+        
+        args_str = ','.join(cur.mogrify("(%s,%s,%s,%s,%s,%s,%s,%s,'planifié')", x + (version_id,)).decode('utf-8') for x in exams_data)
+        cur.execute("INSERT INTO examens (module_id, prof_responsable_id, salle_id, periode_id, date_heure, duree_minutes, nb_inscrits, version_id, statut) VALUES " + args_str + " RETURNING id, module_id")
+        
+        rows = cur.fetchall()
+        module_exam_map = {row[1]: row[0] for row in rows}
+        
+        final_surveillances = []
+        for mod_id, per_id, prof_id, role in surveillances_data:
+            if mod_id in module_exam_map:
+                final_surveillances.append((module_exam_map[mod_id], prof_id, role))
+        
+        if final_surveillances:
+            args_surv = ','.join(cur.mogrify("(%s,%s,%s)", x).decode('utf-8') for x in final_surveillances)
+            cur.execute("INSERT INTO surveillances (examen_id, prof_id, role) VALUES " + args_surv)
+        return version_id
+    
+    def publish_versions_together(self, lots, keep=2):
+        """
+        Insert one new version per period and publish them all in a single transaction: readers
+        see either every period's previous schedule or every new one. lots: list of
+        (exams_data, surveillances_data, version_info) as for batch_insert_exams, one per period.
+        Old archived versions of these periods are purged in the same transaction.
+        Returns the version ids in the order of lots.
+        """
+        version_ids = []
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                for exams_data, surveillances_data, version_info in lots:
+                    version_ids.append(self._insert_version(cur, exams_data, surveillances_data,
+                                                            version_info=version_info))
+                # Periods locked in id order, as soumettre_job_planification does
+                publications = sorted(zip((lot[0][0][3] for lot in lots), version_ids))
+                for periode_id, version_id in publications:
+                    cur.execute("SELECT publier_version_planning(%s)", (version_id,))
+                for periode_id, _ in publications:
+                    cur.execute("SELECT purger_versions_archivees(%s, %s)", (periode_id, keep))
+        return version_ids
+    
+    def publish_version_planning(self, version_id):
+        """Make a version the visible schedule of its period (single transactional pointer swap)"""
+        self.execute_query("SELECT publier_version_planning(%s)", (version_id,))
+    
+    def get_versions_planning(self, periode_id):
+        query = """
+            SELECT v.id, v.statut, v.lance_par, v.strategie, v.metriques, v.duree_execution,
+                   v.created_at, v.publie_at, OCTET_LENGTH(v.encodage) as taille_encodage,
+                   EXISTS (SELECT 1 FROM examens ex WHERE ex.version_id = v.id) as materialisee
+            FROM versions_planning v
+            WHERE v.periode_id = %s
+            ORDER BY v.id DESC
+        """
+        return self.execute_query(query, (periode_id,))
+    
+    def get_version_planning(self, version_id):
+        query = """
+            SELECT v.*, EXISTS (SELECT 1 FROM examens ex WHERE ex.version_id = v.id) as materialisee
+            FROM versions_planning v
+            WHERE v.id = %s
+        """
+        result = self.execute_query(query, (version_id,))
+        return result[0] if result else None
+    
+    def find_version_by_empreinte(self, periode_id, empreinte):
+        """Most recent version of the period computed from identical inputs"""
+        query = """
+            SELECT id, statut FROM versions_planning
+            WHERE periode_id = %s AND empreinte = %s AND encodage IS NOT NULL
+            ORDER BY id DESC
+            LIMIT 1
+        """
+        result = self.execute_query(query, (periode_id, empreinte))
+        return result[0] if result else None
+    
+    def get_versions_encodage(self, version_ids):
+        query = "SELECT id, periode_id, encodage FROM versions_planning WHERE id = ANY(%s)"
+        return self.execute_query(query, ([int(v) for v in version_ids],))
+    
+    def purge_archived_versions(self, periode_id, keep=2):
+        """Drop exam rows of old archived versions; their compact encoding is kept"""
+        result = self.execute_query("SELECT purger_versions_archivees(%s, %s) as nb", (periode_id, keep))
+        return result[0]['nb'] if result else 0
+    
+    @contextmanager
+    def advisory_lock(self, classid, key):
+        """
+        Session-level advisory lock (classid, key) held on a dedicated connection for the
+        duration of the block. Yields True if it was acquired, False if another session holds it.
+        """
+        with self.get_connection() as conn:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_try_advisory_lock(%s, %s)", (classid, key))
+                acquired = cur.fetchone()[0]
+                try:
+                    yield acquired
+                finally:
+                    if acquired:
+                        cur.execute("SELECT pg_advisory_unlock(%s, %s)", (classid, key))
+    
+    def submit_job_planification(self, periode_id, type_job, parametres=None, lance_par=None):
+        """Queue a background job, or join the period's active one. Returns (job_id, existing)"""
+        query = "SELECT * FROM soumettre_job_planification(%s, %s, %s, %s)"
+        result = self.execute_query(query, (periode_id, type_job, Json(parametres) if parametres is not None else None, lance_par))
+        return result[0]['job_id'], result[0]['existant']
+    
+    def get_job_planification(self, job_id):
+        result = self.execute_query("SELECT * FROM jobs_planification WHERE id = %s", (job_id,))
+        return result[0] if result else None
+    
+    def get_active_job_planification(self, periode_id):
+        """Active job of the period, including a joint scheduling job covering it"""
+        query = """
+            SELECT * FROM jobs_planification
+            WHERE %s = ANY(periodes_job_planification(periode_id, type_job, parametres))
+              AND statut IN ('en_attente', 'en_cours')
+            ORDER BY id
+            LIMIT 1
+        """
+        result = self.execute_query(query, (periode_id,))
+        return result[0] if result else None
+    
+    def get_jobs_planification(self, periode_id, limit=10):
+        query = """
+            SELECT id, type_job, statut, lance_par, progression, message, meilleur_score,
+                   version_id, created_at, started_at, finished_at
+            FROM jobs_planification
+            WHERE %s = ANY(periodes_job_planification(periode_id, type_job, parametres))
+            ORDER BY id DESC
+            LIMIT %s
+        """
+        return self.execute_query(query, (periode_id, limit))
+    
+    def start_job_planification(self, job_id):
+        """Mark a queued job as running. Returns False if it was cancelled or already taken"""
+        query = """
+            UPDATE jobs_planification
+            SET statut = 'en_cours', started_at = CURRENT_TIMESTAMP
+            WHERE id = %s AND statut = 'en_attente'
+            RETURNING id
+        """
+        return bool(self.execute_query(query, (job_id,)))
+    
+    def update_job_progress(self, job_id, progression, message=None, meilleur_score=None):
+        """Record job progress; returns True if cancellation has been requested"""
+        query = """
+            UPDATE jobs_planification
+            SET progression = %s,
+                message = COALESCE(%s, message),
+                meilleur_score = COALESCE(%s, meilleur_score)
+            WHERE id = %s
+            RETURNING annulation_demandee
+        """
+        result = self.execute_query(query, (progression, message, meilleur_score, job_id))
+        return bool(result and result[0]['annulation_demandee'])
+    
+    def finish_job_planification(self, job_id, statut, resultat=None, message=None, version_id=None):
+        query = """
+            UPDATE jobs_planification
+            SET statut = %s,
+                resultat = %s,
+                message = COALESCE(%s, message),
+                version_id = %s,
+                progression = CASE WHEN %s = 'terminé' THEN 100 ELSE progression END,
+                finished_at = CURRENT_TIMESTAMP
+            WHERE id = %s
+        """
+        self.execute_query(
+            query,
+            (statut, Json(resultat) if resultat is not None else None, message, version_id, statut, job_id),
+            fetch=False
+        )
+    
+    def request_job_cancel(self, job_id):
+        """Cancel a queued job immediately; ask a running one to stop at its next progress report"""
+        query = """
+            UPDATE jobs_planification
+            SET annulation_demandee = TRUE,
+                statut = CASE WHEN statut = 'en_attente' THEN 'annulé' ELSE statut END,
+                finished_at = CASE WHEN statut = 'en_attente' THEN CURRENT_TIMESTAMP ELSE finished_at END
+            WHERE id = %s AND statut IN ('en_attente', 'en_cours')
+        """
+        self.execute_query(query, (job_id,), fetch=False)
+    
+    def get_version_donnees(self, nom):
+        """Modification counter of a table (bumped by trigger), used to invalidate disk caches"""
+        result = self.execute_query("SELECT version FROM versions_donnees WHERE nom = %s", (nom,))
+        return result[0]['version'] if result else 0
+
+    def get_incidence_session(self, periode_id):
+        """
+        (student, module) pairs of a period's inscriptions_session as an (n, 2) int array,
+        streamed with COPY TO STDOUT (no per-row Python objects). The inscriptions version
+        is read in the same snapshot. Returns (version, pairs).
+        """
+        import io
+
+        buf = io.BytesIO()
+        with self.get_connection() as conn:
+            conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+            with conn.cursor() as cur:
+                cur.execute("SELECT version FROM versions_donnees WHERE nom = 'inscriptions'")
+                row = cur.fetchone()
+                version = row[0] if row else 0
+                copy_query = cur.mogrify(
+                    """COPY (
+                        SELECT etudiant_id, module_id FROM inscriptions_session
+                        WHERE periode_id = %s ORDER BY etudiant_id, module_id
+                    ) TO STDOUT""",
+                    (periode_id,)
+                ).decode()
+                cur.copy_expert(copy_query, buf)
+
+        buf.seek(0)
+        if not buf.getbuffer().nbytes:
+            return version, np.empty((0, 2), dtype=np.int64)
+        pairs = pd.read_csv(buf, sep='\t', header=None, dtype='int64').to_numpy()
+        return version, pairs
+
     def get_inscriptions_count_by_module(self, annee_universitaire):
         query = """
-            SELECT module_id, COUNT(*) as nb_inscrits
-            FROM inscriptions
+            SELECT module_id, nb_inscrits
+            FROM module_enrollment_stats
             WHERE annee_universitaire = %s AND statut = 'inscrit'
-            GROUP BY module_id
         """
         return self.execute_query(query, (annee_universitaire,))
     
-    def get_modules_with_inscriptions(self):
-        """Get all modules with their enrollment counts and exam duration"""
+    def get_modules_with_inscriptions(self, periode_id=None):
+        """
+        Get modules with their enrollment counts and exam duration.
+        With periode_id, only the period's academic year, semester and session are counted
+        (enrolled students for a regular session, failed/absent ones for a resit session).
+        """
+        if periode_id:
+            query = """
+                SELECT 
+                    m.id,
+                    m.nom,
+                    m.code,
+                    m.formation_id,
+                    m.duree_examen,
+                    m.type_salle,
+                    m.equipements_requis,
+                    f.dept_id,
+                    e.nb_inscrits
+                FROM effectifs_session e
+                JOIN modules m ON m.id = e.module_id
+                LEFT JOIN formations f ON m.formation_id = f.id
+                WHERE e.periode_id = %s
+                ORDER BY e.nb_inscrits DESC
+            """
+            return self.execute_query(query, (periode_id,))
         query = """
             SELECT 
                 m.id,
@@ -281,27 +788,34 @@ class Database:
                 m.code,
                 m.formation_id,
                 m.duree_examen,
+                m.type_salle,
+                m.equipements_requis,
                 f.dept_id,
-                COUNT(i.id) as nb_inscrits
-            FROM modules m
-            LEFT JOIN inscriptions i ON m.id = i.module_id AND i.statut = 'inscrit'
+                SUM(s.nb_inscrits)::INTEGER as nb_inscrits
+            FROM module_enrollment_stats s
+            JOIN modules m ON m.id = s.module_id
             LEFT JOIN formations f ON m.formation_id = f.id
-            GROUP BY m.id, m.nom, m.code, m.formation_id, m.duree_examen, f.dept_id
-            HAVING COUNT(i.id) > 0
-            ORDER BY COUNT(i.id) DESC
+            WHERE s.statut = 'inscrit'
+            GROUP BY m.id, m.nom, m.code, m.formation_id, m.duree_examen, m.type_salle, m.equipements_requis, f.dept_id
+            HAVING SUM(s.nb_inscrits) > 0
+            ORDER BY SUM(s.nb_inscrits) DESC
         """
         return self.execute_query(query)
 
+    def update_exigences_module(self, module_id, type_salle=None, equipements_requis=()):
+        """Room requirements of a module's exam (room type or None, required equipment)"""
+        query = "UPDATE modules SET type_salle = %s, equipements_requis = %s WHERE id = %s"
+        self.execute_query(query, (type_salle, sorted(set(equipements_requis)), module_id), fetch=False)
+
     def delete_all_examens(self, periode_id):
-        """Delete all exams and related surveillances for a given period"""
-        self.execute_query(
-            "DELETE FROM surveillances WHERE examen_id IN (SELECT id FROM examens WHERE periode_id = %s)",
-            (periode_id,),
-            fetch=False
-        )
+        """
+        Delete every schedule version of a period, or of several periods scheduled jointly
+        (list of ids); exams and surveillances cascade
+        """
+        periode_ids = list(periode_id) if isinstance(periode_id, (list, tuple, set)) else [periode_id]
         self.execute_query(
-            "DELETE FROM examens WHERE periode_id = %s",
-            (periode_id,),
+            "DELETE FROM versions_planning WHERE periode_id = ANY(%s)",
+            (periode_ids,),
             fetch=False
         )
-        print(f"DEBUG: Deleted all exams for period {periode_id}")
+        print(f"DEBUG: Deleted all exams for period(s) {', '.join(map(str, periode_ids))}")
@@ -0,0 +1,131 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Modèle de créneaux par défaut (heures de début) et jours ouvrés (ISO : 1 = lundi ... 7 = dimanche)
+HEURES_DEFAUT = (time(8, 30), time(11, 0), time(14, 0))
+JOURS_OUVRES_DEFAUT = (1, 2, 3, 4, 5, 6, 7)
+
+
+def _minutes(h: time) -> int:
+    return h.hour * 60 + h.minute
+
+
+def demi_journee(debut: datetime) -> int:
+    """Index absolu de la demi-journée d'un début d'examen (matin / après-midi)."""
+    return 2 * debut.toordinal() + (debut.hour >= 12)
+
+
+class ExamCalendar:
+    """
+    Calendrier compilé d'une période : jours d'examen retenus (jours ouvrés, hors jours
+    exclus) × modèle de créneaux, numérotés de 0 à nb_creneaux - 1 dans l'ordre
+    chronologique. Le créneau s couvre le jour slot_jour[s] (index dans jours) à l'heure
+    heures[slot_heure[s]] ; les structures d'occupation du moteur sont indexées par s.
+    Les tables dérivées (créneaux recouverts par une durée, ouverture des bâtiments) sont
+    calculées une fois par (heure, durée) et mémorisées.
+    """
+
+    def __init__(self, jours: Sequence[date], heures: Iterable[time] = HEURES_DEFAUT,
+                 horaires_batiments: Optional[Dict[str, Tuple[time, time]]] = None):
+        self.jours = tuple(jours)
+        self.heures = tuple(sorted(heures))
+        self.horaires = dict(horaires_batiments or {})
+        nb_heures = len(self.heures)
+
+        self.slots = [datetime.combine(j, h) for j in self.jours for h in self.heures]
+        self.slot_jour = [s // nb_heures for s in range(len(self.slots))]
+        self.slot_heure = [s % nb_heures for s in range(len(self.slots))]
+        self.jour_ordinal = [d.toordinal() for d in self.jours]
+        self.slot_ordinal = [self.jour_ordinal[j] for j in self.slot_jour]
+        self.slot_demi_journee = [demi_journee(d) for d in self.slots]
+        self._index = {d: s for s, d in enumerate(self.slots)}
+        # Fin de la plage de chaque créneau : début du créneau suivant du jour, minuit pour le dernier
+        self.slot_fin = [
+            self.slots[s + 1] if self.slot_heure[s] + 1 < nb_heures
+            else datetime.combine(self.jours[self.slot_jour[s]], time()) + timedelta(days=1)
+            for s in range(len(self.slots))
+        ]
+        self._nb_couverts = {}
+        self._ouvert = {}
+
+    @classmethod
+    def compiler(cls, date_debut: date, date_fin: date, heures: Optional[Iterable[time]] = None,
+                 jours_ouvres: Optional[Iterable[int]] = None, jours_exclus: Iterable[date] = (),
+                 horaires_batiments: Optional[Dict[str, Tuple[time, time]]] = None) -> 'ExamCalendar':
+        ouvres = set(jours_ouvres or JOURS_OUVRES_DEFAUT)
+        exclus = set(jours_exclus)
+        jours = [
+            date_debut + timedelta(days=i)
+            for i in range((date_fin - date_debut).days + 1)
+            if (date_debut + timedelta(days=i)).isoweekday() in ouvres
+            and date_debut + timedelta(days=i) not in exclus
+        ]
+        return cls(jours, heures or HEURES_DEFAUT, horaires_batiments)
+
+    @property
+    def nb_jours(self) -> int:
+        return len(self.jours)
+
+    @property
+    def nb_heures(self) -> int:
+        return len(self.heures)
+
+    def slot(self, jour: int, heure: int) -> int:
+        return jour * len(self.heures) + heure
+
+    def index(self, debut: datetime) -> Optional[int]:
+        """Créneau commençant à debut, ou None s'il n'appartient pas au calendrier."""
+        return self._index.get(debut)
+
+    def nb_couverts(self, heure: int, duree: int) -> int:
+        """Nombre de créneaux du modèle recouverts par un examen de cette durée commençant à heures[heure]."""
+        cle = (heure, duree)
+        n = self._nb_couverts.get(cle)
+        if n is None:
+            fin = _minutes(self.heures[heure]) + duree
+            n = sum(1 for h in self.heures[heure:] if _minutes(h) < fin)
+            self._nb_couverts[cle] = n
+        return n
+
+    def couverts(self, slot: int, duree: int) -> range:
+        """Créneaux (même jour) recouverts par un examen de cette durée commençant au créneau slot."""
+        return range(slot, slot + self.nb_couverts(self.slot_heure[slot], duree))
+
+    def ouvert(self, batiment: str, slot: int, duree: int) -> bool:
+        """Le bâtiment est ouvert du début à la fin de l'examen (sans horaires déclarés : toujours)."""
+        horaires = self.horaires.get(batiment)
+        if horaires is None:
+            return True
+        cle = (batiment, self.slot_heure[slot], duree)
+        ok = self._ouvert.get(cle)
+        if ok is None:
+            debut = _minutes(self.heures[self.slot_heure[slot]])
+            ok = _minutes(horaires[0]) <= debut and debut + duree <= _minutes(horaires[1])
+            self._ouvert[cle] = ok
+        return ok
+
+    def masque(self, slot: int, duree: int) -> int:
+        """Bits des créneaux recouverts par un examen de cette durée commençant au créneau slot."""
+        return ((1 << self.nb_couverts(self.slot_heure[slot], duree)) - 1) << slot
+
+    def masque_plages(self, plages: Iterable[Tuple[datetime, datetime]]) -> int:
+        """
+        Bits des créneaux dont la plage [début, début du créneau suivant) chevauche une des
+        plages [debut, fin) : un examen recouvrant l'un de ces créneaux empiète sur la plage.
+        """
+        bits = 0
+        for debut, fin in plages:
+            premier = bisect_right(self.slot_fin, debut)
+            dernier = bisect_left(self.slots, fin)
+            if dernier > premier:
+                bits |= ((1 << (dernier - premier)) - 1) << premier
+        return bits
+
+    def signature(self) -> List:
+        """Description canonique (empreinte des solutions)."""
+        return [
+            [d.isoformat() for d in self.jours],
+            [h.isoformat() for h in self.heures],
+            sorted([b, o.isoformat(), f.isoformat()] for b, (o, f) in self.horaires.items())
+        ]
@@ -0,0 +1,248 @@
+import os
+import shutil
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.solution_cache import fingerprint
+
+# Répertoire du cache des matrices d'incidence (surchargeable par variable d'environnement)
+DEFAULT_INCIDENCE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'incidence')
+
+# Tableaux enregistrés pour chaque période (un fichier .npy chacun, relu en mémoire partagée)
+ARRAYS = ('etudiants', 'modules', 'csr_indptr', 'csr_indices', 'csc_indptr', 'csc_indices')
+
+
+class Incidence:
+    """
+    Matrice d'incidence étudiants × modules d'une période (inscriptions_session), sous forme
+    CSR (modules de chaque étudiant) et CSC (étudiants de chaque module). Lignes et colonnes
+    sont des index denses ; etudiants et modules donnent les identifiants correspondants.
+    """
+
+    def __init__(self, etudiants, modules, csr_indptr, csr_indices, csc_indptr, csc_indices):
+        self.etudiants = etudiants
+        self.modules = modules
+        shape = (len(etudiants), len(modules))
+        self.csr = sparse.csr_matrix(
+            (np.ones(len(csr_indices), dtype=np.int32), csr_indices, csr_indptr), shape=shape
+        )
+        self.csc = sparse.csc_matrix(
+            (np.ones(len(csc_indices), dtype=np.int32), csc_indices, csc_indptr), shape=shape
+        )
+
+    @classmethod
+    def from_pairs(cls, pairs) -> 'Incidence':
+        """Construit les deux représentations à partir des couples (etudiant_id, module_id)."""
+        etudiants, lignes = np.unique(pairs[:, 0], return_inverse=True)
+        modules, colonnes = np.unique(pairs[:, 1], return_inverse=True)
+        coo = sparse.coo_matrix(
+            (np.ones(len(pairs), dtype=np.int32), (lignes, colonnes)),
+            shape=(len(etudiants), len(modules))
+        )
+        csr = coo.tocsr()
+        csc = coo.tocsc()
+        return cls(etudiants.astype(np.int32), modules.astype(np.int32),
+                   csr.indptr, csr.indices, csc.indptr, csc.indices)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            'etudiants': self.etudiants,
+            'modules': self.modules,
+            'csr_indptr': self.csr.indptr,
+            'csr_indices': self.csr.indices,
+            'csc_indptr': self.csc.indptr,
+            'csc_indices': self.csc.indices
+        }
+
+    # --- Requêtes -------------------------------------------------------------------
+
+    def _index_modules(self, module_ids) -> np.ndarray:
+        """Index denses des modules (-1 si le module n'a aucun inscrit dans la période)."""
+        module_ids = np.asarray(module_ids, dtype=np.int64)
+        if not len(self.modules):
+            return np.full(len(module_ids), -1)
+        idx = np.minimum(np.searchsorted(self.modules, module_ids), len(self.modules) - 1)
+        return np.where(self.modules[idx] == module_ids, idx, -1)
+
+    def effectifs(self) -> pd.Series:
+        """Nombre d'inscrits de chaque module (somme des colonnes)."""
+        return pd.Series(np.diff(self.csc.indptr), index=self.modules)
+
+    def modules_etudiant(self, etudiant_id: int) -> np.ndarray:
+        i = np.searchsorted(self.etudiants, etudiant_id)
+        if i >= len(self.etudiants) or self.etudiants[i] != etudiant_id:
+            return np.empty(0, dtype=np.int32)
+        return self.modules[self.csr.indices[self.csr.indptr[i]:self.csr.indptr[i + 1]]]
+
+    def etudiants_module(self, module_id: int) -> np.ndarray:
+        j = self._index_modules([module_id])[0]
+        if j < 0:
+            return np.empty(0, dtype=np.int32)
+        return self.etudiants[self.csc.indices[self.csc.indptr[j]:self.csc.indptr[j + 1]]]
+
+    def co_inscriptions(self) -> sparse.csr_matrix:
+        """AᵀA : étudiants communs à chaque paire de modules (diagonale = effectifs)."""
+        return (self.csr.T @ self.csr).tocsr()
+
+    def conflits_modules(self) -> Dict[int, list]:
+        """module_id -> modules partageant au moins un étudiant (graphe de conflits)."""
+        co = self.co_inscriptions()
+        co.setdiag(0)
+        co.eliminate_zeros()
+        return {
+            int(self.modules[j]): self.modules[co.indices[co.indptr[j]:co.indptr[j + 1]]].tolist()
+            for j in range(len(self.modules))
+            if co.indptr[j + 1] > co.indptr[j]
+        }
+
+    def etudiants_communs(self, module_id: int, autres: Iterable[int]) -> int:
+        """Nombre d'étudiants de module_id inscrits à au moins un des modules autres."""
+        j = self._index_modules([module_id])[0]
+        autres = self._index_modules(list(autres))
+        autres = autres[autres >= 0]
+        if j < 0 or not len(autres):
+            return 0
+        lignes = self.csc.indices[self.csc.indptr[j]:self.csc.indptr[j + 1]]
+        return int((self.csr[lignes][:, autres].getnnz(axis=1) > 0).sum())
+
+    def _positions_triees(self, positions_modules: Dict[int, int]):
+        """
+        Positions (jour, demi-journée...) des examens de chaque étudiant, triées par étudiant
+        puis par position. Renvoie (lignes, positions, débuts des étudiants).
+        """
+        position_colonne = np.full(len(self.modules), -1, dtype=np.int64)
+        if positions_modules:
+            idx = self._index_modules(list(positions_modules))
+            valeurs = np.fromiter(positions_modules.values(), dtype=np.int64, count=len(positions_modules))
+            position_colonne[idx[idx >= 0]] = valeurs[idx >= 0]
+
+        lignes = np.repeat(np.arange(len(self.etudiants)), np.diff(self.csr.indptr))
+        positions = position_colonne[self.csr.indices]
+        places = positions >= 0
+        lignes, positions = lignes[places], positions[places]
+        ordre = np.lexsort((positions, lignes))
+        lignes, positions = lignes[ordre], positions[ordre]
+        debuts = np.flatnonzero(np.r_[True, lignes[1:] != lignes[:-1]]) if len(lignes) else np.empty(0, dtype=np.int64)
+        return lignes, positions, debuts
+
+    def ecarts_consecutifs(self, positions_modules: Dict[int, int]) -> np.ndarray:
+        """Écarts entre examens consécutifs de chaque étudiant, dans l'unité des positions."""
+        lignes, positions, _ = self._positions_triees(positions_modules)
+        meme_etudiant = lignes[1:] == lignes[:-1]
+        return np.diff(positions)[meme_etudiant]
+
+    def journees_multiples(self, jours_modules: Dict[int, int]) -> int:
+        """Nombre de couples (étudiant, jour) comptant plus d'un examen (conflits étudiants)."""
+        lignes, jours, _ = self._positions_triees(jours_modules)
+        if not len(lignes):
+            return 0
+        series = np.flatnonzero(np.r_[True, (lignes[1:] != lignes[:-1]) | (jours[1:] != jours[:-1])])
+        return int((np.diff(np.r_[series, len(lignes)]) > 1).sum())
+
+    def etalement_examens(self, jours_modules: Dict[int, int], fenetre_jours: int = 3) -> pd.DataFrame:
+        """
+        Étalement des examens de chaque étudiant, calculé en une passe vectorisée sur le CSR.
+        jours_modules: module_id -> jour de l'examen (entier, ex. rang dans la période).
+        Renvoie etudiant_id, nb_examens, premier_jour, dernier_jour, etalement, ecart_min
+        (jours entre deux examens consécutifs, 0 = même jour), max_par_jour et max_fenetre
+        (plus grand nombre d'examens sur fenetre_jours jours consécutifs).
+        """
+        lignes, jours, debuts = self._positions_triees(jours_modules)
+        if not len(lignes):
+            return pd.DataFrame(columns=['etudiant_id', 'nb_examens', 'premier_jour', 'dernier_jour',
+                                         'etalement', 'ecart_min', 'max_par_jour', 'max_fenetre'])
+        nb_examens = np.diff(np.r_[debuts, len(lignes)])
+
+        # Écart entre examens consécutifs d'un même étudiant (le premier de chaque étudiant n'en a pas)
+        ecarts = np.diff(jours, prepend=jours[0]).astype(float)
+        ecarts[debuts] = np.inf
+        ecart_min = np.minimum.reduceat(ecarts, debuts)
+
+        # Plus grand nombre d'examens le même jour : longueur des séries de (étudiant, jour) égaux
+        series = np.flatnonzero(np.r_[True, (lignes[1:] != lignes[:-1]) | (jours[1:] != jours[:-1])])
+        longueurs = np.diff(np.r_[series, len(lignes)])
+        max_par_jour = np.maximum.reduceat(longueurs, np.searchsorted(series, debuts))
+
+        # Fenêtre glissante : examens du même étudiant dans [jour, jour + fenetre_jours - 1],
+        # par recherche dichotomique sur la clé (étudiant, jour) triée
+        cles = lignes * (int(jours.max()) + fenetre_jours + 1) + jours
+        dans_fenetre = np.searchsorted(cles, cles + fenetre_jours - 1, side='right') - np.arange(len(cles))
+        max_fenetre = np.maximum.reduceat(dans_fenetre, debuts)
+
+        premier = jours[debuts]
+        dernier = jours[np.r_[debuts[1:], len(jours)] - 1]
+        return pd.DataFrame({
+            'etudiant_id': self.etudiants[lignes[debuts]],
+            'nb_examens': nb_examens,
+            'premier_jour': premier,
+            'dernier_jour': dernier,
+            'etalement': dernier - premier + 1,
+            'ecart_min': np.where(np.isinf(ecart_min), np.nan, ecart_min),
+            'max_par_jour': max_par_jour,
+            'max_fenetre': max_fenetre
+        })
+
+
+class IncidenceCache:
+    """
+    Cache disque des matrices d'incidence par période. Les tableaux sont des .npy non
+    compressés relus en mémoire partagée (mmap) ; le répertoire est nommé d'après un tampon
+    (version de la table inscriptions et paramètres de session de la période) : toute
+    modification des inscriptions le rend caduc.
+    """
+
+    def __init__(self, db, directory: Optional[str] = None):
+        self.db = db
+        self.directory = directory or os.getenv('INCIDENCE_CACHE_DIR', DEFAULT_INCIDENCE_DIR)
+
+    def _tampon(self, periode, version) -> str:
+        return fingerprint([version, periode['annee_universitaire'], periode['session'],
+                            periode.get('semestre')])[:16]
+
+    def _path(self, periode_id, tampon) -> str:
+        return os.path.join(self.directory, f"periode-{periode_id}-{tampon}")
+
+    def _lire(self, path) -> Optional[Incidence]:
+        try:
+            return Incidence(**{nom: np.load(os.path.join(path, f"{nom}.npy"), mmap_mode='r') for nom in ARRAYS})
+        except (OSError, ValueError):
+            return None
+
+    def _ecrire(self, periode_id, tampon, incidence: Incidence):
+        path = self._path(periode_id, tampon)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            for nom, tableau in incidence.arrays().items():
+                np.save(os.path.join(tmp_path, f"{nom}.npy"), np.ascontiguousarray(tableau))
+            os.rename(tmp_path, path)
+        except OSError as e:
+            # Déjà écrit par un autre processus, ou disque indisponible : le cache reste optionnel
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.isdir(path):
+                print(f"Incidence cache write error: {e}")
+            return
+        # Les tampons précédents de la période sont caducs
+        prefix = f"periode-{periode_id}-"
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name != os.path.basename(path) and not name.endswith('.tmp'):
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    def load(self, periode_id: int) -> Optional[Incidence]:
+        """Incidence de la période, depuis le disque si le tampon est à jour, sinon depuis la base."""
+        periode = next((p for p in self.db.get_periodes_examen(actif=False) if p['id'] == periode_id), None)
+        if not periode:
+            return None
+
+        tampon = self._tampon(periode, self.db.get_version_donnees('inscriptions'))
+        incidence = self._lire(self._path(periode_id, tampon))
+        if incidence is not None:
+            return incidence
+
+        version, pairs = self.db.get_incidence_session(periode_id)
+        incidence = Incidence.from_pairs(pairs)
+        self._ecrire(periode_id, self._tampon(periode, version), incidence)
+        return incidence
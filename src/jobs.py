@@ -0,0 +1,202 @@
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Premier entier du verrou consultatif (JOB_LOCK_CLASS, periode_id) tenu pendant un calcul
+# (doit correspondre à soumettre_job_planification dans procedures.sql)
+JOB_LOCK_CLASS = 7301
+
+# Intervalle minimal entre deux écritures de progression en base (secondes)
+PROGRESS_INTERVAL = 0.5
+
+
+class _ProgressReporter:
+    """
+    Rappel de progression passé au scheduler : écrit l'avancement dans la table des travaux
+    (au plus toutes les PROGRESS_INTERVAL secondes) et renvoie False dès qu'une annulation
+    a été demandée.
+    """
+
+    def __init__(self, db, job_id: int):
+        self.db = db
+        self.job_id = job_id
+        self.last_update = 0.0
+        self.cancelled = False
+
+    def __call__(self, done: int, total: int, score=None, unite: str = 'modules') -> bool:
+        now = time.monotonic()
+        if done < total and now - self.last_update < PROGRESS_INTERVAL:
+            return not self.cancelled
+        self.last_update = now
+        self.cancelled = self.db.update_job_progress(
+            self.job_id,
+            round(100.0 * done / max(total, 1), 2),
+            f"{done}/{total} {unite}",
+            score
+        )
+        return not self.cancelled
+
+
+def periodes_job(job: Dict) -> List[int]:
+    """Périodes d'un travail : la sienne, et toutes celles d'une planification conjointe (triées)."""
+    periodes = {job['periode_id']}
+    if job['type_job'] == 'conjoint':
+        periodes.update((job['parametres'] or {}).get('periode_ids') or ())
+    return sorted(periodes)
+
+
+def run_job(job_id: int):
+    """
+    Point d'entrée exécuté dans un processus du pool : prend les verrous des périodes,
+    lance le calcul et enregistre son issue.
+    """
+    from src.capacity import CapacityPlanner
+    from src.database import Database
+    from src.scenarios import ScenarioRunner
+    from src.scheduler import ExamScheduler
+
+    db = Database()
+    job = db.get_job_planification(job_id)
+    if not job or job['statut'] != 'en_attente':
+        return
+
+    with ExitStack() as verrous:
+        # Un verrou par période, pris dans l'ordre croissant des identifiants : une planification
+        # conjointe exclut tout autre calcul sur chacune de ses périodes
+        periodes = periodes_job(job)
+        acquired = all(verrous.enter_context(db.advisory_lock(JOB_LOCK_CLASS, p)) for p in periodes)
+        if not acquired:
+            db.finish_job_planification(job_id, 'échoué', message="Un calcul est déjà en cours pour "
+                                        + ("cette période" if len(periodes) == 1 else "l'une de ces périodes"))
+            return
+        if not db.start_job_planification(job_id):
+            return
+
+        scheduler = ExamScheduler(db)
+        reporter = _ProgressReporter(db, job_id)
+        parametres = job['parametres'] or {}
+        try:
+            if job['type_job'] == 'generation':
+                success, result = scheduler.generate_schedule(
+                    job['periode_id'],
+                    dept_id=parametres.get('dept_id'),
+                    lance_par=job['lance_par'],
+                    progress=reporter,
+                    warm_start_from=parametres.get('warm_start_from'),
+                    multi_start=parametres.get('multi_start', 1),
+                    seed=parametres.get('seed', 0),
+                    time_budget=parametres.get('time_budget'),
+                    force=parametres.get('force', False),
+                    espacement=parametres.get('espacement'),
+                    localite=parametres.get('localite', False)
+                )
+            elif job['type_job'] == 'conjoint':
+                success, result = scheduler.generate_joint_schedule(
+                    periodes,
+                    lance_par=job['lance_par'],
+                    force=parametres.get('force', False),
+                    espacement=parametres.get('espacement'),
+                    localite=parametres.get('localite', False),
+                    progress=reporter
+                )
+                if success:
+                    result = {'periodes': list(result.values())}
+            elif job['type_job'] == 'scenarios':
+                success, result = ScenarioRunner(db, scheduler).comparer(
+                    job['periode_id'],
+                    parametres.get('scenarios', []),
+                    dept_id=parametres.get('dept_id'),
+                    espacement=parametres.get('espacement'),
+                    localite=parametres.get('localite', False),
+                    progress=reporter
+                )
+                if success:
+                    # Colonnes et lignes dans leur ordre (JSONB ne conserve pas l'ordre des clés)
+                    result = {'comparaison': json.loads(result.to_json(orient='split', index=False,
+                                                                       force_ascii=False))}
+            elif job['type_job'] == 'dimensionnement':
+                planner = CapacityPlanner(db, scheduler)
+                rechercher = planner.salles_minimum if parametres.get('critere') == 'salles' else planner.jours_minimum
+                success, result = rechercher(
+                    job['periode_id'],
+                    dept_id=parametres.get('dept_id'),
+                    espacement=parametres.get('espacement'),
+                    progress=reporter
+                )
+                if success:
+                    result['essais'] = json.loads(result['essais'].to_json(orient='split', index=False,
+                                                                           force_ascii=False))
+                    if 'date_fin' in result:
+                        result['date_fin'] = result['date_fin'].isoformat()
+            else:
+                success, result = scheduler.optimize_schedule(
+                    job['periode_id'],
+                    progress=reporter,
+                    dept_id=parametres.get('dept_id'),
+                    time_limit=parametres.get('time_limit', 30),
+                    seed=parametres.get('seed', 0),
+                    lance_par=job['lance_par'],
+                    espacement=parametres.get('espacement'),
+                    localite=parametres.get('localite', False)
+                )
+            if not isinstance(result, dict):
+                result = {'message': str(result)}
+        except Exception as e:
+            print(f"Job {job_id} error: {e}")
+            db.finish_job_planification(job_id, 'échoué', message=str(e))
+            return
+
+        if success:
+            db.finish_job_planification(job_id, 'terminé', result, version_id=result.get('version_id'))
+        elif result.get('cancelled'):
+            db.finish_job_planification(job_id, 'annulé', result, message="Annulé à la demande")
+        else:
+            db.finish_job_planification(job_id, 'échoué', result, message=result.get('error'))
+
+
+class JobRunner:
+    """
+    Exécution des générations, optimisations, planifications conjointes, comparaisons de
+    scénarios et dimensionnements hors du thread de la page Streamlit.
+    L'état des travaux vit dans la table jobs_planification : un rafraîchissement du
+    navigateur ne perd rien et deux demandes pour la même période n'en font qu'une.
+    """
+
+    def __init__(self, db, max_workers: int = 2):
+        self.db = db
+        # 'spawn' : le processus Streamlit est multi-thread, fork y est risqué
+        self.executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def submit(self, periode_id: int, type_job: str = 'generation',
+               parametres: Optional[Dict] = None, lance_par: Optional[str] = None) -> Tuple[bool, Dict]:
+        job_id, existant = self.db.submit_job_planification(periode_id, type_job, parametres, lance_par)
+        if not existant:
+            try:
+                self.executor.submit(run_job, job_id)
+            except Exception as e:
+                self.db.finish_job_planification(job_id, 'échoué', message=str(e))
+                return False, {"error": str(e), 'job_id': job_id}
+        return True, {'job_id': job_id, 'existant': existant}
+
+    def cancel(self, job_id: int):
+        self.db.request_job_cancel(job_id)
+
+    def get_job(self, job_id: int):
+        return self.db.get_job_planification(job_id)
+
+    def get_active_job(self, periode_id: int):
+        return self.db.get_active_job_planification(periode_id)
+
+    def list_jobs(self, periode_id: int, limit: int = 10) -> pd.DataFrame:
+        data = self.db.get_jobs_planification(periode_id, limit)
+        if data:
+            return pd.DataFrame(data)
+        return pd.DataFrame()
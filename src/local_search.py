@@ -0,0 +1,375 @@
+import random
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.spacing import SpacingCounters
+
+
+class _EnsembleTirable:
+    """
+    Ensemble d'identifiants tenu dans une liste indexable et une table de positions :
+    ajout, retrait (échange avec le dernier élément) et tirage aléatoire en O(1).
+    """
+
+    def __init__(self, elements=()):
+        self.elements = []
+        self.positions = {}
+        for element in elements:
+            self.ajouter(element)
+
+    def ajouter(self, element):
+        self.positions[element] = len(self.elements)
+        self.elements.append(element)
+
+    def retirer(self, element):
+        position = self.positions.pop(element)
+        dernier = self.elements.pop()
+        if dernier != element:
+            self.elements[position] = dernier
+            self.positions[dernier] = position
+
+    def tirer(self, rng: random.Random):
+        return self.elements[rng.randrange(len(self.elements))]
+
+    def __len__(self):
+        return len(self.elements)
+
+
+class LocalSearch:
+    """
+    Recherche locale « anytime » sur un emploi du temps valide.
+
+    L'état est tenu en mémoire avec les mêmes structures d'occupation que le placement
+    glouton, indexées par créneau du calendrier compilé de la période ; chaque mouvement
+    (déplacement d'examen, changement de salle ou de surveillant, insertion d'un module
+    non placé) est évalué par différence de score en O(1) et annulé s'il dégrade l'objectif. Les mouvements à score égal sont acceptés
+    pour traverser les plateaux. La meilleure solution rencontrée est conservée.
+    """
+
+    def __init__(self, probleme: Dict, examens: List[Tuple], poids: Dict, seed: int = 0):
+        self.periode_id = probleme['periode_id']
+        self.calendrier = probleme['calendrier']
+        self.poids = poids
+        self.rng = random.Random(seed)
+
+        self.modules = {m['id']: m for m in probleme['modules']}
+        self.conflits = probleme.get('conflits') or {}
+        self.indisponibilites = probleme.get('indisponibilites') or {}
+        # Réservations des autres périodes publiées (voir src/occupancy.py)
+        self.salles_reservees = probleme.get('salles_reservees') or {}
+        self.surveillances_externes = probleme.get('surveillances_externes') or {}
+        self.localite = probleme.get('localite')
+        self.espacement = SpacingCounters.depuis_probleme(probleme)
+        self.index_salles = probleme['index_salles']
+        self.capacites = {s['id']: s['capacite_examen'] for s in probleme['salles']}
+        self.profs = [p['id'] for p in probleme['profs']] or [1]
+
+        # Occupation : (salle, créneau) / (prof, créneau) -> module ; jours = index du calendrier
+        self.salle_occ = {}
+        self.prof_occ = {}
+        self.prof_jour = defaultdict(int)
+        self.formation_jour = {}
+        self.examens_jour = defaultdict(int)
+
+        # Composantes de l'objectif, maintenues incrémentalement
+        self.charge = defaultdict(int)
+        self.somme_carres = 0
+        self.gaspillage = 0
+        self.nb_jours = 0
+        self.penalite_localite = 0
+
+        # module_id -> [prof_id, salle_id, créneau] ; places : mêmes modules, tirables en O(1)
+        self.affectation = {}
+        self.places = _EnsembleTirable()
+        # Examens fixes hors du calendrier actuel (jour exclu depuis, autre modèle de créneaux)
+        self.hors_calendrier = []
+        for examen in examens:
+            module_id, prof_id, salle_id, _, debut, duree, nb_inscrits = examen
+            fixe = module_id not in self.modules
+            slot = self.calendrier.index(debut)
+            if slot is None:
+                # Hors calendrier : un module fixe est conservé tel quel, les autres sont replacés
+                if fixe:
+                    self.hors_calendrier.append(examen)
+                continue
+            if fixe:
+                # Module absent des données actuelles : conservé tel quel, jamais déplacé
+                self.modules[module_id] = {'id': module_id, 'formation_id': None, 'duree_examen': duree,
+                                           'nb_inscrits': nb_inscrits, 'fixe': True}
+            if prof_id not in self.charge and prof_id not in self.profs:
+                self.profs.append(prof_id)
+            self._ajouter(module_id, prof_id, salle_id, slot)
+        self._reaffecter_absents()
+        self.non_places = _EnsembleTirable(m_id for m_id in self.modules if m_id not in self.affectation)
+
+        self.iterations = 0
+        self.best_score = self.score()
+        self.best_affectation = {m: list(a) for m, a in self.affectation.items()}
+
+    # --- Objectif -----------------------------------------------------------------
+
+    def score(self) -> float:
+        n = max(len(self.profs), 1)
+        moyenne = len(self.affectation) / n
+        variance = max(self.somme_carres / n - moyenne * moyenne, 0.0)
+        return (self.poids['places'] * len(self.affectation)
+                - self.poids['jours'] * self.nb_jours
+                - self.poids['gaspillage'] * self.gaspillage
+                - self.poids['desequilibre'] * variance ** 0.5
+                - self.poids['localite'] * self.penalite_localite)
+
+    # --- État -----------------------------------------------------------------------
+
+    def _batiments_voisins(self, prof_id, jour, couverts) -> Tuple[Optional[str], Optional[str]]:
+        """Bâtiments des examens précédent et suivant du professeur dans la journée."""
+        cal = self.calendrier
+        premier, dernier = cal.slot(jour, 0), cal.slot(jour, cal.nb_heures - 1)
+        precedent = next((self.prof_occ[(prof_id, c)] for c in range(couverts.start - 1, premier - 1, -1)
+                          if (prof_id, c) in self.prof_occ), None)
+        suivant = next((self.prof_occ[(prof_id, c)] for c in range(couverts.stop, dernier + 1)
+                        if (prof_id, c) in self.prof_occ), None)
+        salles = self.localite.batiments_salles
+        return (salles.get(self.affectation[precedent][1]) if precedent is not None else None,
+                salles.get(self.affectation[suivant][1]) if suivant is not None else None)
+
+    def _cout_localite(self, module_id, prof_id, salle_id, jour, couverts) -> int:
+        """Variation de la pénalité de localité si l'examen est inséré entre ses voisins du jour."""
+        localite = self.localite
+        batiment = localite.batiments_salles.get(salle_id)
+        precedent, suivant = self._batiments_voisins(prof_id, jour, couverts)
+        return (localite.penalite_examen(module_id, salle_id)
+                + localite.palier(precedent, batiment) + localite.palier(batiment, suivant)
+                - localite.palier(precedent, suivant))
+
+    def _ajouter(self, module_id, prof_id, salle_id, slot):
+        module = self.modules[module_id]
+        cal = self.calendrier
+        jour = cal.slot_jour[slot]
+        if self.localite:
+            self.penalite_localite += self._cout_localite(
+                module_id, prof_id, salle_id, jour, cal.couverts(slot, module['duree_examen'])
+            )
+        for c in cal.couverts(slot, module['duree_examen']):
+            self.salle_occ[(salle_id, c)] = module_id
+            self.prof_occ[(prof_id, c)] = module_id
+        self.prof_jour[(prof_id, jour)] += 1
+        if module['formation_id'] is not None:
+            self.formation_jour[(module['formation_id'], jour)] = module_id
+        self.examens_jour[jour] += 1
+        if self.espacement:
+            self.espacement.ajouter(module_id, cal.slot_ordinal[slot], cal.slot_demi_journee[slot])
+        if self.examens_jour[jour] == 1:
+            self.nb_jours += 1
+        self.somme_carres += 2 * self.charge[prof_id] + 1
+        self.charge[prof_id] += 1
+        self.gaspillage += self.capacites.get(salle_id, module['nb_inscrits']) - module['nb_inscrits']
+        self.affectation[module_id] = [prof_id, salle_id, slot]
+        self.places.ajouter(module_id)
+
+    def _retirer(self, module_id):
+        prof_id, salle_id, slot = self.affectation.pop(module_id)
+        self.places.retirer(module_id)
+        module = self.modules[module_id]
+        cal = self.calendrier
+        jour = cal.slot_jour[slot]
+        for c in cal.couverts(slot, module['duree_examen']):
+            del self.salle_occ[(salle_id, c)]
+            del self.prof_occ[(prof_id, c)]
+        self.prof_jour[(prof_id, jour)] -= 1
+        if module['formation_id'] is not None:
+            del self.formation_jour[(module['formation_id'], jour)]
+        self.examens_jour[jour] -= 1
+        if self.espacement:
+            self.espacement.retirer(module_id, cal.slot_ordinal[slot], cal.slot_demi_journee[slot])
+        if self.localite:
+            self.penalite_localite -= self._cout_localite(
+                module_id, prof_id, salle_id, jour, cal.couverts(slot, module['duree_examen'])
+            )
+        if self.examens_jour[jour] == 0:
+            self.nb_jours -= 1
+        self.charge[prof_id] -= 1
+        self.somme_carres -= 2 * self.charge[prof_id] + 1
+        self.gaspillage -= self.capacites.get(salle_id, module['nb_inscrits']) - module['nb_inscrits']
+        return prof_id, salle_id, slot
+
+    def _jour_libre(self, module, jour) -> bool:
+        if module['formation_id'] is not None and (module['formation_id'], jour) in self.formation_jour:
+            return False
+        # Modules d'autres formations partageant des étudiants
+        slot_jour = self.calendrier.slot_jour
+        return not any(v in self.affectation and slot_jour[self.affectation[v][2]] == jour
+                       for v in self.conflits.get(module['id'], ()))
+
+    def _salle_libre(self, salle, module, slot, couverts, masque) -> bool:
+        return (self.calendrier.ouvert(salle['batiment'], slot, module['duree_examen'])
+                and not self.salles_reservees.get(salle['id'], 0) & masque
+                and not any((salle['id'], c) in self.salle_occ for c in couverts))
+
+    def _prof_libre(self, prof_id, jour, couverts, masque) -> bool:
+        return (self.prof_jour[(prof_id, jour)] + self.surveillances_externes.get((prof_id, jour), 0) < 3
+                and not self.indisponibilites.get(prof_id, 0) & masque
+                and not any((prof_id, c) in self.prof_occ for c in couverts))
+
+    def _reaffecter_absents(self):
+        """
+        Examens de départ surveillés pendant une absence déclarée, ou dont la salle ou le
+        surveillant a été réservé depuis par une autre période publiée : même créneau avec
+        une autre salle ou un autre professeur, sinon replacés par la recherche.
+        """
+        for module_id, (prof_id, salle_id, slot) in list(self.affectation.items()):
+            module = self.modules[module_id]
+            masque = self.calendrier.masque(slot, module['duree_examen'])
+            jour = self.calendrier.slot_jour[slot]
+            if not (self.indisponibilites.get(prof_id, 0) & masque
+                    or self.salles_reservees.get(salle_id, 0) & masque
+                    or self.prof_jour[(prof_id, jour)] + self.surveillances_externes.get((prof_id, jour), 0) > 3):
+                continue
+            self._retirer(module_id)
+            placement = None if module.get('fixe') else self._placement(module, slot)
+            if placement:
+                self._ajouter(module_id, placement[0], placement[1], slot)
+
+    def _placement(self, module, slot, prof_prefere=None) -> Optional[Tuple[int, int]]:
+        """Plus petite salle libre suffisante et professeur libre le moins chargé (ou préféré)."""
+        cal = self.calendrier
+        jour = cal.slot_jour[slot]
+        if not self._jour_libre(module, jour):
+            return None
+        if self.espacement and not self.espacement.admissible(
+                module['id'], cal.slot_ordinal[slot], cal.slot_demi_journee[slot]):
+            return None
+        couverts = cal.couverts(slot, module['duree_examen'])
+        masque = cal.masque(slot, module['duree_examen'])
+        ordre = self.localite.ordre_salles(module['id']) if self.localite else None
+        salles = self.index_salles.candidates(module, True, ordre)
+        salle = next((s for s in salles if self._salle_libre(s, module, slot, couverts, masque)), None)
+        if salle is None:
+            return None
+        if prof_prefere is not None and self._prof_libre(prof_prefere, jour, couverts, masque):
+            return prof_prefere, salle['id']
+        libres = [p for p in self.profs if self._prof_libre(p, jour, couverts, masque)]
+        if not libres:
+            return None
+        if self.localite:
+            # Surveillant dont les examens voisins du jour sont les plus proches, puis le moins chargé
+            return min(libres, key=lambda p: (self._cout_localite(module['id'], p, salle['id'], jour, couverts),
+                                              self.charge[p])), salle['id']
+        return min(libres, key=lambda p: self.charge[p]), salle['id']
+
+    def _creneau_aleatoire(self) -> int:
+        return self.rng.randrange(len(self.calendrier.slots))
+
+    # --- Mouvements -------------------------------------------------------------------
+
+    def _mouvement(self):
+        """Applique un mouvement aléatoire ; renvoie une fonction d'annulation ou None."""
+        if not self.calendrier.slots:
+            return None
+        if self.non_places and self.rng.random() < 0.3:
+            module_id = self.non_places.tirer(self.rng)
+            module = self.modules[module_id]
+            for _ in range(10):
+                slot = self._creneau_aleatoire()
+                placement = self._placement(module, slot)
+                if placement:
+                    self._ajouter(module_id, placement[0], placement[1], slot)
+                    self.non_places.retirer(module_id)
+
+                    def annuler():
+                        self._retirer(module_id)
+                        self.non_places.ajouter(module_id)
+                    return annuler
+            return None
+
+        if not self.affectation:
+            return None
+        module_id = self.places.tirer(self.rng)
+        module = self.modules[module_id]
+        if module.get('fixe'):
+            return None
+        ancien = self._retirer(module_id)
+        tirage = self.rng.random()
+        if tirage < 0.5:
+            # Déplacement vers un autre créneau (rapproche les examens, libère des jours)
+            slot = self._creneau_aleatoire()
+            placement = self._placement(module, slot, prof_prefere=ancien[0])
+        elif tirage < 0.75:
+            # Même créneau, plus petite salle libre suffisante
+            slot = ancien[2]
+            placement = self._placement(module, slot, prof_prefere=ancien[0])
+        else:
+            # Même créneau et même salle, surveillant le moins chargé
+            slot = ancien[2]
+            couverts = self.calendrier.couverts(slot, module['duree_examen'])
+            masque = self.calendrier.masque(slot, module['duree_examen'])
+            jour = self.calendrier.slot_jour[slot]
+            libres = [p for p in self.profs if p != ancien[0] and self._prof_libre(p, jour, couverts, masque)]
+            placement = (min(libres, key=lambda p: self.charge[p]), ancien[1]) if libres else None
+
+        if placement is None:
+            self._ajouter(module_id, *ancien)
+            return None
+        self._ajouter(module_id, placement[0], placement[1], slot)
+
+        def annuler():
+            self._retirer(module_id)
+            self._ajouter(module_id, *ancien)
+        return annuler
+
+    def run(self, deadline: float, progress: Optional[Callable] = None,
+            checkpoint: Optional[Callable] = None, checkpoint_interval: float = 5.0):
+        """
+        Améliore la solution jusqu'à deadline (time.time()). Renvoie la courbe
+        d'amélioration [(secondes écoulées, meilleur score)], ou None si progress a
+        demandé l'arrêt (la meilleure solution a alors été passée à checkpoint).
+        """
+        start = time.time()
+        courbe = [(0.0, round(self.best_score, 4))]
+        current = self.best_score
+        last_checkpoint = start
+        dirty = False
+
+        while True:
+            now = time.time()
+            if now >= deadline:
+                break
+            for _ in range(200):
+                annuler = self._mouvement()
+                self.iterations += 1
+                if annuler is None:
+                    continue
+                nouveau = self.score()
+                if nouveau < current - 1e-9:
+                    annuler()
+                    continue
+                current = nouveau
+                if current > self.best_score + 1e-9:
+                    self.best_score = current
+                    self.best_affectation = {m: list(a) for m, a in self.affectation.items()}
+                    courbe.append((round(time.time() - start, 3), round(current, 4)))
+                    dirty = True
+
+            now = time.time()
+            if checkpoint and dirty and now - last_checkpoint >= checkpoint_interval:
+                checkpoint(self.best_solution())
+                last_checkpoint = now
+                dirty = False
+            if progress and progress(int(now - start), int(deadline - start), round(self.best_score, 4), 'secondes') is False:
+                if checkpoint:
+                    checkpoint(self.best_solution())
+                return None
+        return courbe
+
+    def best_solution(self) -> Tuple[List[Tuple], List[Tuple]]:
+        """Meilleure solution sous forme de tuples batch_insert_exams (examens, surveillances)."""
+        examens, surveillances = [], []
+        for module_id, (prof_id, salle_id, slot) in sorted(self.best_affectation.items()):
+            module = self.modules[module_id]
+            examens.append((module_id, prof_id, salle_id, self.periode_id, self.calendrier.slots[slot],
+                            module['duree_examen'], module['nb_inscrits']))
+            surveillances.append((module_id, self.periode_id, prof_id, 'responsable'))
+        for examen in self.hors_calendrier:
+            examens.append(examen)
+            surveillances.append((examen[0], self.periode_id, examen[1], 'responsable'))
+        return examens, surveillances
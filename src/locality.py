@@ -0,0 +1,81 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Paliers de distance entre bâtiments : 0 = même bâtiment, 1 = proche (au plus
+# SEUIL_PROCHE_M mètres), 2 = éloigné ou distance inconnue
+SEUIL_PROCHE_M = 300
+PALIER_ELOIGNE = 2
+
+
+class Localite:
+    """
+    Matrice des paliers de distance entre bâtiments, calculée une fois au chargement
+    (quelques bâtiments : une liste de listes indexée par numéro de bâtiment), et ordre
+    de proximité des bâtiments depuis chacun d'eux.
+
+    La pénalité de localité d'une solution somme, pour chaque examen, le palier entre le
+    bâtiment du département du module et celui de sa salle, et pour chaque professeur,
+    le palier entre les salles de deux examens successifs d'une même journée.
+    """
+
+    def __init__(self, distances: Dict[Tuple[str, str], int], batiments_salles: Dict[int, str],
+                 batiments_modules: Dict[int, Optional[str]], seuil_proche: int = SEUIL_PROCHE_M):
+        self.distances = dict(distances)
+        self.seuil_proche = seuil_proche
+        batiments = set(batiments_salles.values()) | {b for b in batiments_modules.values() if b}
+        for a, b in self.distances:
+            batiments.update((a, b))
+        self.batiments = sorted(batiments)
+        self.index = {b: i for i, b in enumerate(self.batiments)}
+        self.paliers = [[self._palier(a, b) for b in self.batiments] for a in self.batiments]
+        self.proches = {
+            a: tuple(sorted(self.batiments, key=lambda b: (self.palier(a, b), self._distance(a, b), b)))
+            for a in self.batiments
+        }
+        self.batiments_salles = batiments_salles
+        self.batiments_modules = batiments_modules
+
+    def _distance(self, a: str, b: str) -> float:
+        if a == b:
+            return 0
+        d = self.distances.get((a, b), self.distances.get((b, a)))
+        return float('inf') if d is None else d
+
+    def _palier(self, a: str, b: str) -> int:
+        if a == b:
+            return 0
+        return 1 if self._distance(a, b) <= self.seuil_proche else PALIER_ELOIGNE
+
+    def palier(self, a: Optional[str], b: Optional[str]) -> int:
+        """Palier de distance entre deux bâtiments (0 si l'un est inconnu)."""
+        if a is None or b is None:
+            return 0
+        return self.paliers[self.index[a]][self.index[b]]
+
+    def ordre_salles(self, module_id) -> Optional[Tuple[str, ...]]:
+        """Bâtiments du plus proche au plus éloigné de celui du département du module (None : indifférent)."""
+        batiment = self.batiments_modules.get(module_id)
+        return self.proches.get(batiment) if batiment else None
+
+    def penalite_examen(self, module_id, salle_id) -> int:
+        return self.palier(self.batiments_modules.get(module_id), self.batiments_salles.get(salle_id))
+
+    def penalite(self, examens: Iterable[Tuple]) -> int:
+        """Pénalité de localité d'une solution (tuples de batch_insert_exams)."""
+        total = 0
+        par_prof_jour = defaultdict(list)
+        for module_id, prof_id, salle_id, _, debut, *_ in examens:
+            total += self.penalite_examen(module_id, salle_id)
+            par_prof_jour[(prof_id, debut.date())].append((debut, self.batiments_salles.get(salle_id)))
+        for journee in par_prof_jour.values():
+            journee.sort()
+            total += sum(self.palier(a[1], b[1]) for a, b in zip(journee, journee[1:]))
+        return total
+
+    def signature(self) -> List:
+        """Description canonique (empreinte des solutions)."""
+        return [
+            self.seuil_proche,
+            sorted([a, b, d] for (a, b), d in self.distances.items()),
+            sorted([m, b] for m, b in self.batiments_modules.items() if b)
+        ]
@@ -0,0 +1,69 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Tuple
+
+
+class OccupancyIndex:
+    """
+    Index global des réservations de salles et de professeurs, toutes périodes confondues :
+    plages [début, fin) par salle et par professeur, et nombre d'examens surveillés par
+    professeur et par date. Les périodes d'une planification conjointe (session normale et
+    rattrapage, sessions parallèles de formations différentes) le partagent : chacune y lit
+    les réservations des autres, projetées sur son propre calendrier, et y ajoute les siennes.
+    """
+
+    def __init__(self):
+        self.salles = defaultdict(list)
+        self.profs = defaultdict(list)
+        self.charges = defaultdict(int)
+
+    def reserver(self, salle_id, prof_id, debut: datetime, fin: datetime):
+        self.salles[salle_id].append((debut, fin))
+        if prof_id is not None:
+            self.profs[prof_id].append((debut, fin))
+            self.charges[(prof_id, debut.date())] += 1
+
+    @classmethod
+    def depuis_lignes(cls, lignes: Iterable[Dict]) -> 'OccupancyIndex':
+        """Index initial depuis get_occupations_publiees (une ligne par surveillance)."""
+        index = cls()
+        for ligne in lignes:
+            index.reserver(ligne['salle_id'], ligne['prof_id'], ligne['debut'], ligne['fin'])
+        return index
+
+    def ajouter_examens(self, examens: Iterable[Tuple]):
+        """Réserve salles et responsables d'une solution (tuples de batch_insert_exams)."""
+        for _, prof_id, salle_id, _, debut, duree, *_ in examens:
+            self.reserver(salle_id, prof_id, debut, debut + timedelta(minutes=duree))
+
+    def appliquer(self, probleme: Dict) -> Dict:
+        """
+        Copie du problème où les réservations de l'index deviennent des créneaux interdits :
+        masques des salles réservées (salles_reservees), absences des professeurs complétées
+        (indisponibilites) et examens déjà surveillés chaque jour (surveillances_externes).
+        """
+        calendrier = probleme['calendrier']
+        if not calendrier.slots:
+            # Calendrier vide (tous les jours exclus) : aucun créneau à interdire
+            return dict(probleme, salles_reservees={}, surveillances_externes={})
+        debut, fin = calendrier.slots[0], calendrier.slot_fin[-1]
+
+        def masque(plages):
+            return calendrier.masque_plages(p for p in plages if p[0] < fin and p[1] > debut)
+
+        salles_reservees = {}
+        for salle_id, plages in self.salles.items():
+            bits = masque(plages)
+            if bits:
+                salles_reservees[salle_id] = bits
+        indisponibilites = dict(probleme.get('indisponibilites') or {})
+        for prof_id, plages in self.profs.items():
+            bits = masque(plages)
+            if bits:
+                indisponibilites[prof_id] = indisponibilites.get(prof_id, 0) | bits
+        jours = {d: j for j, d in enumerate(calendrier.jours)}
+        surveillances_externes = {
+            (prof_id, jours[d]): n for (prof_id, d), n in self.charges.items() if d in jours
+        }
+        return dict(probleme, salles_reservees=salles_reservees, indisponibilites=indisponibilites,
+                    surveillances_externes=surveillances_externes)
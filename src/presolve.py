@@ -0,0 +1,186 @@
+import math
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Optional
+
+from src.room_index import exigences
+
+
+def _creneaux_min(duree: int, calendrier) -> int:
+    """Nombre minimal de créneaux recouverts par un examen de cette durée (meilleur créneau de départ)."""
+    return min((calendrier.nb_couverts(h, duree) for h in range(calendrier.nb_heures)), default=1)
+
+
+def _jours_espacement(nb_examens: int, espacement) -> int:
+    """
+    Étendue minimale (en jours) de nb_examens examens d'un même groupe, à raison d'un par jour,
+    sous les règles d'espacement : au plus max_examens par fenêtre de fenetre_jours jours,
+    et des débuts séparés d'au moins ecart_demi_journees demi-journées.
+    """
+    if nb_examens <= 0:
+        return 0
+    if not espacement:
+        return nb_examens
+    etendue = nb_examens
+    if espacement.get('max_examens'):
+        k, w = espacement['max_examens'], espacement['fenetre_jours']
+        etendue = max(etendue, ((nb_examens - 1) // k) * w + (nb_examens - 1) % k + 1)
+    if espacement.get('ecart_demi_journees'):
+        # Matin puis après-midi du jour suivant : 2 * jours + 1 demi-journées d'écart au mieux
+        pas = max(1, math.ceil((espacement['ecart_demi_journees'] - 1) / 2))
+        etendue = max(etendue, (nb_examens - 1) * pas + 1)
+    return etendue
+
+
+def _hall(besoins: List, capacites: List[int], creneaux_par_salle: int) -> Optional[str]:
+    """
+    Condition de Hall sur les créneaux-salles. Les salles admissibles d'un module sont
+    emboîtées (toutes celles de capacité suffisante) : elle se vérifie sur chaque seuil de
+    taille, du plus grand au plus petit. besoins: (taille, créneaux) par taille décroissante.
+    """
+    demande_cumulee = 0
+    for taille, creneaux in besoins:
+        demande_cumulee += creneaux
+        salles_admissibles = len(capacites) - bisect_left(capacites, taille)
+        offre = salles_admissibles * creneaux_par_salle
+        if demande_cumulee > offre:
+            return (f"Les modules de {taille} inscrits ou plus demandent {demande_cumulee} créneaux-salles "
+                    f"pour {offre} disponibles ({salles_admissibles} salle(s) assez grande(s))")
+    return None
+
+
+def analyser_faisabilite(probleme: Dict, max_par_jour_prof: int = 3) -> Dict:
+    """
+    Bornes rapides calculées avant toute résolution, à partir des seules données du problème
+    (modules et inscrits, salles, professeurs, calendrier compilé de la période).
+
+    Renvoie un dict :
+      faisable            False si aucune solution ne peut placer tous les modules
+      raisons             bornes violées : inutile de lancer la résolution complète
+      avertissements      modules jamais plaçables, marges faibles
+      modules_impossibles modules plus grands que toute salle compatible (exclus de la résolution)
+      bornes              jours minimaux, demande et capacité pour chaque ressource
+    """
+    start = time.time()
+    modules = probleme['modules']
+    salles = probleme['salles']
+    index_salles = probleme['index_salles']
+    nb_profs = len(probleme['profs'])
+    calendrier = probleme['calendrier']
+    nb_jours = calendrier.nb_jours
+    nb_creneaux = calendrier.nb_heures
+    # Étendue calendaire (jours non ouvrés compris) : les fenêtres d'espacement s'y mesurent
+    etendue = calendrier.jour_ordinal[-1] - calendrier.jour_ordinal[0] + 1 if nb_jours else 0
+
+    raisons = []
+    avertissements = []
+
+    capacites = sorted(s['capacite_examen'] for s in salles)
+    capacite_max = capacites[-1] if capacites else 0
+
+    # 1. Modules plus grands que toute salle compatible (un examen occupe une seule salle)
+    modules_impossibles = [m for m in modules if m['nb_inscrits'] > index_salles.capacite_max(m)]
+    trop_grands = [m for m in modules_impossibles if m['nb_inscrits'] > capacite_max]
+    if trop_grands:
+        combinables = sum(1 for m in trop_grands if m['nb_inscrits'] <= sum(capacites))
+        avertissements.append(
+            f"{len(trop_grands)} module(s) dépassent la plus grande salle ({capacite_max} places)"
+            + (f", dont {combinables} tiendraient en combinant plusieurs salles (non géré par le moteur)"
+               if combinables else "")
+        )
+    if len(modules_impossibles) > len(trop_grands):
+        avertissements.append(
+            f"{len(modules_impossibles) - len(trop_grands)} module(s) n'ont aucune salle assez grande "
+            f"du type ou avec les équipements requis"
+        )
+    placables = [m for m in modules if m['nb_inscrits'] <= index_salles.capacite_max(m)]
+
+    # 2. Créneaux-salles : un examen bloque sa salle pour au moins un créneau ; la condition
+    # de Hall porte sur toutes les salles, puis sur chaque ensemble d'exigences (type,
+    # équipements) restreint aux salles qui le satisfont
+    besoins_par_exigences = {}
+    for m in placables:
+        besoins_par_exigences.setdefault(exigences(m), []).append(
+            (m['nb_inscrits'], _creneaux_min(m['duree_examen'], calendrier))
+        )
+    besoins = sorted((b for groupe in besoins_par_exigences.values() for b in groupe), reverse=True)
+    raison = _hall(besoins, capacites, nb_creneaux * nb_jours)
+    for cle, groupe in besoins_par_exigences.items():
+        if raison:
+            break
+        if cle != (None, frozenset()):
+            raison = _hall(sorted(groupe, reverse=True), index_salles.capacites(cle), nb_creneaux * nb_jours)
+            if raison:
+                type_salle, equipements = cle
+                raison = f"[{', '.join(filter(None, [type_salle] + sorted(equipements)))}] {raison}"
+    if raison:
+        raisons.append(raison)
+    creneaux_salles = len(capacites) * nb_creneaux * nb_jours
+
+    # 3. Places-créneaux : demande totale en places face à la capacité totale
+    demande_places = sum(taille * creneaux for taille, creneaux in besoins)
+    offre_places = sum(capacites) * nb_creneaux * nb_jours
+    if demande_places > offre_places:
+        raisons.append(f"Demande de {demande_places} places-créneaux pour {offre_places} disponibles")
+    elif offre_places and demande_places > 0.9 * offre_places:
+        avertissements.append(f"Places-créneaux utilisées à {100 * demande_places / offre_places:.0f}%")
+
+    # 4. Jours : une formation passe au plus un examen par jour. Le graphe de conflits du
+    # moteur est une union de cliques (une par formation) plus les co-inscriptions entre
+    # formations : la plus grande clique de formation en est une borne inférieure.
+    par_formation = Counter(m['formation_id'] for m in placables)
+    clique = max(par_formation.values(), default=0)
+    if clique > nb_jours:
+        formations_trop_chargees = sum(1 for n in par_formation.values() if n > nb_jours)
+        raisons.append(
+            f"{formations_trop_chargees} formation(s) ont plus de modules que de jours "
+            f"(jusqu'à {clique} modules pour {nb_jours} jours)"
+        )
+
+    # Règles d'espacement : jours couverts au minimum par les examens d'une formation
+    jours_espacement = _jours_espacement(clique, probleme.get('espacement'))
+    if clique <= nb_jours and etendue < jours_espacement:
+        raisons.append(
+            f"Avec les règles d'espacement, {clique} examens d'une même formation "
+            f"s'étendent sur au moins {jours_espacement} jours pour une période de {etendue} jours"
+        )
+
+    # 5. Surveillants : un professeur surveille au plus max_par_jour_prof examens par jour
+    # et un seul par créneau
+    par_jour_prof = min(max_par_jour_prof, nb_creneaux)
+    offre_surveillance = nb_profs * par_jour_prof * nb_jours
+    if len(placables) > offre_surveillance:
+        raisons.append(
+            f"{len(placables)} examens pour {offre_surveillance} surveillances possibles "
+            f"({nb_profs} professeurs × {par_jour_prof} par jour × {nb_jours} jours)"
+        )
+
+    jours_min = max(
+        jours_espacement,
+        math.ceil(sum(c for _, c in besoins) / max(len(capacites) * nb_creneaux, 1)),
+        math.ceil(len(placables) / max(nb_profs * par_jour_prof, 1)) if placables else 0
+    )
+    if nb_jours and jours_min > 0.9 * nb_jours and jours_min <= nb_jours:
+        avertissements.append(f"Au moins {jours_min} jours nécessaires sur {nb_jours} disponibles")
+
+    return {
+        'faisable': not raisons and not modules_impossibles,
+        'raisons': raisons,
+        'avertissements': avertissements,
+        'modules_impossibles': [
+            {'nom': m['nom'], 'inscrits': m['nb_inscrits']} for m in modules_impossibles
+        ],
+        'bornes': {
+            'jours_disponibles': nb_jours,
+            'jours_min': jours_min,
+            'clique_formation': clique,
+            'creneaux_salles_demandes': sum(c for _, c in besoins),
+            'creneaux_salles_disponibles': creneaux_salles,
+            'places_demandees': demande_places,
+            'places_disponibles': offre_places,
+            'surveillances_demandees': len(placables),
+            'surveillances_disponibles': offre_surveillance
+        },
+        'duree_ms': round(1000 * (time.time() - start), 2)
+    }
@@ -0,0 +1,100 @@
+from bisect import bisect_left, bisect_right
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+
+def exigences(module: Dict) -> Tuple[Optional[str], FrozenSet[str]]:
+    """Exigences de salle d'un module : (type de salle ou None, équipements requis)."""
+    return module.get('type_salle'), frozenset(module.get('equipements_requis') or ())
+
+
+class RoomIndex:
+    """
+    Index inversé des salles. Chaque type de salle et chaque équipement est associé à
+    l'ensemble des salles qui le fournissent, sous forme de bitset (un entier, bit i =
+    i-ème salle par capacité croissante) : les salles d'un ensemble d'exigences sont
+    l'intersection (ET) de ces bitsets. La liste obtenue, triée par capacité, est
+    mémorisée par ensemble d'exigences ; les salles assez grandes pour un module en sont
+    un préfixe ou un suffixe, trouvé par dichotomie. Les bâtiments ont aussi leur bitset :
+    les listes d'un bâtiment sont triées de la même façon, pour les parcours par proximité.
+    """
+
+    def __init__(self, salles: List[Dict]):
+        # Tris stables : à capacité égale, l'ordre d'origine des salles est conservé
+        self.salles = sorted(salles, key=lambda s: s['capacite_examen'])
+        self.tous = (1 << len(self.salles)) - 1
+        self.par_type = {}
+        self.par_equipement = {}
+        self.par_batiment = {}
+        for i, salle in enumerate(self.salles):
+            self.par_type[salle['type']] = self.par_type.get(salle['type'], 0) | (1 << i)
+            self.par_batiment[salle['batiment']] = self.par_batiment.get(salle['batiment'], 0) | (1 << i)
+            for equipement in salle.get('equipements') or ():
+                self.par_equipement[equipement] = self.par_equipement.get(equipement, 0) | (1 << i)
+        self._groupes = {}
+        self._candidates = {}
+
+    def bits(self, cle) -> int:
+        """Bitset des salles satisfaisant l'ensemble d'exigences cle."""
+        type_salle, equipements = cle
+        bits = self.tous
+        if type_salle:
+            bits &= self.par_type.get(type_salle, 0)
+        for equipement in equipements:
+            bits &= self.par_equipement.get(equipement, 0)
+        return bits
+
+    def _groupe(self, cle, batiment=None):
+        """(salles croissantes, capacités croissantes, salles décroissantes, capacités opposées)."""
+        groupe = self._groupes.get((cle, batiment))
+        if groupe is None:
+            bits = self.bits(cle)
+            if batiment is not None:
+                bits &= self.par_batiment.get(batiment, 0)
+            croissantes = [s for i, s in enumerate(self.salles) if bits >> i & 1]
+            decroissantes = sorted(croissantes, key=lambda s: -s['capacite_examen'])
+            groupe = (
+                croissantes, [s['capacite_examen'] for s in croissantes],
+                decroissantes, [-s['capacite_examen'] for s in decroissantes]
+            )
+            self._groupes[(cle, batiment)] = groupe
+        return groupe
+
+    def _tranche(self, cle, batiment, nb_inscrits, plus_petites_d_abord) -> List[Dict]:
+        croissantes, capacites, decroissantes, opposees = self._groupe(cle, batiment)
+        if plus_petites_d_abord:
+            return croissantes[bisect_left(capacites, nb_inscrits):]
+        return decroissantes[:bisect_right(opposees, -nb_inscrits)]
+
+    def candidates(self, module: Dict, plus_petites_d_abord: bool = False,
+                   batiments: Optional[Tuple[str, ...]] = None) -> List[Dict]:
+        """
+        Salles compatibles et assez grandes pour le module, les plus grandes (ou plus petites)
+        d'abord ; avec batiments (ordre de proximité), bâtiment par bâtiment dans cet ordre.
+        """
+        cle = (exigences(module), module['nb_inscrits'], plus_petites_d_abord, batiments)
+        salles = self._candidates.get(cle)
+        if salles is None:
+            if batiments is None:
+                salles = self._tranche(cle[0], None, module['nb_inscrits'], plus_petites_d_abord)
+            else:
+                salles = [s for b in batiments
+                          for s in self._tranche(cle[0], b, module['nb_inscrits'], plus_petites_d_abord)]
+            self._candidates[cle] = salles
+        return salles
+
+    def admissible(self, module: Dict, salle: Dict) -> bool:
+        """La salle satisfait les exigences du module et peut l'accueillir."""
+        if salle['capacite_examen'] < module['nb_inscrits']:
+            return False
+        type_salle, equipements = exigences(module)
+        return ((not type_salle or salle['type'] == type_salle)
+                and equipements.issubset(salle.get('equipements') or ()))
+
+    def capacite_max(self, module: Dict) -> int:
+        """Capacité de la plus grande salle compatible avec les exigences du module (0 si aucune)."""
+        capacites = self._groupe(exigences(module))[1]
+        return capacites[-1] if capacites else 0
+
+    def capacites(self, cle) -> List[int]:
+        """Capacités croissantes des salles satisfaisant l'ensemble d'exigences cle."""
+        return self._groupe(cle)[1]
@@ -0,0 +1,185 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from src.exam_calendar import ExamCalendar
+from src.presolve import analyser_faisabilite
+from src.room_index import RoomIndex
+from src.scheduler import ExamScheduler, solve_first_fit, score_solution
+
+# Modifications reconnues d'un scénario (toutes facultatives) :
+#   nom                   : libellé du scénario dans le tableau comparatif
+#   batiments_fermes      : bâtiments dont aucune salle n'est utilisable
+#   salles_fermees        : identifiants de salles inutilisables
+#   ratio_capacite        : coefficient appliqué à la capacité d'examen des salles, global
+#                           (ex. 0.8) ou par type de salle (ex. {'amphitheatre': 0.6})
+#   date_debut / date_fin : bornes de la période
+#   jours_supplementaires : jours d'examen ajoutés après la fin de la période (jours ouvrés
+#                           hors jours exclus)
+#   jours_exclus          : dates exclues en plus de celles de la période
+#   modules_exclus        : identifiants de modules retirés de la session
+SCENARIO_CLES = ('nom', 'batiments_fermes', 'salles_fermees', 'ratio_capacite', 'date_debut', 'date_fin',
+                 'jours_supplementaires', 'jours_exclus', 'modules_exclus')
+
+# Borne du prolongement de la période pour jours_supplementaires (jours calendaires)
+PROLONGEMENT_MAX_JOURS = 366
+
+
+def _capacite(salle: Dict, ratio) -> int:
+    if isinstance(ratio, dict):
+        ratio = ratio.get(salle['type'], 1)
+    return int(salle['capacite_examen'] * ratio)
+
+
+def appliquer_scenario(probleme: Dict, scenario: Dict) -> Dict:
+    """
+    Copie du problème modifiée par le scénario ; le problème de base (et la base de
+    données) ne sont jamais modifiés. Les structures dérivées touchées (index des salles,
+    calendrier compilé, masques d'absence des professeurs) sont reconstruites.
+    """
+    inconnues = set(scenario) - set(SCENARIO_CLES)
+    if inconnues:
+        raise ValueError(f"Modifications de scénario inconnues : {', '.join(sorted(inconnues))}")
+    probleme = dict(probleme)
+
+    # Salles : fermetures et capacités
+    batiments_fermes = set(scenario.get('batiments_fermes') or ())
+    salles_fermees = set(scenario.get('salles_fermees') or ())
+    ratio = scenario.get('ratio_capacite')
+    if batiments_fermes or salles_fermees or ratio:
+        salles = [
+            dict(s, capacite_examen=_capacite(s, ratio)) if ratio else s
+            for s in probleme['salles']
+            if s['batiment'] not in batiments_fermes and s['id'] not in salles_fermees
+        ]
+        probleme['salles'] = salles
+        probleme['index_salles'] = RoomIndex(salles)
+
+    modules_exclus = set(scenario.get('modules_exclus') or ())
+    if modules_exclus:
+        probleme['modules'] = [m for m in probleme['modules'] if m['id'] not in modules_exclus]
+
+    # Dates : le calendrier et les masques d'absence sont recompilés
+    if any(scenario.get(k) for k in ('date_debut', 'date_fin', 'jours_supplementaires', 'jours_exclus')):
+        calendrier = probleme['calendrier']
+        date_debut = scenario.get('date_debut') or probleme['date_debut']
+        date_fin = scenario.get('date_fin') or probleme['date_fin']
+        jours_exclus = set(probleme.get('jours_exclus') or ()) | set(scenario.get('jours_exclus') or ())
+
+        def compiler(fin):
+            return ExamCalendar.compiler(date_debut, fin, heures=calendrier.heures,
+                                         jours_ouvres=probleme.get('jours_ouvres'), jours_exclus=jours_exclus,
+                                         horaires_batiments=calendrier.horaires)
+
+        calendrier = compiler(date_fin)
+        cible = calendrier.nb_jours + int(scenario.get('jours_supplementaires') or 0)
+        limite = date_fin + timedelta(days=PROLONGEMENT_MAX_JOURS)
+        while calendrier.nb_jours < cible and date_fin < limite:
+            date_fin += timedelta(days=1)
+            calendrier = compiler(date_fin)
+
+        indisponibilites = {}
+        for prof_id, plages in (probleme.get('plages_indisponibilites') or {}).items():
+            masque = calendrier.masque_plages(plages)
+            if masque:
+                indisponibilites[prof_id] = masque
+        probleme.update(date_debut=date_debut, date_fin=date_fin, jours_exclus=sorted(jours_exclus),
+                        calendrier=calendrier, indisponibilites=indisponibilites)
+        # Réservations des autres périodes reprojetées sur le nouveau calendrier (chargées sur
+        # les dates de la période : les jours ajoutés au-delà n'en ont pas)
+        if probleme.get('occupations'):
+            probleme = probleme['occupations'].appliquer(probleme)
+    return probleme
+
+
+def run_scenario(probleme: Dict, scenario: Dict) -> Dict:
+    """
+    Exécuté dans un processus du pool : applique le scénario, le résout et résume le résultat
+    (duree_s : temps de ce seul scénario, attente dans le pool exclue).
+    """
+    debut = time.time()
+    probleme = appliquer_scenario(probleme, scenario)
+    rapport = analyser_faisabilite(probleme)
+    # Comme pour generate_schedule : les modules plus grands que toute salle compatible
+    # ne sont pas soumis au moteur
+    index_salles = probleme['index_salles']
+    soumis = [m for m in probleme['modules'] if m['nb_inscrits'] <= index_salles.capacite_max(m)]
+    solution = solve_first_fit(dict(probleme, modules=soumis))
+    capacites = {s['id']: s['capacite_examen'] for s in probleme['salles']}
+    score, detail = score_solution(solution['examens'], solution['surveillances'], capacites,
+                                   len(probleme['profs']), probleme.get('localite'))
+    resultat = {
+        'scenario': scenario.get('nom'),
+        'modules': len(probleme['modules']),
+        'places': len(solution['examens']),
+        'echecs': len(probleme['modules']) - len(solution['examens']),
+        'jours_utilises': detail['jours'],
+        'jours_disponibles': probleme['calendrier'].nb_jours,
+        'salles': len(probleme['salles']),
+        'score': score,
+        'faisable': rapport['faisable'],
+        'raisons': " ; ".join(rapport['raisons']),
+        'duree_s': round(time.time() - debut, 3)
+    }
+    if 'localite' in detail:
+        resultat['penalite_localite'] = detail['localite']
+    return resultat
+
+
+class ScenarioRunner:
+    """
+    Questions « et si » sur une période (« et si le bâtiment C fermait ? », « et si l'on
+    ajoutait deux jours ? ») : les données de la période sont chargées une fois, chaque
+    scénario en modifie une copie en mémoire et tous sont résolus en parallèle dans un pool
+    de processus. Rien n'est écrit en base ni publié.
+    """
+
+    def __init__(self, db, scheduler: Optional[ExamScheduler] = None):
+        self.db = db
+        self.scheduler = scheduler or ExamScheduler(db)
+
+    def comparer(self, periode_id, scenarios: List[Dict], dept_id=None, espacement=None, localite=False,
+                 max_workers=None, progress=None):
+        """
+        Résout la période telle quelle (ligne « Référence ») et sous chaque scénario.
+        progress: rappel optionnel progress(faits, total, score, unité) appelé à chaque scénario
+        résolu ; s'il renvoie False, la comparaison s'arrête.
+        Renvoie (True, DataFrame comparatif : placés, échecs, jours utilisés... par scénario,
+        dans l'ordre donné) ou (False, {"error": ...}).
+        """
+        target_periode, probleme = self.scheduler._charger_probleme(periode_id, dept_id, espacement, localite)
+        if target_periode is None:
+            return False, {"error": probleme}
+
+        scenarios = [{'nom': 'Référence'}] + [
+            dict(s, nom=s.get('nom') or f"Scénario {i}") for i, s in enumerate(scenarios, start=1)
+        ]
+        for scenario in scenarios:
+            inconnues = set(scenario) - set(SCENARIO_CLES)
+            if inconnues:
+                return False, {"error": f"{scenario['nom']} : modifications inconnues ({', '.join(sorted(inconnues))})"}
+
+        executor = ProcessPoolExecutor(
+            max_workers=max_workers or min(len(scenarios), os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        try:
+            futures = [executor.submit(run_scenario, probleme, scenario) for scenario in scenarios]
+            lignes = []
+            for future in futures:
+                lignes.append(future.result())
+                if progress and progress(len(lignes), len(futures), None, 'scénarios') is False:
+                    return False, {"error": "Comparaison annulée", "cancelled": True}
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        comparaison = pd.DataFrame(lignes)
+        reference = comparaison.iloc[0]
+        comparaison['ecart_places'] = comparaison['places'] - reference['places']
+        comparaison['ecart_jours'] = comparaison['jours_utilises'] - reference['jours_utilises']
+        return True, comparaison
@@ -1,179 +1,840 @@
+import os
 import time
-from datetime import datetime, timedelta, time as dt_time
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from datetime import time as dt_time
+import multiprocessing
+import numpy as np
 import pandas as pd
 import random
 from collections import defaultdict
+from src.versions import ScheduleVersions, encode_version, decode_version_rows
+from src.solution_cache import SolutionCache, fingerprint
+from src.incidence import IncidenceCache
+from src.spacing import SpacingCounters, normaliser_espacement
+from src.exam_calendar import ExamCalendar
+from src.room_index import RoomIndex
+from src.compact import CompactModel
+from src.locality import Localite
+from src.occupancy import OccupancyIndex
+from src.local_search import LocalSearch
+from src.presolve import analyser_faisabilite
+
+# Stratégie de placement et heures de début des créneaux quotidiens
+# (modèle par défaut, remplacé par celui de la période : periodes_examen.heures_creneaux)
+STRATEGIE = 'first_fit'
+HEURES_CRENEAUX = (dt_time(8, 30), dt_time(11, 0), dt_time(14, 0))
+
+# Poids de l'objectif commun à toutes les stratégies (plus haut = meilleur) :
+# modules placés d'abord, puis jours utilisés, places de salle inoccupées,
+# déséquilibre (écart-type) du nombre de surveillances par professeur et, si
+# l'objectif de localité est activé, paliers de distance entre bâtiments
+POIDS_OBJECTIF = {'places': 1000.0, 'jours': 10.0, 'gaspillage': 0.01, 'desequilibre': 1.0, 'localite': 1.0}
+
+
+def score_solution(examens, surveillances, capacites, nb_profs, localite=None):
+    """
+    Objectif d'une solution (tuples de batch_insert_exams). Renvoie (score, détail).
+    localite: Localite de la période si l'objectif de localité est activé, sinon None.
+    """
+    charges = defaultdict(int)
+    for s in surveillances:
+        charges[s[2]] += 1
+    counts = np.zeros(max(nb_profs, len(charges), 1))
+    counts[:len(charges)] = list(charges.values())
+    detail = {
+        'places': len(examens),
+        'jours': len({e[4].date() for e in examens}),
+        'gaspillage': sum(capacites[e[2]] - e[6] for e in examens),
+        'desequilibre': round(float(counts.std()), 4)
+    }
+    score = (POIDS_OBJECTIF['places'] * detail['places']
+             - POIDS_OBJECTIF['jours'] * detail['jours']
+             - POIDS_OBJECTIF['gaspillage'] * detail['gaspillage']
+             - POIDS_OBJECTIF['desequilibre'] * detail['desequilibre'])
+    if localite is not None:
+        detail['localite'] = localite.penalite(examens)
+        score -= POIDS_OBJECTIF['localite'] * detail['localite']
+    return round(score, 4), detail
+
+
+def solve_first_fit(probleme, hints=None, variante=None, progress=None):
+    """
+    Placement glouton (First Fit) entièrement en mémoire, sans accès à la base.
+    probleme: dict (periode_id, calendrier, modules, salles, index_salles, profs, conflits, indisponibilites,
+    espacement)
+    index_salles: RoomIndex des salles ; les salles candidates d'un module (type, équipements,
+    capacité) en sont lues une fois par module, sans parcourir toutes les salles
+    localite: Localite si l'objectif de localité est activé (salles parcourues bâtiment par
+    bâtiment depuis celui du département, surveillant dont les examens voisins du jour sont
+    dans les bâtiments les plus proches), sinon None
+    calendrier: ExamCalendar compilé de la période ; l'occupation des salles et des professeurs
+    est tenue en bitsets de ses créneaux, dans un modèle compact à index denses (src/compact.py)
+    conflits: module_id -> modules d'autres formations partageant des étudiants (jamais le même jour)
+    indisponibilites: prof_id -> masque des créneaux où le professeur est absent (bit s = créneau s)
+    salles_reservees: salle_id -> masque des créneaux déjà réservés par d'autres périodes (facultatif)
+    surveillances_externes: (prof_id, jour) -> examens surveillés ce jour-là dans d'autres périodes
+    (facultatif ; voir src/occupancy.py)
+    espacement: règles d'espacement des examens (voir src/spacing.py), ou None
+    hints: module_id -> (datetime, salle_id), placements essayés en premier
+    variante: None pour l'ordre de référence, sinon graine d'une perturbation
+    reproductible (ordre des modules, des professeurs et des salles)
+    Renvoie dict(examens, surveillances, echecs, reprises), ou None si progress a
+    demandé l'arrêt.
+    """
+    periode_id = probleme['periode_id']
+    calendrier = probleme['calendrier']
+    modules = probleme['modules']
+    index_salles = probleme['index_salles']
+    plus_petites_d_abord = False
+    candidates = probleme['profs'] or [{'id': 1, 'nom': 'N/A', 'prenom': 'N/A'}]
+    localite = probleme.get('localite')
+    espacement = SpacingCounters.depuis_probleme(probleme)
+    hints = hints or {}
+    
+    # Modèle compact : index denses, tableaux contigus, occupation en bitsets de créneaux
+    modele = CompactModel(probleme, candidates)
+    ordre_modules = range(len(modules))
+    ordre_profs = list(range(len(candidates)))
+    
+    if variante is not None:
+        rng = random.Random(variante)
+        ordre_modules = sorted(
+            ordre_modules, key=lambda i: (-modules[i]['nb_inscrits'] * rng.uniform(0.85, 1.15), modules[i]['id'])
+        )
+        rng.shuffle(ordre_profs)
+        if rng.random() < 0.5:
+            # Plus petite salle suffisante d'abord : moins de places perdues
+            plus_petites_d_abord = True
+    
+    examens_crees = []
+    surveillances_crees = []
+    
+    # Tableaux du modèle lus dans la boucle de placement
+    module_ids, durees, nb_inscrits = modele.module_ids, modele.durees, modele.nb_inscrits
+    salle_ids, batiments, prof_ids = modele.salle_ids, modele.batiments, modele.prof_ids
+    occ_salle, occ_prof, charge_jour = modele.occ_salle, modele.occ_prof, modele.charge_jour
+    nb_jours = modele.nb_jours
+    slot_jour, slots = calendrier.slot_jour, calendrier.slots
+    
+    # (prof, créneau) -> bâtiment de la salle surveillée (objectif de localité seulement)
+    batiment_prof = {}
+    
+    salles_by_id = {s['id']: s for s in probleme['salles']}
+    
+    def cout_localite(p, jour, couverts, batiment):
+        """Paliers de distance avec les examens précédent et suivant du professeur dans la journée."""
+        premier, dernier = calendrier.slot(jour, 0), calendrier.slot(jour, calendrier.nb_heures - 1)
+        precedent = next((batiment_prof[(p, c)] for c in range(couverts.start - 1, premier - 1, -1)
+                          if (p, c) in batiment_prof), None)
+        suivant = next((batiment_prof[(p, c)] for c in range(couverts.stop, dernier + 1)
+                        if (p, c) in batiment_prof), None)
+        return localite.palier(precedent, batiment) + localite.palier(batiment, suivant)
+    
+    def placer(m, slot, salles_candidates):
+        """Place le module (index dense) au créneau donné si une salle et un professeur sont libres."""
+        jour = slot_jour[slot]
+        
+        # Règles d'espacement (fenêtre glissante, demi-journée libre) du groupe du module
+        if espacement and not espacement.admissible(
+                module_ids[m], calendrier.slot_ordinal[slot], calendrier.slot_demi_journee[slot]):
+            return False
+        
+        # Créneaux recouverts par la durée de l'examen (au sein d'une version, les
+        # chevauchements sont aussi refusés en base par les contraintes d'exclusion)
+        duree = durees[m]
+        masque = calendrier.masque(slot, duree)
+        
+        valid_salle = -1
+        for s in salles_candidates:
+            # 1. Capacité, type et équipements : garantis par l'index des salles
+            
+            # 2. Vérifier les horaires d'ouverture du bâtiment
+            if not calendrier.ouvert(batiments[s], slot, duree):
+                continue
+            
+            # 3. Vérifier disponibilité salle (réservations d'autres périodes comprises)
+            if occ_salle[s] & masque:
+                continue
+                
+            # Salle valide trouvée
+            valid_salle = s
+            break
+        
+        if valid_salle < 0:
+            return False
+        
+        # Trouver un prof disponible (avec la localité : le premier sans changement de
+        # bâtiment entre examens voisins, sinon le moins éloigné)
+        couverts = calendrier.couverts(slot, duree)
+        valid_prof = -1
+        meilleur_cout = None
+        for p in ordre_profs:
+            # Vérifier dispo créneau et absences déclarées (un ET sur le masque des créneaux)
+            if occ_prof[p] & masque:
+                continue
+            # Vérifier max 3 par jour
+            if charge_jour[p * nb_jours + jour] >= 3:
+                continue
+            
+            if localite is not None:
+                cout = cout_localite(p, jour, couverts, batiments[valid_salle])
+                if meilleur_cout is None or cout < meilleur_cout:
+                    valid_prof, meilleur_cout = p, cout
+                if cout:
+                    continue
+            
+            valid_prof = p
+            break
+        
+        if valid_prof < 0:
+            return False
+        
+        # Tout est bon, on réserve
+        examens_crees.append((
+            module_ids[m],
+            prof_ids[valid_prof],
+            salle_ids[valid_salle],
+            periode_id,
+            slots[slot],
+            duree,
+            nb_inscrits[m]
+        ))
+        
+        # Enregistrer surveillance
+        surveillances_crees.append((module_ids[m], periode_id, prof_ids[valid_prof], 'responsable'))
+        
+        # Mettre à jour les structures en mémoire
+        occ_salle[valid_salle] |= masque
+        occ_prof[valid_prof] |= masque
+        if localite is not None:
+            for c in couverts:
+                batiment_prof[(valid_prof, c)] = batiments[valid_salle]
+        charge_jour[valid_prof * nb_jours + jour] += 1
+        modele.jours_formation[modele.formations[m]] |= 1 << jour
+        modele.jour_module[m] = jour
+        if espacement:
+            espacement.ajouter(module_ids[m], calendrier.slot_ordinal[slot], calendrier.slot_demi_journee[slot])
+        return True
+    
+    nb_modules_places = 0
+    nb_reprises = 0
+    failed_modules = []
+    
+    for idx_module, m in enumerate(ordre_modules):
+        module = modules[m]
+        placed = False
+        
+        # Démarrage à chaud : essayer d'abord le placement de la solution précédente
+        hint = hints.get(module['id'])
+        if hint:
+            hint_slot, hint_salle = calendrier.index(hint[0]), salles_by_id.get(hint[1])
+            if (hint_salle and hint_slot is not None and index_salles.admissible(module, hint_salle)
+                    and not modele.jour_interdit(m, slot_jour[hint_slot])):
+                placed = placer(m, hint_slot, (modele.salle_index[hint[1]],))
+                nb_reprises += placed
+        
+        # Salles compatibles et assez grandes, lues dans l'index (intersection + dichotomie)
+        salles_module = modele.salles_denses(index_salles.candidates(
+            module, plus_petites_d_abord, localite.ordre_salles(module['id']) if localite else None
+        ))
+        
+        jour = 0
+        while not placed and salles_module and jour < calendrier.nb_jours:
+            # Vérifier si la formation (ou un module co-inscrit) a déjà un examen ce jour-là
+            if not modele.jour_interdit(m, jour):
+                for idx_creneau in range(calendrier.nb_heures):
+                    if placer(m, calendrier.slot(jour, idx_creneau), salles_module):
+                        placed = True
+                        break
+            jour += 1
+        
+        if placed:
+            nb_modules_places += 1
+        else:
+            if variante is None:
+                print(f"Impossible de placer le module {module['nom']} ({module['nb_inscrits']} inscrits)")
+            failed_modules.append(module)
+        
+        if progress and progress(idx_module + 1, len(modules), nb_modules_places) is False:
+            return None
+    
+    return {
+        'examens': examens_crees,
+        'surveillances': surveillances_crees,
+        'echecs': failed_modules,
+        'reprises': nb_reprises
+    }
+
+
+def _run_variante(probleme, hints, variante):
+    """Exécuté dans un processus du pool multi-start : une passe perturbée et son score."""
+    solution = solve_first_fit(probleme, hints, variante)
+    capacites = {s['id']: s['capacite_examen'] for s in probleme['salles']}
+    score, detail = score_solution(solution['examens'], solution['surveillances'], capacites, len(probleme['profs']),
+                                   probleme.get('localite'))
+    return solution, score, detail
+
 
 class ExamScheduler:
-    def __init__(self, db):
+    def __init__(self, db, cache=None):
         self.db = db
+        self.cache = cache or SolutionCache()
+        # Points de reprise de la recherche locale et matrices d'incidence, à côté du cache des solutions
+        self.checkpoints = SolutionCache(os.path.join(os.path.dirname(self.cache.directory), 'checkpoints'))
+        self.incidence = IncidenceCache(db, os.path.join(os.path.dirname(self.cache.directory), 'incidence'))
 
-    def generate_schedule(self, periode_id, dept_id=None):
+    def _charger_probleme(self, periode_id, dept_id=None, espacement=None, localite=False, reservations=True):
         """
-        Génère un emploi du temps initial valide (First Fit) avec optimisation en mémoire.
+        Récupère les données d'entrée une seule fois.
+        localite: charge la matrice des distances entre bâtiments (objectif de localité).
+        reservations: salles et professeurs déjà réservés sur les mêmes dates par les emplois
+        du temps publiés des autres périodes deviennent des créneaux interdits (False pour la
+        planification conjointe, qui tient son propre index).
+        Renvoie (période, problème) ou (None, message d'erreur).
         """
-        start_time = time.time()
-        
-        # Récupérer les données une seule fois
-        modules = self.db.get_modules_with_inscriptions()
-        salles = self.db.get_lieu_examen()
+        # Modules et inscrits de la session uniquement (année, semestre, statut d'inscription)
+        modules = self.db.get_modules_with_inscriptions(periode_id)
+        salles = [dict(s) for s in self.db.get_lieu_examen()]
         profs = self.db.get_professeurs(dept_id)
         periodes = self.db.get_periodes_examen(actif=True)
         
         if not periodes:
-            return False, {"error": "Aucune période active trouvée"}
+            return None, "Aucune période active trouvée"
         
         # Trouver la période spécifique
         target_periode = next((p for p in periodes if p['id'] == periode_id), None)
         if not target_periode:
-            return False, {"error": "Période spécifiée introuvable"}
+            return None, "Période spécifiée introuvable"
+        
+        # Trier modules par nombre d'inscrits décroissant (id en départage : ordre déterministe)
+        modules_sorted = sorted(
+            (dict(m) for m in modules if not dept_id or m['dept_id'] == dept_id),
+            key=lambda x: (-x['nb_inscrits'], x['id'])
+        )
+        
+        # Co-inscriptions (AᵀA) entre modules de formations différentes : les conflits
+        # au sein d'une formation sont déjà couverts par la règle d'un examen par jour
+        formations = {m['id']: m['formation_id'] for m in modules_sorted}
+        conflits = {}
+        incidence = self.incidence.load(periode_id)
+        if incidence is not None:
+            for module_id, voisins in incidence.conflits_modules().items():
+                if module_id not in formations:
+                    continue
+                autres = [v for v in voisins if v in formations and formations[v] != formations[module_id]]
+                if autres:
+                    conflits[module_id] = autres
+        
+        # Calendrier compilé une fois : jours ouvrés hors jours exclus × modèle de créneaux
+        calendrier_periode = self.db.get_calendrier_periode(periode_id)
+        calendrier = ExamCalendar.compiler(
+            target_periode['date_debut'], target_periode['date_fin'],
+            heures=target_periode.get('heures_creneaux') or HEURES_CRENEAUX,
+            jours_ouvres=target_periode.get('jours_ouvres'),
+            jours_exclus=calendrier_periode['jours_exclus'],
+            horaires_batiments=calendrier_periode['horaires_batiments']
+        )
+        
+        # Absences des professeurs compilées en masques de créneaux (un entier par professeur)
+        plages = defaultdict(list)
+        for indisponibilite in self.db.get_indisponibilites(periode_id):
+            plages[indisponibilite['prof_id']].append((indisponibilite['debut'], indisponibilite['fin']))
+        indisponibilites = {}
+        for prof_id, plages_prof in plages.items():
+            masque = calendrier.masque_plages(plages_prof)
+            if masque:
+                indisponibilites[prof_id] = masque
+        
+        # Paliers de distance entre bâtiments, depuis celui du département de chaque module
+        if localite:
+            batiments_departements = {d['id']: d['batiment'] for d in self.db.get_departements()}
+            localite = Localite(
+                self.db.get_distances_batiments(),
+                {s['id']: s['batiment'] for s in salles},
+                {m['id']: batiments_departements.get(m['dept_id']) for m in modules_sorted}
+            )
+        
+        probleme = {
+            'periode_id': periode_id,
+            'date_debut': target_periode['date_debut'],
+            'date_fin': target_periode['date_fin'],
+            'calendrier': calendrier,
+            'modules': modules_sorted,
+            'salles': salles,
+            'index_salles': RoomIndex(salles),
+            'profs': [dict(p) for p in profs],
+            'conflits': conflits,
+            'indisponibilites': indisponibilites,
+            'jours_ouvres': target_periode.get('jours_ouvres'),
+            'jours_exclus': calendrier_periode['jours_exclus'],
+            'plages_indisponibilites': dict(plages),
+            'localite': localite or None,
+            'espacement': normaliser_espacement(espacement)
+        }
+        
+        # Salles et professeurs partagés avec les autres périodes publiées (les contraintes
+        # d'exclusion de la base ne portent que sur une version)
+        if reservations:
+            occupations = OccupancyIndex.depuis_lignes(self.db.get_occupations_publiees(
+                target_periode['date_debut'], target_periode['date_fin'], [periode_id]
+            ))
+            probleme = dict(occupations.appliquer(probleme), occupations=occupations)
+        return target_periode, probleme
+
+    def _fingerprint(self, periode, dept_id, probleme, warm_start=None, recherche=None):
+        """Empreinte des données d'entrée : deux calculs de même empreinte donnent la même solution."""
+        return fingerprint({
+            'strategie': STRATEGIE,
+            'recherche': recherche,
+            'calendrier': probleme['calendrier'].signature(),
+            'periode': [periode['id'], periode['date_debut'], periode['date_fin']],
+            'dept_id': dept_id,
+            'warm_start': warm_start,
+            'modules': [[m['id'], m['formation_id'], m['duree_examen'], m['nb_inscrits'],
+                         m.get('type_salle'), sorted(m.get('equipements_requis') or ())] for m in probleme['modules']],
+            'salles': [[s['id'], s['capacite_examen'], s['batiment'], s['type'], sorted(s.get('equipements') or ())]
+                       for s in probleme['salles']],
+            'profs': [p['id'] for p in probleme['profs']],
+            'conflits': sorted((m, sorted(v)) for m, v in (probleme['conflits'] or {}).items()),
+            'indisponibilites': sorted(probleme['indisponibilites'].items()),
+            'salles_reservees': sorted((probleme.get('salles_reservees') or {}).items()),
+            'surveillances_externes': sorted((probleme.get('surveillances_externes') or {}).items()),
+            'localite': probleme['localite'].signature() if probleme['localite'] else None,
+            'espacement': probleme['espacement']
+        })
+
+    def _metriques(self, examens_crees, surveillances_crees, nb_echecs, salles, nb_profs, localite=None):
+        capacites = {s['id']: s['capacite_examen'] for s in salles}
+        score, detail = score_solution(examens_crees, surveillances_crees, capacites, nb_profs, localite)
+        metriques = {
+            'scheduled': len(examens_crees),
+            'failed': nb_echecs,
+            'jours_utilises': detail['jours'],
+            'taux_remplissage': round(
+                100.0 * sum(e[6] for e in examens_crees) / max(sum(capacites.get(e[2], 0) for e in examens_crees), 1), 2
+            ),
+            'score': score,
+            'desequilibre_surveillances': detail['desequilibre']
+        }
+        if localite is not None:
+            metriques['penalite_localite'] = detail['localite']
+        return metriques
+
+    def _publish_cached(self, periode_id, modules, salles, profs, empreinte, blob, strategie, lance_par, start_time,
+                        localite=None):
+        """Publie une solution déjà calculée pour des données identiques, sans recalcul."""
+        existing = self.db.find_version_by_empreinte(periode_id, empreinte)
+        if existing:
+            success, info = ScheduleVersions(self.db).rollback(periode_id, existing['id'])
+            if not success:
+                return None
+            version_id = info['version_id']
+            examens_crees, _ = decode_version_rows(
+                self.db.get_version_planning(version_id)['encodage'], periode_id
+            )
+        else:
+            examens_crees, surveillances_crees = decode_version_rows(blob, periode_id)
+            metriques = self._metriques(
+                examens_crees, surveillances_crees, len(modules) - len(examens_crees), salles, len(profs), localite
+            )
+            version_id = self.db.batch_insert_exams(examens_crees, surveillances_crees, version_info={
+                'lance_par': lance_par,
+                'strategie': strategie,
+                'metriques': metriques,
+                'duree_execution': round(time.time() - start_time, 3),
+                'empreinte': empreinte,
+                'encodage': blob
+            })
+            self.db.publish_version_planning(version_id)
+
+        places = {e[0] for e in examens_crees}
+        failed_modules = [
+            {'nom': m['nom'], 'inscrits': m['nb_inscrits']} for m in modules if m['id'] not in places
+        ]
+        return {
+            'version_id': version_id,
+            'execution_time': time.time() - start_time,
+            'scheduled': len(examens_crees),
+            'failed': len(failed_modules),
+            'total_conflicts': 0,
+            'failed_modules': failed_modules,
+            'from_cache': True
+        }
 
-        date_debut = target_periode['date_debut']
-        date_fin = target_periode['date_fin']
+    def _warm_start_hints(self, source_periode_id, target_periode):
+        """
+        Projette l'emploi du temps publié d'une session précédente sur la nouvelle période :
+        même décalage en jours depuis le début de session, même créneau, même salle.
+        """
+        source = next((p for p in self.db.get_periodes_examen(actif=False) if p['id'] == source_periode_id), None)
+        if not source:
+            return {}, None
+        decalage = target_periode['date_debut'] - source['date_debut']
+        hints = {
+            e['module_id']: (e['date_heure'] + decalage, e['salle_id'])
+            for e in self.db.get_placements_publies(source_periode_id)
+        }
+        return hints, [source_periode_id, source['version_publiee_id']]
+
+    def _multi_start(self, probleme, hints, nb_departs, seed, time_budget=None, progress=None):
+        """
+        Lance nb_departs passes (la passe de référence + des ordres perturbés dérivés de
+        seed) dans un pool de processus et garde la meilleure selon score_solution.
+        Le résultat ne dépend que de seed tant que time_budget n'interrompt pas de passe ;
+        à score égal, la passe de plus petit indice l'emporte.
+        """
+        variantes = [None] + [f"{seed}:{i}" for i in range(1, nb_departs)]
+        deadline = time.time() + time_budget if time_budget else None
+        best = None
+        done = 0
         
-        # Supprimer l'existant pour cette période
-        self.db.delete_all_examens(periode_id)
+        executor = ProcessPoolExecutor(
+            max_workers=min(nb_departs, os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        try:
+            # Les indications de démarrage à chaud ne guident que la passe de référence :
+            # les passes perturbées explorent librement
+            futures = {
+                executor.submit(_run_variante, probleme, hints if v is None else None, v): i
+                for i, v in enumerate(variantes)
+            }
+            try:
+                for future in as_completed(futures, timeout=(deadline - time.time()) if deadline else None):
+                    solution, score, detail = future.result()
+                    rang = (score, -futures[future])
+                    if best is None or rang > best[0]:
+                        best = (rang, solution, detail)
+                    done += 1
+                    if progress and progress(done, nb_departs, best[0][0], 'départs') is False:
+                        return None
+            except FuturesTimeout:
+                print(f"Budget de temps atteint : {done}/{nb_departs} départs terminés")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
         
-        examens_crees = []
-        surveillances_crees = []
+        if best is None:
+            # Aucune passe terminée dans le budget : passe de référence en local
+            return solve_first_fit(probleme, hints)
+        solution = best[1]
+        solution['depart'] = -best[0][1]
+        solution['departs_termines'] = done
+        return solution
+
+    def analyser_faisabilite(self, periode_id, dept_id=None, espacement=None):
+        """Bornes de faisabilité de la période, sans résolution (quelques millisecondes)."""
+        target_periode, probleme = self._charger_probleme(periode_id, dept_id, espacement)
+        if target_periode is None:
+            return False, {"error": probleme}
+        return True, analyser_faisabilite(probleme)
+
+    def generate_schedule(self, periode_id, dept_id=None, lance_par=None, progress=None, use_cache=True,
+                          warm_start_from=None, multi_start=1, seed=0, time_budget=None, force=False,
+                          espacement=None, localite=False):
+        """
+        Génère un emploi du temps initial valide (First Fit) avec optimisation en mémoire.
+        progress: rappel optionnel progress(faits, total, score[, unité]) appelé après chaque
+        module (après chaque départ en multi-start) ; s'il renvoie False, le calcul s'arrête sans
+        rien enregistrer.
+        use_cache: si les données d'entrée n'ont pas changé depuis un calcul précédent, sa
+        solution est republiée telle quelle ; sinon la dernière solution de la période sert
+        de point de départ (placements essayés en premier).
+        warm_start_from: période précédente (ex. même session l'an dernier) dont l'emploi
+        du temps publié sert de point de départ ; seuls les modules nouveaux ou dont le
+        placement n'est plus valide passent par la recherche complète.
+        multi_start, seed, time_budget: nombre de passes parallèles (ordres perturbés,
+        reproductibles depuis seed) et budget de temps en secondes ; la meilleure est gardée.
+        force: lance la résolution même si l'analyse préalable prouve que certains modules
+        ne pourront pas être placés (sinon la période est rejetée d'emblée).
+        espacement: règles d'espacement des examens d'un même groupe d'étudiants, ex.
+        {'max_examens': 2, 'fenetre_jours': 3, 'ecart_demi_journees': 2}.
+        localite: objectif de localité (salles proches du bâtiment du département, surveillant
+        dans un même bâtiment entre deux examens successifs), selon distances_batiments.
+        """
+        start_time = time.time()
         
-        # Structures de données en mémoire pour validation ultra-rapide
-        # (salle_id, datetime) -> True
-        salle_occupancy = set()
+        target_periode, probleme = self._charger_probleme(periode_id, dept_id, espacement, localite)
+        if target_periode is None:
+            return False, {"error": probleme}
+        modules_sorted, salles, profs = probleme['modules'], probleme['salles'], probleme['profs']
         
-        # (prof_id, datetime) -> True
-        prof_occupancy = set()
+        # Analyse préalable : inutile de tout parcourir si la période est infaisable
+        rapport = analyser_faisabilite(probleme)
+        if rapport['raisons'] and not force:
+            return False, {
+                "error": "Période infaisable : " + " ; ".join(rapport['raisons']),
+                "presolve": rapport
+            }
         
-        # (prof_id, date) -> count
-        prof_daily_count = defaultdict(int)
+        hints, warm_start = {}, None
+        if warm_start_from and warm_start_from != periode_id:
+            hints, warm_start = self._warm_start_hints(warm_start_from, target_periode)
         
-        # (formation_id, date) -> True (Pour éviter 2 examens le même jour pour la même promo)
-        formation_daily_occupancy = defaultdict(set)
+        multi_start = max(int(multi_start or 1), 1)
+        strategie = STRATEGIE if multi_start == 1 else 'multi_start'
+        recherche = None if multi_start == 1 else {'departs': multi_start, 'seed': seed, 'budget': time_budget}
         
-        # Trier modules par nombre d'inscrits décroissant
-        modules_sorted = sorted(modules, key=lambda x: x['nb_inscrits'], reverse=True)
+        # Cache des solutions : même empreinte => même solution
+        cache_key = f"p{periode_id}-{dept_id or 'all'}"
+        empreinte = self._fingerprint(target_periode, dept_id, probleme, warm_start, recherche)
+        if use_cache:
+            blob = self.cache.get(cache_key, empreinte)
+            if blob is not None or self.db.find_version_by_empreinte(periode_id, empreinte):
+                result = self._publish_cached(
+                    periode_id, modules_sorted, salles, profs, empreinte, blob, strategie, lance_par, start_time,
+                    probleme['localite']
+                )
+                if result:
+                    return True, result
+            # Démarrage à chaud : placements de la dernière solution de la période
+            previous = self.cache.latest(cache_key) if not hints else None
+            if previous is not None:
+                for e in decode_version_rows(previous, periode_id)[0]:
+                    hints[e[0]] = (e[4], e[2])
         
-        current_date_pointer = date_debut
+        # Les modules plus grands que toute salle compatible ne sont pas soumis au moteur
+        if rapport['modules_impossibles']:
+            index_salles = probleme['index_salles']
+            probleme = dict(probleme, modules=[
+                m for m in modules_sorted if m['nb_inscrits'] <= index_salles.capacite_max(m)
+            ])
         
-        nb_modules_places = 0
-        failed_modules = []
+        # L'emploi du temps publié reste visible pendant tout le calcul : le résultat
+        # est écrit dans une version brouillon puis publié d'un seul coup.
+        if multi_start > 1:
+            solution = self._multi_start(probleme, hints, multi_start, seed, time_budget, progress)
+        else:
+            solution = solve_first_fit(probleme, hints, progress=progress)
+        if solution is None:
+            return False, {"error": "Génération annulée", "cancelled": True}
         
-        for module in modules_sorted:
-            # Si filtrage par département
-            if dept_id and module['dept_id'] != dept_id:
-                continue
-            
-            placed = False
-            test_date = current_date_pointer
-            
-            # Limite de recherche pour éviter boucle infinie (date fin + marge)
-            max_days_search = (date_fin - date_debut).days + 1
-            days_searched = 0
-            
-            while not placed and test_date <= date_fin:
-                # Créneaux horaires (08:30, 11:00, 14:00)
-                creneaux = [
-                    datetime.combine(test_date, dt_time(8, 30)),
-                    datetime.combine(test_date, dt_time(11, 0)),
-                    datetime.combine(test_date, dt_time(14, 0))
-                ]
-                
-                module_formation = module['formation_id']
-                
-                # Vérifier si la formation a déjà un examen ce jour-là
-                if test_date in formation_daily_occupancy[module_formation]:
-                    # Passer au jour suivant
-                    test_date += timedelta(days=1)
-                    days_searched += 1
-                    continue
-
-                for creneau in creneaux:
-                    valid_salle = None
-                    
-                    for salle in salles:
-                        # 1. Vérifier capacité
-                        if salle['capacite_examen'] < module['nb_inscrits']:
-                            continue
-                        
-                        # 2. Vérifier disponibilité salle
-                        if (salle['id'], creneau) in salle_occupancy:
-                            continue
-                            
-                        # Salle valide trouvée
-                        valid_salle = salle
-                        break
-                    
-                    if valid_salle:
-                        # Trouver un prof disponible
-                        valid_prof = None
-                        candidates = profs if profs else [{'id': 1, 'nom': 'N/A', 'prenom': 'N/A'}]
-                        
-                        # Essayer de trouver un prof libre
-                        for prof in candidates:
-                            p_id = prof['id']
-                            # Vérifier dispo créneau
-                            if (p_id, creneau) in prof_occupancy:
-                                continue
-                            # Vérifier max 3 par jour
-                            if prof_daily_count[(p_id, test_date)] >= 3:
-                                continue
-                                
-                            valid_prof = prof
-                            break
-                        
-                        if valid_prof:
-                            # Tout est bon, on réserve
-                            
-                            exam_entry = (
-                                module['id'],
-                                valid_prof['id'],
-                                valid_salle['id'],
-                                periode_id,
-                                creneau,
-                                module['duree_examen'],
-                                module['nb_inscrits']
-                            )
-                            examens_crees.append(exam_entry)
-                            
-                            # Enregistrer surveillance
-                            surveillances_crees.append((module['id'], periode_id, valid_prof['id'], 'responsable'))
-                            
-                            # Mettre à jour les structures en mémoire
-                            salle_occupancy.add((valid_salle['id'], creneau))
-                            prof_occupancy.add((valid_prof['id'], creneau))
-                            prof_daily_count[(valid_prof['id'], test_date)] += 1
-                            formation_daily_occupancy[module_formation].add(test_date)
-                            
-                            placed = True
-                            nb_modules_places += 1
-                            break
-                
-                if not placed:
-                    test_date += timedelta(days=1)
-                    days_searched += 1
-            
-            if not placed:
-                print(f"Impossible de placer le module {module['nom']} ({module['nb_inscrits']} inscrits)")
-                failed_modules.append({'nom': module['nom'], 'inscrits': module['nb_inscrits']})
+        examens_crees = solution['examens']
+        surveillances_crees = solution['surveillances']
+        failed_modules = rapport['modules_impossibles'] + [
+            {'nom': m['nom'], 'inscrits': m['nb_inscrits']} for m in solution['echecs']
+        ]
         
-        # Sauvegarde en batch
+        # Sauvegarde en batch dans une version brouillon, puis bascule atomique
         if examens_crees:
-            self.db.batch_insert_exams(examens_crees, surveillances_crees)
+            metriques = self._metriques(examens_crees, surveillances_crees, len(failed_modules), salles, len(profs),
+                                        probleme['localite'])
+            metriques['reprises'] = solution['reprises']
+            if recherche:
+                metriques.update(recherche, depart_retenu=solution.get('depart'),
+                                 departs_termines=solution.get('departs_termines'))
+            encodage = encode_version(examens_crees, surveillances_crees)
+            version_id = self.db.batch_insert_exams(examens_crees, surveillances_crees, version_info={
+                'lance_par': lance_par,
+                'strategie': strategie,
+                'metriques': metriques,
+                'duree_execution': round(time.time() - start_time, 3),
+                'empreinte': empreinte,
+                'encodage': encodage
+            })
+            self.db.publish_version_planning(version_id)
+            self.db.purge_archived_versions(periode_id)
+            self.cache.put(cache_key, empreinte, encodage)
             
             end_time = time.time()
             return True, {
+                'version_id': version_id,
                 'execution_time': end_time - start_time,
                 'scheduled': len(examens_crees),
                 'failed': len(failed_modules),
                 'total_conflicts': 0, # In-memory guarantees 0 hard conflicts
-                'failed_modules': failed_modules
+                'failed_modules': failed_modules,
+                'reprises': solution['reprises'],
+                'score': metriques['score'],
+                'presolve': rapport,
+                'from_cache': False
             }
         else:
             return False, {"error": "Aucun examen n'a pu être généré (peut-être manque de salles/profs ?)"}
 
-    def optimize_schedule(self, periode_id):
+    def generate_joint_schedule(self, periode_ids, lance_par=None, force=False, espacement=None, localite=False,
+                                progress=None):
         """
-        Améliore l'emploi du temps existant (Best Fit, équilibrage).
+        Planification conjointe de plusieurs périodes partageant salles et professeurs (session
+        normale et rattrapage, sessions parallèles de formations différentes). Un index global
+        des réservations est construit sur l'ensemble des dates couvertes, à partir des emplois
+        du temps publiés des autres périodes ; les périodes sont ensuite placées par date de
+        début croissante, chacune voyant les réservations des précédentes projetées sur son
+        calendrier : aucune salle ni aucun professeur n'est réservé deux fois, et un professeur
+        surveille au plus 3 examens par jour toutes sessions confondues.
+        progress: rappel optionnel progress(faits, total, score, unité) appelé après chaque
+        période placée ; s'il renvoie False, le calcul s'arrête sans rien enregistrer.
+        Rien n'est publié si une période échoue ; sinon toutes les versions sont insérées et
+        publiées dans une même transaction. Renvoie (True, {periode_id: résultat}) ou
+        (False, {"error": ...}).
         """
-        # TODO: Implémenter une logique d'optimisation plus poussée (swap, annealing...)
-        return True, "Optimisation terminée (Simulée pour l'instant)"
+        start_time = time.time()
+        periode_ids = list(dict.fromkeys(periode_ids))
+        if not periode_ids:
+            return False, {"error": "Aucune période sélectionnée"}
+        
+        problemes = []
+        for periode_id in periode_ids:
+            target_periode, probleme = self._charger_probleme(periode_id, None, espacement, localite,
+                                                              reservations=False)
+            if target_periode is None:
+                return False, {"error": f"Période {periode_id} : {probleme}"}
+            rapport = analyser_faisabilite(probleme)
+            if rapport['raisons'] and not force:
+                return False, {
+                    "error": f"{target_periode['nom']} infaisable : " + " ; ".join(rapport['raisons']),
+                    "presolve": rapport
+                }
+            problemes.append((target_periode, probleme, rapport))
+        problemes.sort(key=lambda p: (p[0]['date_debut'], p[0]['id']))
+        
+        # Index global : réservations publiées des autres périodes sur toutes les dates couvertes
+        occupations = OccupancyIndex.depuis_lignes(self.db.get_occupations_publiees(
+            min(p[0]['date_debut'] for p in problemes), max(p[0]['date_fin'] for p in problemes), periode_ids
+        ))
+        
+        solutions = []
+        for numero, (target_periode, probleme, rapport) in enumerate(problemes, start=1):
+            index_salles = probleme['index_salles']
+            probleme_conjoint = occupations.appliquer(dict(probleme, modules=[
+                m for m in probleme['modules'] if m['nb_inscrits'] <= index_salles.capacite_max(m)
+            ]))
+            solution = solve_first_fit(probleme_conjoint)
+            if probleme_conjoint['modules'] and not solution['examens']:
+                return False, {"error": f"{target_periode['nom']} : aucun examen n'a pu être généré"}
+            occupations.ajouter_examens(solution['examens'])
+            solutions.append((target_periode, probleme, rapport, solution))
+            if progress and progress(numero, len(problemes), None, 'périodes') is False:
+                return False, {"error": "Planification conjointe annulée", "cancelled": True}
+        
+        # Publication une fois toutes les périodes placées, en une seule transaction
+        resultats, lots = {}, []
+        for target_periode, probleme, rapport, solution in solutions:
+            periode_id = target_periode['id']
+            examens_crees, surveillances_crees = solution['examens'], solution['surveillances']
+            if not examens_crees:
+                # Aucun module à examiner dans cette période (ex. rattrapage sans échecs)
+                resultats[periode_id] = {'version_id': None, 'nom': target_periode['nom'], 'scheduled': 0,
+                                         'failed': len(rapport['modules_impossibles']),
+                                         'failed_modules': rapport['modules_impossibles'], 'presolve': rapport}
+                continue
+            failed_modules = rapport['modules_impossibles'] + [
+                {'nom': m['nom'], 'inscrits': m['nb_inscrits']} for m in solution['echecs']
+            ]
+            metriques = self._metriques(examens_crees, surveillances_crees, len(failed_modules), probleme['salles'],
+                                        len(probleme['profs']), probleme['localite'])
+            metriques.update(reprises=solution['reprises'], periodes_conjointes=periode_ids)
+            lots.append((examens_crees, surveillances_crees, {
+                'lance_par': lance_par,
+                'strategie': 'conjoint',
+                'metriques': metriques,
+                'duree_execution': round(time.time() - start_time, 3),
+                'encodage': encode_version(examens_crees, surveillances_crees)
+            }))
+            resultats[periode_id] = {
+                'version_id': None,
+                'nom': target_periode['nom'],
+                'scheduled': len(examens_crees),
+                'failed': len(failed_modules),
+                'failed_modules': failed_modules,
+                'score': metriques['score'],
+                'presolve': rapport
+            }
+        if lots:
+            for (examens_crees, _, _), version_id in zip(lots, self.db.publish_versions_together(lots)):
+                resultats[examens_crees[0][3]]['version_id'] = version_id
+        return True, resultats
+
+    def optimize_schedule(self, periode_id, progress=None, dept_id=None, time_limit=30, seed=0,
+                          lance_par=None, resume=True, espacement=None, localite=False):
+        """
+        Améliore l'emploi du temps publié par recherche locale jusqu'à l'échéance (anytime).
+        Sans emploi du temps publié, une solution gloutonne est d'abord construite et publiée :
+        un planning valide existe dès les premières secondes. La meilleure solution est
+        sauvegardée régulièrement sur disque ; un calcul annulé ou interrompu reprend depuis
+        ce point avec resume=True. progress, espacement, localite: comme pour generate_schedule
+        (les mouvements qui enfreindraient les règles d'espacement sont refusés ; la pénalité
+        de localité entre dans le score).
+        """
+        start_time = time.time()
+        deadline = start_time + time_limit
+        
+        target_periode, probleme = self._charger_probleme(periode_id, dept_id, espacement, localite)
+        if target_periode is None:
+            return False, {"error": probleme}
+        
+        version_id = target_periode['version_publiee_id']
+        if version_id is None:
+            success, result = self.generate_schedule(periode_id, dept_id, lance_par=lance_par, espacement=espacement,
+                                                     localite=localite)
+            if not success:
+                return False, result
+            version_id = result['version_id']
+        version = self.db.get_version_planning(version_id)
+        if version['encodage'] is None:
+            return False, {"error": "La version publiée n'a pas d'encodage"}
+        examens, surveillances = decode_version_rows(version['encodage'], periode_id)
+        capacites = {s['id']: s['capacite_examen'] for s in probleme['salles']}
+        score_initial, _ = score_solution(examens, surveillances, capacites, len(probleme['profs']), probleme['localite'])
+        
+        # Point de reprise propre à (données d'entrée, version de départ)
+        checkpoint_key = f"p{periode_id}-{dept_id or 'all'}"
+        base = fingerprint([
+            self._fingerprint(target_periode, dept_id, probleme),
+            version_id
+        ])
+        if resume:
+            blob = self.checkpoints.get(checkpoint_key, base)
+            if blob is not None:
+                examens, _ = decode_version_rows(blob, periode_id)
+                print(f"Reprise de l'optimisation depuis le point de sauvegarde ({len(examens)} examens)")
+        
+        recherche = LocalSearch(probleme, examens, POIDS_OBJECTIF, seed)
+        
+        def checkpoint(solution):
+            self.checkpoints.put(checkpoint_key, base, encode_version(*solution))
+        
+        courbe = recherche.run(deadline, progress, checkpoint)
+        if courbe is None:
+            return False, {"error": "Optimisation annulée (reprise possible)", "cancelled": True}
+        # Courbe d'amélioration réduite à ~100 points (le dernier est toujours gardé)
+        pas = max(len(courbe) // 100, 1)
+        courbe = courbe[::pas] + ([courbe[-1]] if (len(courbe) - 1) % pas else [])
+        
+        examens_opt, surveillances_opt = recherche.best_solution()
+        score_final, detail = score_solution(examens_opt, surveillances_opt, capacites, len(probleme['profs']),
+                                             probleme['localite'])
+        result = {
+            'message': "Aucune amélioration trouvée dans le temps imparti",
+            'execution_time': time.time() - start_time,
+            'score_initial': score_initial,
+            'score': score_final,
+            'iterations': recherche.iterations,
+            'courbe': courbe,
+            'version_id': version_id
+        }
+        if score_final <= score_initial + 1e-9:
+            self.checkpoints.discard(checkpoint_key, base)
+            return True, result
+        
+        metriques = self._metriques(
+            examens_opt, surveillances_opt, len(probleme['modules']) - len(examens_opt),
+            probleme['salles'], len(probleme['profs']), probleme['localite']
+        )
+        metriques.update(score_initial=score_initial, iterations=recherche.iterations, courbe=courbe)
+        new_version_id = self.db.batch_insert_exams(examens_opt, surveillances_opt, version_info={
+            'lance_par': lance_par,
+            'strategie': 'recherche_locale',
+            'metriques': metriques,
+            'duree_execution': round(time.time() - start_time, 3),
+            'encodage': encode_version(examens_opt, surveillances_opt)
+        })
+        self.db.publish_version_planning(new_version_id)
+        self.db.purge_archived_versions(periode_id)
+        self.checkpoints.discard(checkpoint_key, base)
+        
+        result.update(
+            message=f"Score amélioré de {score_final - score_initial:.2f} ({detail['jours']} jours, "
+                    f"déséquilibre des surveillances {detail['desequilibre']})",
+            version_id=new_version_id
+        )
+        return True, result
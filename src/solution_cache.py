@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+# Répertoire et taille maximale du cache des solutions (surchargeables par variables d'environnement)
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache', 'solutions')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def fingerprint(payload) -> str:
+    """Empreinte SHA-256 d'une structure JSON-sérialisable (ordre des clés normalisé)."""
+    data = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class SolutionCache:
+    """
+    Cache disque des solutions encodées (blobs de encode_version), indexé par empreinte
+    du problème. Les fichiers sont regroupés par clé (période, département) pour retrouver
+    la solution la plus récente d'un problème voisin. Éviction des moins récemment
+    utilisés au-delà de max_bytes.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.directory = directory or os.getenv('SOLUTION_CACHE_DIR', DEFAULT_CACHE_DIR)
+        self.max_bytes = max_bytes or int(os.getenv('SOLUTION_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+    def _path(self, key: str, empreinte: str) -> str:
+        return os.path.join(self.directory, f"{key}-{empreinte}.npz")
+
+    def _entries(self, key: Optional[str] = None):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        prefix = f"{key}-" if key else ''
+        entries = []
+        for name in names:
+            if name.endswith('.npz') and name.startswith(prefix):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _read(self, path: str) -> Optional[bytes]:
+        try:
+            with open(path, 'rb') as f:
+                blob = f.read()
+            os.utime(path)  # marque l'entrée comme récemment utilisée
+            return blob
+        except OSError:
+            return None
+
+    def get(self, key: str, empreinte: str) -> Optional[bytes]:
+        return self._read(self._path(key, empreinte))
+
+    def latest(self, key: str) -> Optional[bytes]:
+        """Solution la plus récente pour la clé, quelle que soit son empreinte."""
+        entries = self._entries(key)
+        if not entries:
+            return None
+        return self._read(max(entries)[2])
+
+    def put(self, key: str, empreinte: str, blob: bytes):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key, empreinte)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, path)
+            self.evict()
+        except OSError as e:
+            print(f"Solution cache write error: {e}")
+
+    def discard(self, key: str, empreinte: str):
+        try:
+            os.remove(self._path(key, empreinte))
+        except OSError:
+            pass
+
+    def evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,89 @@
+from collections import defaultdict
+from typing import Dict, Optional
+
+# Paramètres d'espacement reconnus (None ou absent = règle désactivée) :
+#   max_examens / fenetre_jours : au plus max_examens examens sur fenetre_jours jours consécutifs
+#   ecart_demi_journees         : écart minimal entre deux examens, en demi-journées
+#                                 (2 = au moins une demi-journée libre entre deux examens)
+ESPACEMENT_CLES = ('max_examens', 'fenetre_jours', 'ecart_demi_journees')
+
+
+def normaliser_espacement(espacement: Optional[Dict]) -> Optional[Dict]:
+    """Garde les règles actives (valeurs entières positives) ; None si aucune."""
+    if not espacement:
+        return None
+    regles = {k: int(espacement[k]) for k in ESPACEMENT_CLES if espacement.get(k)}
+    if not ('max_examens' in regles and 'fenetre_jours' in regles):
+        regles.pop('max_examens', None)
+        regles.pop('fenetre_jours', None)
+    if regles.get('ecart_demi_journees', 0) < 2:
+        regles.pop('ecart_demi_journees', None)
+    return regles or None
+
+
+def groupes_modules(probleme: Dict) -> Dict[int, tuple]:
+    """
+    Groupes de chaque module, dérivés de la structure de co-inscription : sa formation
+    (ses étudiants y sont inscrits) et celles des modules d'autres formations avec
+    lesquels il partage des étudiants. Les compteurs d'un groupe majorent ceux de
+    chacun de ses étudiants.
+    """
+    formations = {m['id']: m['formation_id'] for m in probleme['modules']}
+    conflits = probleme.get('conflits') or {}
+    return {
+        m_id: tuple({f} | {formations[v] for v in conflits.get(m_id, ()) if v in formations})
+        for m_id, f in formations.items()
+    }
+
+
+class SpacingCounters:
+    """
+    Compteurs glissants par groupe de modules. fenetres[(groupe, j)] compte les examens
+    du groupe sur les jours j .. j + fenetre_jours - 1 ; placer ou retirer un examen met à
+    jour fenetre_jours compteurs, et vérifier une date en lit autant : O(1) pour une
+    configuration donnée, quel que soit le nombre d'étudiants. Jours et demi-journées sont
+    des index absolus (ordinal du jour, 2 × ordinal + après-midi), fournis par le calendrier
+    compilé de la période.
+    """
+
+    def __init__(self, groupes: Dict[int, tuple], espacement: Dict):
+        self.groupes = groupes
+        self.max_examens = espacement.get('max_examens')
+        self.fenetre = espacement.get('fenetre_jours')
+        self.ecart = espacement.get('ecart_demi_journees')
+        self.fenetres = defaultdict(int)
+        self.demi_journees = defaultdict(int)
+
+    @classmethod
+    def depuis_probleme(cls, probleme: Dict) -> Optional['SpacingCounters']:
+        espacement = normaliser_espacement(probleme.get('espacement'))
+        if not espacement:
+            return None
+        return cls(groupes_modules(probleme), espacement)
+
+    def admissible(self, module_id, jour: int, demi: int) -> bool:
+        groupes = self.groupes.get(module_id, ())
+        if self.max_examens:
+            for g in groupes:
+                for j in range(jour - self.fenetre + 1, jour + 1):
+                    if self.fenetres.get((g, j), 0) >= self.max_examens:
+                        return False
+        if self.ecart:
+            for g in groupes:
+                for h in range(demi - self.ecart + 1, demi + self.ecart):
+                    if self.demi_journees.get((g, h)):
+                        return False
+        return True
+
+    def _maj(self, module_id, jour: int, demi: int, delta: int):
+        for g in self.groupes.get(module_id, ()):
+            if self.max_examens:
+                for j in range(jour - self.fenetre + 1, jour + 1):
+                    self.fenetres[(g, j)] += delta
+            self.demi_journees[(g, demi)] += delta
+
+    def ajouter(self, module_id, jour: int, demi: int):
+        self._maj(module_id, jour, demi, 1)
+
+    def retirer(self, module_id, jour: int, demi: int):
+        self._maj(module_id, jour, demi, -1)
@@ -0,0 +1,160 @@
+import io
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Encodage compact d'une version : deux tableaux d'entiers compressés (np.savez_compressed)
+#   examens       : module, responsable, salle, début (minutes depuis l'époque Unix), durée, inscrits
+#   surveillances : module, professeur, rôle (index dans ROLES)
+EXAMENS_DTYPE = np.dtype([
+    ('module_id', '<i4'),
+    ('prof_id', '<i4'),
+    ('salle_id', '<i4'),
+    ('debut', '<i4'),
+    ('duree', '<i2'),
+    ('nb_inscrits', '<i4')
+])
+SURVEILLANCES_DTYPE = np.dtype([
+    ('module_id', '<i4'),
+    ('prof_id', '<i4'),
+    ('role', '<i1')
+])
+ROLES = ('responsable', 'surveillant')
+EPOCH = datetime(1970, 1, 1)
+
+
+def _to_minutes(dt: datetime) -> int:
+    return (dt - EPOCH) // timedelta(minutes=1)
+
+
+def _from_minutes(minutes) -> datetime:
+    return EPOCH + timedelta(minutes=int(minutes))
+
+
+def encode_version(exams_data: List[Tuple], surveillances_data: List[Tuple]) -> bytes:
+    """
+    Encode les tuples de batch_insert_exams en un blob compact.
+    exams_data: (module_id, prof_id, salle_id, periode_id, date_heure, duree_minutes, nb_inscrits)
+    surveillances_data: (module_id, periode_id, prof_id, role)
+    """
+    examens = np.array(
+        [(m, p, s, _to_minutes(d), duree, n) for m, p, s, _, d, duree, n in exams_data],
+        dtype=EXAMENS_DTYPE
+    )
+    surveillances = np.array(
+        [(m, p, ROLES.index(role)) for m, _, p, role in surveillances_data],
+        dtype=SURVEILLANCES_DTYPE
+    )
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, examens=examens, surveillances=surveillances)
+    return buffer.getvalue()
+
+
+def decode_version(blob) -> Tuple[np.ndarray, np.ndarray]:
+    with np.load(io.BytesIO(bytes(blob)), allow_pickle=False) as data:
+        return data['examens'], data['surveillances']
+
+
+def decode_version_rows(blob, periode_id: int) -> Tuple[List[Tuple], List[Tuple]]:
+    """Inverse de encode_version : tuples prêts pour batch_insert_exams."""
+    examens, surveillances = decode_version(blob)
+    exams_data = [
+        (int(e['module_id']), int(e['prof_id']), int(e['salle_id']), periode_id,
+         _from_minutes(e['debut']), int(e['duree']), int(e['nb_inscrits']))
+        for e in examens
+    ]
+    surveillances_data = [
+        (int(s['module_id']), periode_id, int(s['prof_id']), ROLES[s['role']])
+        for s in surveillances
+    ]
+    return exams_data, surveillances_data
+
+
+class ScheduleVersions:
+    """
+    Historique des versions d'emploi du temps d'une période : liste, retour arrière
+    instantané et comparaison de deux versions à partir de leur encodage compact.
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def list_versions(self, periode_id: int) -> pd.DataFrame:
+        data = self.db.get_versions_planning(periode_id)
+        if data:
+            return pd.DataFrame(data)
+        return pd.DataFrame()
+
+    def rollback(self, periode_id: int, version_id: int) -> Tuple[bool, Dict]:
+        """
+        Republie une version antérieure sans relancer le calcul.
+        Si ses lignes ont été purgées, elles sont d'abord restaurées depuis l'encodage.
+        """
+        version = self.db.get_version_planning(version_id)
+        if not version or version['periode_id'] != periode_id:
+            return False, {"error": "Version introuvable pour cette période"}
+        if version['encodage'] is None:
+            return False, {"error": "Version sans encodage (brouillon interrompu ?)"}
+
+        restored = False
+        if not version['materialisee']:
+            exams_data, surveillances_data = decode_version_rows(version['encodage'], periode_id)
+            self.db.batch_insert_exams(exams_data, surveillances_data, version_id)
+            restored = True
+
+        self.db.publish_version_planning(version_id)
+        return True, {'version_id': version_id, 'restored': restored}
+
+    def diff(self, version_a: int, version_b: int) -> Dict[str, pd.DataFrame]:
+        """
+        Différences entre deux versions : examens déplacés, salles et surveillants modifiés,
+        modules ajoutés ou retirés. Calcul vectorisé sur les tableaux décodés.
+        """
+        rows = {r['id']: r for r in self.db.get_versions_encodage([version_a, version_b])}
+        if version_a not in rows or version_b not in rows:
+            raise ValueError("Version introuvable")
+        if rows[version_a]['encodage'] is None or rows[version_b]['encodage'] is None:
+            raise ValueError("Version sans encodage (brouillon interrompu ?)")
+
+        ex_a, surv_a = decode_version(rows[version_a]['encodage'])
+        ex_b, surv_b = decode_version(rows[version_b]['encodage'])
+
+        communs, idx_a, idx_b = np.intersect1d(ex_a['module_id'], ex_b['module_id'], return_indices=True)
+        a, b = ex_a[idx_a], ex_b[idx_b]
+
+        moved = a['debut'] != b['debut']
+        room_changed = a['salle_id'] != b['salle_id']
+
+        # Paires (module, professeur) encodées sur 64 bits pour des différences d'ensembles
+        keys_a = (surv_a['module_id'].astype(np.int64) << 32) | surv_a['prof_id'].astype(np.int64)
+        keys_b = (surv_b['module_id'].astype(np.int64) << 32) | surv_b['prof_id'].astype(np.int64)
+        retires = np.setdiff1d(keys_a, keys_b)
+        ajoutes = np.setdiff1d(keys_b, keys_a)
+        surv_changed = np.union1d(retires >> 32, ajoutes >> 32)
+        surv_changed = np.intersect1d(surv_changed, communs)
+
+        deplaces = pd.DataFrame({
+            'module_id': a['module_id'][moved],
+            'avant': [_from_minutes(m) for m in a['debut'][moved]],
+            'apres': [_from_minutes(m) for m in b['debut'][moved]]
+        })
+        salles = pd.DataFrame({
+            'module_id': a['module_id'][room_changed],
+            'salle_avant': a['salle_id'][room_changed],
+            'salle_apres': b['salle_id'][room_changed]
+        })
+        surveillants = pd.DataFrame({
+            'module_id': surv_changed,
+            'retires': [(retires[(retires >> 32) == m] & 0xFFFFFFFF).tolist() for m in surv_changed],
+            'ajoutes': [(ajoutes[(ajoutes >> 32) == m] & 0xFFFFFFFF).tolist() for m in surv_changed]
+        })
+
+        return {
+            'deplaces': deplaces,
+            'salles': salles,
+            'surveillants': surveillants,
+            'ajoutes': pd.DataFrame({'module_id': np.setdiff1d(ex_b['module_id'], ex_a['module_id'])}),
+            'retires': pd.DataFrame({'module_id': np.setdiff1d(ex_a['module_id'], ex_b['module_id'])})
+        }